@@ -0,0 +1,51 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+import argparse
+import sys
+from pathlib import Path
+
+import odoo
+from odoo import SUPERUSER_ID, api
+from odoo.cli import Command
+from odoo.modules.registry import Registry
+
+from ..models.account_monthly_balance import MONTHLY_BALANCE_PARAM
+
+
+class RebuildMonthlyBalance(Command):
+    """Rebuild the account monthly balances from the journal items"""
+
+    name = "rebuild_monthly_balance"
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(
+            prog=f"{Path(sys.argv[0]).name} {self.name}",
+            description=self.__doc__,
+        )
+        parser.add_argument("-c", "--config", help="Odoo configuration file")
+        parser.add_argument("-d", "--database", required=True, help="Database name")
+        parser.add_argument(
+            "--company",
+            dest="company_ids",
+            type=int,
+            action="append",
+            help="Only rebuild this company (repeatable)",
+        )
+        parser.add_argument(
+            "--enable",
+            action="store_true",
+            help="Enable reading report balances from the table afterwards",
+        )
+        args = parser.parse_args(cmdargs)
+
+        config_args = ["-d", args.database]
+        if args.config:
+            config_args += ["-c", args.config]
+        odoo.tools.config.parse_config(config_args)
+
+        with Registry(args.database).cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            count = env["account.monthly.balance"]._rebuild(args.company_ids)
+            if args.enable:
+                env["ir.config_parameter"].set_param(MONTHLY_BALANCE_PARAM, "True")
+        print(f"{count} monthly balance rows written")
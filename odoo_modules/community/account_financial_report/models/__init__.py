@@ -1,6 +1,7 @@
 from . import account_age_report_configuration
 from . import account_group
 from . import account
+from . import account_monthly_balance
 from . import account_move_line
 from . import ir_actions_report
 from . import res_config_settings
@@ -0,0 +1,505 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+import logging
+from collections import defaultdict
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, fields, models
+from odoo.tools import SQL, str2bool
+
+_logger = logging.getLogger(__name__)
+
+MONTHLY_BALANCE_PARAM = "account_financial_report.use_monthly_balance"
+_PRECOMMIT_KEY = "account_financial_report.monthly_balance_dirty"
+
+# Journal item columns that change the bucket or the amounts of a line
+MONTHLY_BALANCE_LINE_FIELDS = {
+    "account_id",
+    "amount_currency",
+    "balance",
+    "company_id",
+    "credit",
+    "currency_id",
+    "date",
+    "debit",
+    "journal_id",
+    "move_id",
+    "parent_state",
+    "partner_id",
+}
+
+# Columns shared by account_monthly_balance and account_move_line
+_DIMENSIONS = ("company_id", "account_id", "partner_id", "journal_id", "currency_id")
+_AMOUNTS = ("debit", "credit", "balance", "amount_currency")
+_STATE_FIELDS = ("parent_state", "move_id.state")
+
+
+class AccountMonthlyBalance(models.Model):
+    """Journal item totals per (company, account, partner, journal, currency,
+    month, state).
+
+    The table is maintained incrementally: every transaction touching journal
+    items or moves adds the signed differences of the lines it changed to
+    their buckets when it commits. Reports read full months from it and only aggregate
+    account.move.line for the partial months at the edges of a period, see
+    _read_group_balances().
+    """
+
+    _name = "account.monthly.balance"
+    _description = "Account Monthly Balance"
+    _log_access = False
+    _order = "month, account_id"
+
+    company_id = fields.Many2one(
+        "res.company", required=True, readonly=True, ondelete="cascade"
+    )
+    company_currency_id = fields.Many2one(related="company_id.currency_id")
+    account_id = fields.Many2one(
+        "account.account", required=True, readonly=True, ondelete="cascade"
+    )
+    partner_id = fields.Many2one("res.partner", readonly=True, ondelete="cascade")
+    journal_id = fields.Many2one(
+        "account.journal", required=True, readonly=True, ondelete="cascade"
+    )
+    currency_id = fields.Many2one("res.currency", readonly=True)
+    month = fields.Date(required=True, readonly=True, help="First day of the month")
+    state = fields.Selection(
+        [("draft", "Unposted"), ("posted", "Posted"), ("cancel", "Cancelled")],
+        required=True,
+        readonly=True,
+    )
+    debit = fields.Monetary(currency_field="company_currency_id", readonly=True)
+    credit = fields.Monetary(currency_field="company_currency_id", readonly=True)
+    balance = fields.Monetary(currency_field="company_currency_id", readonly=True)
+    amount_currency = fields.Monetary(currency_field="currency_id", readonly=True)
+    line_count = fields.Integer(readonly=True)
+
+    def init(self):
+        self._cr.execute(
+            """
+            CREATE INDEX IF NOT EXISTS account_monthly_balance_account_month_index
+            ON account_monthly_balance (account_id, month)
+            """
+        )
+        self._cr.execute(
+            """
+            CREATE INDEX IF NOT EXISTS account_monthly_balance_company_month_index
+            ON account_monthly_balance (company_id, month)
+            """
+        )
+        # Target of the delta upserts in _apply_deltas()
+        self._cr.execute(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS account_monthly_balance_bucket_uniq
+            ON account_monthly_balance (
+                company_id, account_id, COALESCE(partner_id, 0), journal_id,
+                COALESCE(currency_id, 0), month, state
+            )
+            """
+        )
+        self._cr.execute("DROP TABLE IF EXISTS account_monthly_balance_stamp")
+
+    @api.model
+    def _is_enabled(self):
+        return str2bool(
+            self.env["ir.config_parameter"].sudo().get_param(MONTHLY_BALANCE_PARAM)
+            or "False"
+        )
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _mark_lines(self, lines, created=False):
+        """Apply the changes of the given journal items at commit time.
+
+        Call it before the columns of the lines are updated in the database
+        (or right after their creation with ``created=True``). The first time
+        a line is marked in a transaction its row is read from the database;
+        at commit it is subtracted from the table and the values the line
+        ends up with are added.
+
+        The row is read with SQL, not from the cache: the cache may already
+        hold recomputed amounts (e.g. after a price or rate change) that the
+        table has never seen.
+        """
+        if not lines or not self._is_enabled():
+            return
+        data = self._get_precommit_data()
+        line_ids = [
+            line_id
+            for line_id in lines.ids
+            if line_id and line_id not in data["line_ids"]
+        ]
+        if not line_ids:
+            return
+        data["line_ids"].update(line_ids)
+        if created:
+            return
+        self.env.cr.execute(
+            """
+            SELECT company_id, account_id, partner_id, journal_id, currency_id,
+                   date_trunc('month', date)::date, parent_state, debit, credit,
+                   balance, amount_currency
+              FROM account_move_line
+             WHERE id = ANY(%s) AND account_id IS NOT NULL
+            """,
+            [line_ids],
+        )
+        data["old"].extend(self.env.cr.fetchall())
+
+    def _get_precommit_data(self):
+        data = self.env.cr.precommit.data.get(_PRECOMMIT_KEY)
+        if data is None:
+            data = self.env.cr.precommit.data[_PRECOMMIT_KEY] = {
+                "line_ids": set(),
+                "old": [],
+            }
+            self.env.cr.precommit.add(self.sudo().browse()._flush_dirty)
+        return data
+
+    def _flush_dirty(self):
+        # Flush first: lines updated by the flush are marked into the
+        # pending data, not into a new one.
+        self.env.flush_all()
+        data = self.env.cr.precommit.data.pop(_PRECOMMIT_KEY, None)
+        if not data or not data["line_ids"]:
+            return
+        self._apply_deltas(data["line_ids"], data["old"])
+
+    @api.model
+    def _apply_deltas(self, line_ids, old_rows):
+        """Add the signed differences of the given journal items to the table.
+
+        :param line_ids: ids of the journal items, their current values are
+            added to their buckets
+        :param old_rows: (company_id, account_id, partner_id, journal_id,
+            currency_id, month, state, debit, credit, balance,
+            amount_currency) values the items had when the table was last
+            in sync, subtracted from their buckets
+        """
+        old_columns = list(zip(*old_rows)) or [[]] * 11
+        # Only the touched rows are locked, in a stable order so concurrent
+        # transactions don't deadlock on each other.
+        self.env.cr.execute(
+            """
+            INSERT INTO account_monthly_balance (
+                company_id, account_id, partner_id, journal_id, currency_id,
+                month, state, debit, credit, balance, amount_currency, line_count
+            )
+            SELECT company_id, account_id, partner_id, journal_id, currency_id,
+                   month, state, SUM(debit), SUM(credit), SUM(balance),
+                   SUM(amount_currency), SUM(line_count)
+              FROM (
+                    SELECT company_id, account_id, partner_id, journal_id,
+                           currency_id, month, state, -debit AS debit,
+                           -credit AS credit, -balance AS balance,
+                           -amount_currency AS amount_currency,
+                           -1 AS line_count
+                      FROM unnest(
+                           %s::int[], %s::int[], %s::int[], %s::int[], %s::int[],
+                           %s::date[], %s::varchar[], %s::numeric[],
+                           %s::numeric[], %s::numeric[], %s::numeric[]
+                      ) AS old(
+                           company_id, account_id, partner_id, journal_id,
+                           currency_id, month, state, debit, credit, balance,
+                           amount_currency
+                      )
+                    UNION ALL
+                    SELECT aml.company_id, aml.account_id, aml.partner_id,
+                           aml.journal_id, aml.currency_id,
+                           date_trunc('month', aml.date)::date, aml.parent_state,
+                           aml.debit, aml.credit, aml.balance,
+                           aml.amount_currency, 1
+                      FROM account_move_line aml
+                     WHERE aml.id = ANY(%s)
+                       AND aml.account_id IS NOT NULL
+                   ) AS delta
+             GROUP BY 1, 2, 3, 4, 5, 6, 7
+            HAVING SUM(line_count) != 0 OR SUM(debit) != 0 OR SUM(credit) != 0
+                OR SUM(balance) != 0 OR SUM(amount_currency) != 0
+             ORDER BY 1, 2, 3, 4, 5, 6, 7
+            ON CONFLICT (
+                company_id, account_id, COALESCE(partner_id, 0), journal_id,
+                COALESCE(currency_id, 0), month, state
+            )
+            DO UPDATE SET
+                debit = account_monthly_balance.debit + EXCLUDED.debit,
+                credit = account_monthly_balance.credit + EXCLUDED.credit,
+                balance = account_monthly_balance.balance + EXCLUDED.balance,
+                amount_currency = account_monthly_balance.amount_currency
+                    + EXCLUDED.amount_currency,
+                line_count = account_monthly_balance.line_count
+                    + EXCLUDED.line_count
+            RETURNING id, line_count
+            """,
+            [list(column) for column in old_columns] + [sorted(line_ids)],
+        )
+        empty_ids = [
+            row_id for row_id, line_count in self.env.cr.fetchall() if not line_count
+        ]
+        if empty_ids:
+            self.env.cr.execute(
+                "DELETE FROM account_monthly_balance WHERE id = ANY(%s)", [empty_ids]
+            )
+        self.invalidate_model()
+
+    @api.model
+    def _rebuild(self, company_ids=None):
+        """Rebuild the table from account.move.line.
+
+        :param company_ids: restrict the rebuild to these companies
+        :return: number of rows written
+        """
+        self.env.flush_all()
+        # Apply the pending changes now: rebuilt rows already include them
+        # and applying them again at commit would count them twice.
+        self.sudo()._flush_dirty()
+        company_filter = SQL()
+        if company_ids:
+            company_filter = SQL("AND aml.company_id IN %s", tuple(company_ids))
+            self.env.cr.execute(
+                "DELETE FROM account_monthly_balance WHERE company_id IN %s",
+                [tuple(company_ids)],
+            )
+        else:
+            self.env.cr.execute("DELETE FROM account_monthly_balance")
+        self.env.cr.execute(
+            SQL(
+                """
+                INSERT INTO account_monthly_balance (
+                    company_id, account_id, partner_id, journal_id, currency_id,
+                    month, state, debit, credit, balance, amount_currency,
+                    line_count
+                )
+                SELECT aml.company_id, aml.account_id, aml.partner_id,
+                       aml.journal_id, aml.currency_id,
+                       date_trunc('month', aml.date)::date, aml.parent_state,
+                       SUM(aml.debit), SUM(aml.credit), SUM(aml.balance),
+                       SUM(aml.amount_currency), COUNT(*)
+                  FROM account_move_line aml
+                 WHERE aml.account_id IS NOT NULL %s
+                 GROUP BY 1, 2, 3, 4, 5, 6, 7
+                """,
+                company_filter,
+            )
+        )
+        count = self.env.cr.rowcount
+        self.invalidate_model()
+        _logger.info("Rebuilt account monthly balances: %d rows", count)
+        return count
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _parse_move_line_domain(self, domain):
+        """Translate a flat account.move.line domain into balance table terms.
+
+        Only conjunctions of leaves on the table dimensions, the move state,
+        the date and account fields are supported.
+
+        :return: dict with the SQL conditions, the account domain and the
+            [date_from, date_to) bounds, or None if the domain can't be
+            answered from the table.
+        """
+        parsed = {
+            "conditions": defaultdict(list),
+            "account_domain": [],
+            "date_from": None,
+            "date_to": None,
+        }
+        for leaf in domain:
+            if leaf == "&":
+                continue
+            if not isinstance(leaf, list | tuple) or len(leaf) != 3:
+                return None
+            field_name, operator, value = leaf
+            if field_name == "date":
+                value = fields.Date.to_date(value)
+                if not value:
+                    return None
+                if operator in (">", "<="):
+                    value += relativedelta(days=1)
+                    operator = ">=" if operator == ">" else "<"
+                if operator == ">=":
+                    if not parsed["date_from"] or value > parsed["date_from"]:
+                        parsed["date_from"] = value
+                elif operator == "<":
+                    if not parsed["date_to"] or value < parsed["date_to"]:
+                        parsed["date_to"] = value
+                else:
+                    return None
+            elif field_name in _DIMENSIONS or field_name in _STATE_FIELDS:
+                if operator == "=":
+                    value = [value]
+                elif operator != "in":
+                    return None
+                values = list(value)
+                if not values:
+                    parsed["empty"] = True
+                    continue
+                if field_name in _STATE_FIELDS:
+                    field_name = "state"
+                    if not all(isinstance(v, str) for v in values):
+                        return None
+                elif not all(isinstance(v, int) and v for v in values):
+                    return None
+                parsed["conditions"][field_name].append(tuple(values))
+            elif field_name == "account_type" or field_name.startswith("account_id."):
+                account_field = field_name.removeprefix("account_id.")
+                parsed["account_domain"].append((account_field, operator, value))
+            elif field_name == "display_type" and operator == "not in":
+                # Notes and sections have no account, so they are not in the
+                # table and excluding them changes nothing.
+                if not set(value) <= {"line_note", "line_section"}:
+                    return None
+            else:
+                return None
+        return parsed
+
+    @api.model
+    def _split_move_line_domain(self, domain):
+        """Split a journal item domain into full months and partial months.
+
+        :return: None if the domain can't be answered from the table, else a
+            tuple (where, raw_domains): ``where`` is the SQL condition on
+            account_monthly_balance for the full months (None if there are
+            none) and ``raw_domains`` are account.move.line domains covering
+            the partial months at the edges of the period.
+        """
+        parsed = self._parse_move_line_domain(domain)
+        if parsed is None:
+            return None
+        date_from, date_to = parsed["date_from"], parsed["date_to"]
+        if parsed.get("empty") or (date_from and date_to and date_from >= date_to):
+            return None, []
+
+        full_from = date_from
+        if date_from and date_from.day != 1:
+            full_from = date_from.replace(day=1) + relativedelta(months=1)
+        full_to = date_to.replace(day=1) if date_to else None
+        raw_domains = []
+        if full_from and full_to and full_from >= full_to:
+            # The period lies within one or two partial months
+            return None, [domain]
+        if date_from and full_from != date_from:
+            raw_domains.append(
+                domain + [("date", ">=", date_from), ("date", "<", full_from)]
+            )
+        if date_to and full_to != date_to:
+            raw_domains.append(
+                domain + [("date", ">=", full_to), ("date", "<", date_to)]
+            )
+
+        table = self._table
+        where = []
+        conditions = parsed["conditions"]
+        if "company_id" not in conditions:
+            # What the multi-company record rule on journal items enforces
+            conditions["company_id"].append(tuple(self.env.companies.ids))
+        for column, value_lists in conditions.items():
+            for values in value_lists:
+                where.append(SQL("%s IN %s", SQL.identifier(table, column), values))
+        if parsed["account_domain"]:
+            account_query = self.env["account.account"]._search(
+                parsed["account_domain"]
+            )
+            where.append(
+                SQL(
+                    "%s IN %s",
+                    SQL.identifier(table, "account_id"),
+                    account_query.subselect(),
+                )
+            )
+        if full_from:
+            where.append(SQL("%s >= %s", SQL.identifier(table, "month"), full_from))
+        if full_to:
+            where.append(SQL("%s < %s", SQL.identifier(table, "month"), full_to))
+        return SQL(" AND ").join(where), raw_domains
+
+    @api.model
+    def _read_group_balances(self, domain, fields_list, groupby):
+        """Drop-in for account.move.line read_group(lazy=False) on amounts.
+
+        :return: read_group-like rows, or None if the request can't be
+            answered from the table.
+        """
+        groupby = list(groupby)
+        if not all(field in _DIMENSIONS for field in groupby):
+            return None
+        aggregates = [field.split(":")[0] for field in fields_list]
+        if not all(field in _AMOUNTS or field in groupby for field in aggregates):
+            return None
+        split = self._split_move_line_domain(domain)
+        if split is None:
+            return None
+        where, raw_domains = split
+
+        MoveLine = self.env["account.move.line"]
+        columns = SQL(", ").join(
+            [SQL.identifier(field) for field in groupby + list(_AMOUNTS)]
+        )
+        parts = []
+        if where is not None:
+            parts.append(
+                SQL(
+                    "(SELECT %s FROM %s WHERE %s)",
+                    columns,
+                    SQL.identifier(self._table),
+                    where,
+                )
+            )
+        for raw_domain in raw_domains:
+            query = MoveLine._search(raw_domain)
+            if not query.is_empty():
+                line_columns = [
+                    SQL.identifier(query.table, field)
+                    for field in groupby + list(_AMOUNTS)
+                ]
+                parts.append(SQL("(%s)", query.select(*line_columns)))
+        if not parts:
+            return []
+
+        self.env.flush_all()
+        group_columns = SQL(", ").join([SQL.identifier(field) for field in groupby])
+        sums = SQL(", ").join(
+            [SQL("COALESCE(SUM(%s), 0)", SQL.identifier(field)) for field in _AMOUNTS]
+        )
+        select = SQL(", ").join([group_columns, sums]) if groupby else sums
+        query = SQL(
+            "SELECT %s FROM (%s) AS balances", select, SQL(" UNION ALL ").join(parts)
+        )
+        if groupby:
+            query = SQL("%s GROUP BY %s", query, group_columns)
+        self.env.cr.execute(query)
+        rows = self.env.cr.fetchall()
+
+        records = {
+            field: MoveLine._fields[field].comodel_name for field in groupby
+        }
+        ids_by_field = {
+            field: {row[index] for row in rows if row[index]}
+            for index, field in enumerate(groupby)
+        }
+        names = {
+            field: dict(
+                self.env[records[field]].browse(ids).mapped(
+                    lambda r: (r.id, r.display_name)
+                )
+            )
+            for field, ids in ids_by_field.items()
+        }
+        result = []
+        for row in rows:
+            values = {}
+            for index, field in enumerate(groupby):
+                value = row[index]
+                values[field] = (value, names[field][value]) if value else False
+            for index, field in enumerate(_AMOUNTS, start=len(groupby)):
+                values[field] = row[index]
+            result.append(values)
+        return result
@@ -5,6 +5,8 @@ from collections import defaultdict
 from odoo import api, fields, models
 from odoo.fields import Command
 
+from .account_monthly_balance import MONTHLY_BALANCE_LINE_FIELDS
+
 
 class AccountMoveLine(models.Model):
     _inherit = "account.move.line"
@@ -61,6 +63,26 @@ class AccountMoveLine(models.Model):
             ON account_move_line (account_id, partner_id)"""
             )
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        self.env["account.monthly.balance"]._mark_lines(lines, created=True)
+        return lines
+
+    def _write_multi(self, vals_list):
+        # Both write() and the flush of recomputed fields (balance after a
+        # price_unit change, parent_state after posting, ...) end up here,
+        # right before the columns are updated.
+        if any(
+            not MONTHLY_BALANCE_LINE_FIELDS.isdisjoint(vals) for vals in vals_list
+        ):
+            self.env["account.monthly.balance"]._mark_lines(self)
+        return super()._write_multi(vals_list)
+
+    def unlink(self):
+        self.env["account.monthly.balance"]._mark_lines(self)
+        return super().unlink()
+
     @api.model
     def search_count(self, domain, limit=None):
         # In Big DataBase every time you change the domain widget this method
@@ -3,6 +3,8 @@
 
 from odoo import api, fields, models
 
+from .account_monthly_balance import MONTHLY_BALANCE_PARAM
+
 
 class ResConfigSettings(models.TransientModel):
     _inherit = "res.config.settings"
@@ -11,15 +13,27 @@ class ResConfigSettings(models.TransientModel):
         "account.age.report.configuration",
         string="Intervals configuration",
     )
+    use_monthly_balance = fields.Boolean(
+        string="Monthly balances",
+        config_parameter=MONTHLY_BALANCE_PARAM,
+        help="Maintain journal item totals per month and read opening balances "
+        "of the Trial Balance and General Ledger from them.",
+    )
 
     def set_values(self):
+        monthly_balance = self.env["account.monthly.balance"].sudo()
+        rebuild = self.use_monthly_balance and not monthly_balance._is_enabled()
         self.env["ir.default"].sudo().set(
             "aged.partner.balance.report.wizard",
             "age_partner_config_id",
             self.age_partner_config_id.id,
             company_id=self.env.company.id,
         )
-        return super().set_values()
+        res = super().set_values()
+        if rebuild:
+            # Not maintained while disabled
+            monthly_balance._rebuild()
+        return res
 
     @api.model
     def get_values(self):
@@ -122,6 +122,24 @@ class AgedPartnerBalanceReport(models.AbstractModel):
                 move_line["amount_currency"] = 0
         return move_lines
 
+    def _read_group_balances(self, domain, fields, groupby, lazy=True):
+        """Group journal item amounts, from the monthly balances if enabled.
+
+        Full months are read from account.monthly.balance and only the
+        partial months from account.move.line. Rows from the balance table
+        are grouped by every groupby field and have no ``__domain`` or
+        ``__context`` keys, so a lazy grouping on several fields always goes
+        through read_group: callers rely on those keys to group the sub-levels.
+        """
+        monthly_balance = self.env["account.monthly.balance"]
+        if (not lazy or len(groupby) <= 1) and monthly_balance._is_enabled():
+            rows = monthly_balance._read_group_balances(domain, fields, groupby)
+            if rows is not None:
+                return rows
+        return self.env["account.move.line"].read_group(
+            domain=domain, fields=fields, groupby=groupby, lazy=lazy
+        )
+
     def _get_accounts_data(self, accounts_ids):
         accounts = self.env["account.account"].browse(accounts_ids)
         accounts_data = {}
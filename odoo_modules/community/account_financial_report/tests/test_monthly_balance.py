@@ -0,0 +1,312 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from datetime import date
+
+from odoo.tests import tagged
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+from ..models.account_monthly_balance import MONTHLY_BALANCE_PARAM
+
+
+@tagged("post_install", "-at_install")
+class TestMonthlyBalance(AccountTestInvoicingCommon):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env = cls.env(
+            context=dict(
+                cls.env.context,
+                mail_create_nolog=True,
+                mail_create_nosubscribe=True,
+                mail_notrack=True,
+                no_reset_password=True,
+                tracking_disable=True,
+            )
+        )
+        cls.env["ir.config_parameter"].set_param(MONTHLY_BALANCE_PARAM, "True")
+        cls.monthly_balance = cls.env["account.monthly.balance"]
+        cls.monthly_balance._rebuild()
+        cls.receivable_account = cls.company_data["default_account_receivable"]
+        cls.income_account = cls.company_data["default_account_revenue"]
+        cls.journal = cls.company_data["default_journal_misc"]
+        cls.partner = cls.env.ref("base.res_partner_12")
+        cls.moves = cls.env["account.move"]
+        for move_date, amount in (
+            ("2015-03-10", 100.0),
+            ("2015-11-30", 250.0),
+            ("2016-01-15", 400.0),
+            ("2016-02-01", 75.0),
+            ("2016-02-20", 60.0),
+        ):
+            cls.moves |= cls._add_move(cls, move_date, amount)
+        cls.moves.action_post()
+        cls.env.cr.precommit.run()
+
+    def _add_move(self, move_date, amount):
+        return self.env["account.move"].create(
+            {
+                "journal_id": self.journal.id,
+                "date": move_date,
+                "line_ids": [
+                    (
+                        0,
+                        0,
+                        {
+                            "debit": amount,
+                            "credit": 0.0,
+                            "partner_id": self.partner.id,
+                            "account_id": self.receivable_account.id,
+                        },
+                    ),
+                    (
+                        0,
+                        0,
+                        {
+                            "debit": 0.0,
+                            "credit": amount,
+                            "partner_id": self.partner.id,
+                            "account_id": self.income_account.id,
+                        },
+                    ),
+                ],
+            }
+        )
+
+    def _table_totals(self):
+        self.env.cr.execute(
+            """
+            SELECT account_id, month, state, partner_id, SUM(balance), SUM(line_count)
+              FROM account_monthly_balance
+             GROUP BY 1, 2, 3, 4
+            """
+        )
+        return {row[:4]: row[4:] for row in self.env.cr.fetchall()}
+
+    def _line_totals(self):
+        self.env.flush_all()
+        self.env.cr.execute(
+            """
+            SELECT account_id, date_trunc('month', date)::date, parent_state,
+                   partner_id, SUM(balance), COUNT(*)
+              FROM account_move_line
+             WHERE account_id IS NOT NULL
+             GROUP BY 1, 2, 3, 4
+            """
+        )
+        return {row[:4]: row[4:] for row in self.env.cr.fetchall()}
+
+    def test_01_incremental_matches_rebuild(self):
+        """Posting, cancelling and editing keep the table in sync"""
+        self.assertEqual(self._table_totals(), self._line_totals())
+        key = (self.receivable_account.id, date(2016, 2, 1), "posted", self.partner.id)
+        self.assertAlmostEqual(self._table_totals()[key][0], 135.0)
+
+        move = self._add_move("2016-02-25", 30.0)
+        self.env.cr.precommit.run()
+        self.assertEqual(self._table_totals(), self._line_totals())
+        move.action_post()
+        self.env.cr.precommit.run()
+        self.assertAlmostEqual(self._table_totals()[key][0], 165.0)
+
+        move.button_draft()
+        move.date = "2016-03-05"
+        self.env.cr.precommit.run()
+        self.assertAlmostEqual(self._table_totals()[key][0], 135.0)
+        self.assertEqual(self._table_totals(), self._line_totals())
+
+        move.button_cancel()
+        self.env.cr.precommit.run()
+        self.assertEqual(self._table_totals(), self._line_totals())
+
+        self.monthly_balance._rebuild()
+        self.assertEqual(self._table_totals(), self._line_totals())
+
+    def test_02_split_partial_months(self):
+        """Full months come from the table, partial months from journal items"""
+        where, raw_domains = self.monthly_balance._split_move_line_domain(
+            [("date", ">=", "2016-01-15"), ("date", "<", "2016-03-20")]
+        )
+        self.assertIsNotNone(where)
+        self.assertEqual(
+            [domain[-2:] for domain in raw_domains],
+            [
+                [("date", ">=", date(2016, 1, 15)), ("date", "<", date(2016, 2, 1))],
+                [("date", ">=", date(2016, 3, 1)), ("date", "<", date(2016, 3, 20))],
+            ],
+        )
+        where, raw_domains = self.monthly_balance._split_move_line_domain(
+            [("date", "<", "2016-02-01")]
+        )
+        self.assertIsNotNone(where)
+        self.assertFalse(raw_domains)
+        self.assertIsNone(
+            self.monthly_balance._split_move_line_domain(
+                ["|", ("date", "<", "2016-02-01"), ("name", "=", "x")]
+            )
+        )
+
+    def test_03_read_group_matches_move_lines(self):
+        """Balances read from the table match read_group on journal items"""
+        for date_to in ("2016-01-01", "2016-02-10", "2016-02-21", "2016-03-01"):
+            domain = [
+                ("date", "<", date_to),
+                ("company_id", "=", self.env.company.id),
+                ("move_id.state", "=", "posted"),
+                ("account_id.account_type", "in", ["asset_receivable", "income"]),
+            ]
+            groupby = ["account_id", "partner_id"]
+            fields = ["account_id", "partner_id", "debit", "credit", "balance"]
+            expected = self.env["account.move.line"].read_group(
+                domain, fields, groupby, lazy=False
+            )
+            rows = self.monthly_balance._read_group_balances(domain, fields, groupby)
+
+            def totals(rows):
+                return {
+                    (r["account_id"][0], r["partner_id"] and r["partner_id"][0]): (
+                        round(r["debit"], 2),
+                        round(r["credit"], 2),
+                        round(r["balance"], 2),
+                    )
+                    for r in rows
+                }
+
+            self.assertEqual(totals(rows), totals(expected), date_to)
+
+    def test_04_trial_balance_same_results(self):
+        """Trial balance is identical with and without the monthly balances"""
+        wizard = self.env["trial.balance.report.wizard"].create(
+            {
+                "date_from": "2016-02-15",
+                "date_to": "2016-12-31",
+                "target_move": "posted",
+                "hide_account_at_0": True,
+                "company_id": self.env.company.id,
+                "fy_start_date": "2016-01-01",
+                "show_partner_details": True,
+            }
+        )
+        report = self.env["report.account_financial_report.trial_balance"]
+
+        def get_balances():
+            data = wizard._prepare_report_data()
+            res = report._get_report_values(wizard, data)
+            return {
+                (account_id, partner_id): (
+                    round(values["initial_balance"], 2),
+                    round(values["ending_balance"], 2),
+                )
+                for account_id, partners in res["total_amount"].items()
+                for partner_id, values in partners.items()
+                if isinstance(partner_id, int) and isinstance(values, dict)
+            }
+
+        with_table = get_balances()
+        self.env["ir.config_parameter"].set_param(MONTHLY_BALANCE_PARAM, "False")
+        without_table = get_balances()
+        self.assertTrue(with_table)
+        self.assertEqual(with_table, without_table)
+
+    def test_05_lazy_grouping_foreign_currency(self):
+        """Lazy sub-groupings by currency are the same with the monthly balances"""
+        currency = self.other_currency
+        move = self.env["account.move"].create(
+            {
+                "journal_id": self.journal.id,
+                "date": "2016-01-20",
+                "line_ids": [
+                    (
+                        0,
+                        0,
+                        {
+                            "debit": 50.0,
+                            "credit": 0.0,
+                            "amount_currency": 100.0,
+                            "currency_id": currency.id,
+                            "partner_id": self.partner.id,
+                            "account_id": self.receivable_account.id,
+                        },
+                    ),
+                    (
+                        0,
+                        0,
+                        {
+                            "debit": 0.0,
+                            "credit": 50.0,
+                            "amount_currency": -100.0,
+                            "currency_id": currency.id,
+                            "partner_id": self.partner.id,
+                            "account_id": self.income_account.id,
+                        },
+                    ),
+                ],
+            }
+        )
+        move.action_post()
+        self.env.cr.precommit.run()
+        self.assertEqual(self._table_totals(), self._line_totals())
+
+        report = self.env["report.account_financial_report.trial_balance"]
+        rows = report._read_group_balances(
+            [("date", "<", "2016-02-01"), ("move_id.state", "=", "posted")],
+            ["account_id", "balance", "amount_currency:sum"],
+            ["account_id", "currency_id"],
+        )
+        self.assertTrue(rows)
+        self.assertTrue(all("__context" in row for row in rows))
+
+        wizard = self.env["trial.balance.report.wizard"].create(
+            {
+                "date_from": "2016-02-15",
+                "date_to": "2016-12-31",
+                "target_move": "posted",
+                "company_id": self.env.company.id,
+                "fy_start_date": "2016-01-01",
+                "foreign_currency": True,
+            }
+        )
+
+        def get_group_by_data():
+            data = wizard._prepare_report_data()
+            res = report._get_report_values(wizard, data)
+            return {
+                account_id: {
+                    gb_id: (
+                        round(gb_values["initial_balance"], 2),
+                        round(gb_values["initial_currency_balance"], 2),
+                    )
+                    for gb_id, gb_values in values.get("group_by_data", {}).items()
+                }
+                for account_id, values in res["total_amount"].items()
+            }
+
+        with_table = get_group_by_data()
+        self.env["ir.config_parameter"].set_param(MONTHLY_BALANCE_PARAM, "False")
+        without_table = get_group_by_data()
+        self.assertIn(currency.id, with_table[self.receivable_account.id])
+        self.assertEqual(with_table, without_table)
+
+    def test_06_recomputed_amounts(self):
+        """Amounts recomputed at flush (price, quantity) reach the table"""
+        invoice = self.init_invoice(
+            "out_invoice",
+            partner=self.partner,
+            invoice_date="2016-02-10",
+            amounts=[100.0, 40.0],
+        )
+        self.env.cr.precommit.run()
+        self.assertEqual(self._table_totals(), self._line_totals())
+
+        product_lines = invoice.invoice_line_ids
+        product_lines[0].price_unit = 150.0
+        self.env.cr.precommit.run()
+        self.assertEqual(self._table_totals(), self._line_totals())
+
+        product_lines[1].write({"quantity": 3.0, "discount": 10.0})
+        self.env.cr.precommit.run()
+        self.assertEqual(self._table_totals(), self._line_totals())
+
+        invoice.action_post()
+        self.env.cr.precommit.run()
+        self.assertEqual(self._table_totals(), self._line_totals())
@@ -71,4 +71,34 @@ class KitchenScreen(models.Model):
             if vals.get('sequence', "New") == "New":
                 vals['sequence'] = self.env['ir.sequence'].next_by_code(
                     'kitchen.screen') or "New"
-        return super().create(vals_list)
+        screens = super().create(vals_list)
+        screens._reroute_kitchen_lines()
+        return screens
+
+    def write(self, vals):
+        """Re-route open order lines when the screen's POS or categories change"""
+        old_configs = self.pos_config_id
+        res = super().write(vals)
+        if 'pos_config_id' in vals or 'pos_categ_ids' in vals:
+            self._reroute_kitchen_lines(old_configs)
+        return res
+
+    @api.model
+    def _get_routing(self, config_ids):
+        """{pos.config id: (kitchen screen, set of pos.category ids)}, the
+        first screen of each config as the order lines are routed to"""
+        routing = {}
+        for screen in self.sudo().search([('pos_config_id', 'in', list(config_ids))]):
+            routing.setdefault(screen.pos_config_id.id,
+                               (screen, set(screen.pos_categ_ids.ids)))
+        return routing
+
+    def _reroute_kitchen_lines(self, configs=None):
+        """Route the lines of orders still in the kitchen again"""
+        configs = (configs or self.env['pos.config']) | self.pos_config_id
+        if not configs:
+            return
+        self.env['pos.order.line'].sudo().search([
+            ('order_id.config_id', 'in', configs.ids),
+            ('order_id.order_status', 'in', ['draft', 'waiting']),
+        ])._route_to_kitchen()
@@ -19,10 +19,21 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 ############################################################################
+from collections import defaultdict
 from odoo import api, fields, models
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
 
+# Fields sent to the kitchen screen, instead of read() of every field
+KITCHEN_ORDER_FIELDS = ['name', 'pos_reference', 'date_order', 'config_id',
+                        'table_id', 'floor', 'user_id', 'state', 'order_status',
+                        'order_ref', 'avg_prepare_time']
+KITCHEN_LINE_FIELDS = ['order_id', 'product_id', 'full_product_name', 'qty',
+                       'note', 'order_status']
+# write_date is the transaction start time: re-read this far behind the
+# cursor so orders committed by slower transactions are not skipped
+FEED_OVERLAP = timedelta(seconds=10)
+
 
 class PosOrder(models.Model):
     """Inheriting the pos order model """
@@ -81,23 +92,15 @@ class PosOrder(models.Model):
             processed_vals_to_create) if processed_vals_to_create else self.browse()
         orders_to_notify = []
         for order in res:
-            kitchen_screen = self.env["kitchen.screen"].search(
-                [("pos_config_id", "=", order.config_id.id)], limit=1
-            )
-            if kitchen_screen:
-                has_kitchen_items = False
-                for order_line in order.lines:
-                    if order_line.product_id.pos_categ_ids and any(
-                            cat.id in kitchen_screen.pos_categ_ids.ids for cat
-                            in order_line.product_id.pos_categ_ids):
-                        order_line.is_cooking = True
-                        has_kitchen_items = True
-                if has_kitchen_items:
-                    order.is_cooking = True
-                    order.order_ref = order.name  # Set order_ref here
-                    if order.order_status != 'draft':
-                        order.order_status = 'draft'
-                    orders_to_notify.append(order)
+            # Lines are routed to their kitchen screen when created
+            kitchen_lines = order.lines.filtered('kitchen_screen_id')
+            if kitchen_lines:
+                kitchen_lines.is_cooking = True
+                order.is_cooking = True
+                order.order_ref = order.name  # Set order_ref here
+                if order.order_status != 'draft':
+                    order.order_status = 'draft'
+                orders_to_notify.append(order)
         self.env.cr.commit()
         for order in orders_to_notify:
             message = {
@@ -115,16 +118,13 @@ class PosOrder(models.Model):
     def write(self, vals):
         """Override write function for adding order status in vals"""
         res = super(PosOrder, self).write(vals)
+        routing = self.env["kitchen.screen"]._get_routing(
+            self.config_id.ids)
         for order in self:
-            kitchen_screen = self.env["kitchen.screen"].search(
-                [("pos_config_id", "=", order.config_id.id)], limit=1
-            )
-            if kitchen_screen:
+            if order.config_id.id in routing:
                 has_kitchen_items = False
                 for line in order.lines:
-                    if line.product_id.pos_categ_ids and any(
-                            cat.id in kitchen_screen.pos_categ_ids.ids
-                            for cat in line.product_id.pos_categ_ids):
+                    if line.kitchen_screen_id:
                         if not line.is_cooking:
                             line.write({
                                 'is_cooking': True,
@@ -149,30 +149,97 @@ class PosOrder(models.Model):
                 self.env["bus.bus"]._sendone(channel, "notification", message)
         return res
 
+    def init(self):
+        """Index for the changed-orders query of the kitchen feed"""
+        super().init()
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS pos_order_config_write_date_idx
+            ON pos_order (config_id, write_date)
+        """)
+
     @api.model
     def get_details(self, shop_id, *args, **kwargs):
         """Method to fetch kitchen orders for display on the kitchen screen."""
-        kitchen_screen = self.env["kitchen.screen"].sudo().search(
+        return self.get_kitchen_feed(shop_id)
+
+    @api.model
+    def get_kitchen_feed(self, shop_id, since=None):
+        """Kitchen screen feed of a POS config.
+
+        Without ``since`` returns every order on the screen. With the
+        ``cursor`` of a previous call, returns only the orders written since
+        (directly or through one of their kitchen lines), each with all its
+        kitchen lines, and in ``removed_order_ids`` the changed orders that
+        are no longer on the screen. Deltas overlap by FEED_OVERLAP, so
+        clients replace orders and lines by id.
+        """
+        try:
+            since = since and datetime.fromisoformat(since) - FEED_OVERLAP
+        except (TypeError, ValueError):
+            since = None
+        self.env.cr.execute("SELECT now() AT TIME ZONE 'UTC'")
+        values = {
+            "cursor": self.env.cr.fetchone()[0].isoformat(),
+            "full": not since,
+            "orders": [],
+            "order_lines": [],
+            "removed_order_ids": [],
+        }
+        kitchen_screens = self.env["kitchen.screen"].sudo().search(
             [("pos_config_id", "=", shop_id)])
-        if not kitchen_screen:
-            return {"orders": [], "order_lines": []}
-        pos_orders = self.env["pos.order"].search([
+        if not kitchen_screens:
+            return values
+        domain = [
             ("is_cooking", "=", True),
             ("config_id", "=", shop_id),
             ("state", "not in", ["cancel"]),
             ("order_status", "in", ["draft", "waiting", "ready"])
-        ], order="date_order")
-        pos_lines = pos_orders.lines.filtered(
-            lambda line: line.is_cooking and any(
-                categ.id in kitchen_screen.pos_categ_ids.ids
-                for categ in line.product_id.pos_categ_ids
-            )
-        )
-        values = {"orders": pos_orders.read(), "order_lines": pos_lines.read()}
+        ]
+        if since:
+            changed_ids = self._get_kitchen_changed_order_ids(
+                shop_id, kitchen_screens, since)
+            if not changed_ids:
+                return values
+            domain.append(("id", "in", changed_ids))
+        pos_orders = self.search(domain, order="date_order")
+        if since:
+            values["removed_order_ids"] = sorted(
+                set(changed_ids) - set(pos_orders.ids))
+        pos_lines = self.env["pos.order.line"].search([
+            ("order_id", "in", pos_orders.ids),
+            ("kitchen_screen_id", "in", kitchen_screens.ids),
+            ("is_cooking", "=", True),
+        ], order="id")
+        values["orders"] = self._get_kitchen_order_values(pos_orders, pos_lines)
+        values["order_lines"] = pos_lines.read(KITCHEN_LINE_FIELDS)
+        return values
+
+    def _get_kitchen_changed_order_ids(self, shop_id, kitchen_screens, since):
+        """Ids of the orders of the config written at or after ``since``,
+        or with a kitchen line that was"""
+        self.flush_model(['config_id', 'write_date'])
+        self.env['pos.order.line'].flush_model(
+            ['order_id', 'kitchen_screen_id', 'write_date'])
+        self.env.cr.execute("""
+            SELECT id FROM pos_order
+             WHERE config_id = %s AND write_date >= %s
+             UNION
+            SELECT order_id FROM pos_order_line
+             WHERE kitchen_screen_id = ANY(%s) AND write_date >= %s
+        """, (shop_id, since, kitchen_screens.ids, since))
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    def _get_kitchen_order_values(self, pos_orders, pos_lines):
+        """Minimal order values for the kitchen screen, with the ids of their
+        kitchen lines and the order time in the user's timezone"""
+        line_ids = defaultdict(list)
+        for line in pos_lines:
+            line_ids[line.order_id.id].append(line.id)
+        orders = pos_orders.read(KITCHEN_ORDER_FIELDS)
         user_tz_str = self.env.user.tz or 'UTC'
         user_tz = pytz.timezone(user_tz_str)
         utc = pytz.utc
-        for value in values['orders']:
+        for value in orders:
             if value.get('table_id'):
                 value['floor'] = value['table_id'][1].split(',')[0].strip()
             date_str = value['date_order']
@@ -190,38 +257,28 @@ class PosOrder(models.Model):
                 value['hour'] = 0
                 value['minutes'] = 0
                 value['formatted_minutes'] = "00"
-        return values
+            value['lines'] = line_ids[value['id']]
+        return orders
 
     def action_pos_order_paid(self):
         """Inherited method called when a POS order transitions to 'paid' state."""
         res = super().action_pos_order_paid()
-        kitchen_screen = self.env["kitchen.screen"].search(
-            [("pos_config_id", "=", self.config_id.id)], limit=1
-        )
-        if kitchen_screen:
-            vals = {}
-            has_kitchen_items = False
-            for order_line in self.lines:
-                if order_line.product_id.pos_categ_ids and any(
-                        cat.id in kitchen_screen.pos_categ_ids.ids for cat in
-                        order_line.product_id.pos_categ_ids):
-                    order_line.write({'is_cooking': True})
-                    has_kitchen_items = True
-            if has_kitchen_items:
-                vals.update({
-                    'is_cooking': True,
-                    'order_ref': self.name,
-                    'order_status': 'ready'
-                })
-                self.write(vals)
-                message = {
-                    'res_model': self._name,
-                    'message': 'pos_order_created',
-                    'order_id': self.id,
-                    'config_id': self.config_id.id
-                }
-                channel = f'pos_order_created_{self.config_id.id}'
-                self.env["bus.bus"]._sendone(channel, "notification", message)
+        kitchen_lines = self.lines.filtered('kitchen_screen_id')
+        if kitchen_lines:
+            kitchen_lines.write({'is_cooking': True})
+            self.write({
+                'is_cooking': True,
+                'order_ref': self.name,
+                'order_status': 'ready'
+            })
+            message = {
+                'res_model': self._name,
+                'message': 'pos_order_created',
+                'order_id': self.id,
+                'config_id': self.config_id.id
+            }
+            channel = f'pos_order_created_{self.config_id.id}'
+            self.env["bus.bus"]._sendone(channel, "notification", message)
         return res
 
     @api.onchange("order_status")
@@ -268,13 +325,7 @@ class PosOrder(models.Model):
         """Action for "Done" button: Move order from 'waiting' (ready) to 'ready' (completed) status."""
         self.ensure_one()
         self.order_status = "ready"
-        kitchen_screen = self.env["kitchen.screen"].search(
-            [("pos_config_id", "=", self.config_id.id)], limit=1)
-        if kitchen_screen:
-            for line in self.lines:
-                if line.product_id.pos_categ_ids and any(
-                        cat.id in kitchen_screen.pos_categ_ids.ids for cat in line.product_id.pos_categ_ids):
-                    line.order_status = "ready"
+        self.lines.filtered('kitchen_screen_id').order_status = "ready"
         message = {
             'res_model': self._name,
             'message': 'pos_order_completed',
@@ -295,12 +346,12 @@ class PosOrder(models.Model):
             [("pos_config_id", "=", pos_order.config_id.id)], limit=1)
         if not kitchen_screen:
             return False
+        kitchen_categ_ids = set(kitchen_screen.pos_categ_ids.ids)
         unhandled_categories = []
         for line in pos_order.lines:
-            if line.product_id.pos_categ_ids and not any(
-                    cat.id in kitchen_screen.pos_categ_ids.ids for cat in line.product_id.pos_categ_ids):
+            if line.product_id.pos_categ_ids and not line.kitchen_screen_id:
                 unhandled_categories.extend(
-                    [c.name for c in line.product_id.pos_categ_ids if c.id not in kitchen_screen.pos_categ_ids.ids])
+                    [c.name for c in line.product_id.pos_categ_ids if c.id not in kitchen_categ_ids])
         if unhandled_categories:
             return {'category': ", ".join(list(set(unhandled_categories)))}
         if pos_order.order_status not in ['ready', 'cancel']:
@@ -319,25 +370,13 @@ class PosOrder(models.Model):
         ], limit=1)
         if not pos_order:
             return False
-        kitchen_screen = self.env["kitchen.screen"].search([
-            ("pos_config_id", "=", config_id)
-        ], limit=1)
-        if not kitchen_screen:
-            return False
-        kitchen_lines = []
-        for line in pos_order.lines:
-            product = line.product_id
-            if product.pos_categ_ids and any(
-                    cat.id in kitchen_screen.pos_categ_ids.ids
-                    for cat in product.pos_categ_ids):
-                kitchen_lines.append(line)
+        kitchen_lines = pos_order.lines.filtered('kitchen_screen_id')
         if not kitchen_lines:
             return False
-        for line in kitchen_lines:
-            line.write({
-                'is_cooking': True,
-                'order_status': 'draft'
-            })
+        kitchen_lines.write({
+            'is_cooking': True,
+            'order_status': 'draft'
+        })
         pos_order.write({
             'is_cooking': True,
             'order_status': 'draft'
@@ -356,11 +395,6 @@ class PosOrder(models.Model):
     @api.model
     def get_kitchen_orders(self, config_id):
         """Get all orders that have kitchen items for the kitchen screen."""
-        kitchen_screen = self.env["kitchen.screen"].search([
-            ("pos_config_id", "=", config_id)
-        ], limit=1)
-        if not kitchen_screen:
-            return []
         kitchen_orders = self.search([
             ('config_id', '=', config_id),
             ('is_cooking', '=', True),
@@ -369,13 +403,7 @@ class PosOrder(models.Model):
         orders_data = []
         for order in kitchen_orders:
             # Get only kitchen lines
-            kitchen_lines = order.lines.filtered(lambda l:
-                                                 l.product_id.pos_categ_ids and any(
-                                                     cat.id in kitchen_screen.pos_categ_ids.ids
-                                                     for cat in
-                                                     l.product_id.pos_categ_ids
-                                                 )
-                                                 )
+            kitchen_lines = order.lines.filtered('kitchen_screen_id')
             if kitchen_lines:
                 line_data = []
                 for line in kitchen_lines:
@@ -446,6 +474,66 @@ class PosOrderLine(models.Model):
     customer_id = fields.Many2one('res.partner', string="Customer",
                                   related='order_id.partner_id',
                                   help='Id of the customer')
+    # Indexed together with write_date in init() for the kitchen feed
+    kitchen_screen_id = fields.Many2one(
+        'kitchen.screen', string="Kitchen Screen", readonly=True, copy=False,
+        ondelete='set null',
+        help='Kitchen screen preparing this line, set when the line is created')
+
+    def init(self):
+        """Index the kitchen routing and route lines created before it: lines
+        already sent to the kitchen and every line of orders still open in it
+        (sent or not yet)"""
+        super().init()
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS pos_order_line_kitchen_screen_write_date_idx
+            ON pos_order_line (kitchen_screen_id, write_date)
+            WHERE kitchen_screen_id IS NOT NULL
+        """)
+        product_categs = self.env['product.template']._fields['pos_categ_ids']
+        screen_categs = self.env['kitchen.screen']._fields['pos_categ_ids']
+        self.env.cr.execute(f"""
+            UPDATE pos_order_line l
+               SET kitchen_screen_id = ks.id
+              FROM pos_order o, product_product pp, kitchen_screen ks
+             WHERE l.kitchen_screen_id IS NULL
+               AND (l.is_cooking OR o.order_status IN ('draft', 'waiting'))
+               AND o.id = l.order_id AND pp.id = l.product_id
+               AND ks.id = (SELECT min(id) FROM kitchen_screen
+                             WHERE pos_config_id = o.config_id)
+               AND EXISTS (
+                   SELECT 1 FROM {product_categs.relation} pc
+                     JOIN {screen_categs.relation} sc
+                       ON sc.{screen_categs.column2} = pc.{product_categs.column2}
+                    WHERE pc.{product_categs.column1} = pp.product_tmpl_id
+                      AND sc.{screen_categs.column1} = ks.id)
+        """)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Route new lines to their kitchen screen"""
+        lines = super().create(vals_list)
+        lines._route_to_kitchen()
+        return lines
+
+    def _route_to_kitchen(self):
+        """Set the kitchen screen of the lines: the screen of the order's POS
+        when it prepares one of the product's POS categories"""
+        routing = self.env['kitchen.screen']._get_routing(
+            self.order_id.config_id.ids)
+        to_route = defaultdict(list)
+        for line in self:
+            screen, categ_ids = routing.get(
+                line.order_id.config_id.id, (None, set()))
+            if screen and categ_ids.intersection(
+                    line.product_id.pos_categ_ids.ids):
+                screen_id = screen.id
+            else:
+                screen_id = False
+            if line.kitchen_screen_id.id != screen_id:
+                to_route[screen_id].append(line.id)
+        for screen_id, line_ids in to_route.items():
+            self.browse(line_ids).write({'kitchen_screen_id': screen_id})
 
     def get_product_details(self, ids):
         """Fetch details for specific order lines."""
@@ -16,6 +16,7 @@ class KitchenScreenDashboard extends Component {
         // Method binding
         this.getCurrentShopId = this.getCurrentShopId.bind(this);
         this.loadOrders = this.loadOrders.bind(this);
+        this.applyFeed = this.applyFeed.bind(this);
         this.startCountdown = this.startCountdown.bind(this);
         this.updateCountdownState = this.updateCountdownState.bind(this);
         this.onPosOrderCreation = this.onPosOrderCreation.bind(this);
@@ -34,6 +35,10 @@ class KitchenScreenDashboard extends Component {
         this.currentShopId = this.getCurrentShopId();
         this.channel = `pos_order_created_${this.currentShopId}`;
         this.countdownIntervals = {};
+        // Cursor of the last kitchen feed, later loads only fetch changes
+        this.feedCursor = null;
+        // Load requested while another one runs: false, "delta" or "full"
+        this.reloadPending = false;
 
         // State management
         this.state = useState({
@@ -58,6 +63,10 @@ class KitchenScreenDashboard extends Component {
             this.autoRefreshInterval = setInterval(() => {
                 this.loadOrders();
             }, 30000);
+            // Full resync now and then, in case a change was missed
+            this.fullRefreshInterval = setInterval(() => {
+                this.loadOrders(true);
+            }, 300000);
         });
 
         onWillUnmount(() => {
@@ -66,6 +75,9 @@ class KitchenScreenDashboard extends Component {
             if (this.autoRefreshInterval) {
                 clearInterval(this.autoRefreshInterval);
             }
+            if (this.fullRefreshInterval) {
+                clearInterval(this.fullRefreshInterval);
+            }
             Object.values(this.countdownIntervals).forEach(interval => {
                 clearInterval(interval);
             });
@@ -84,15 +96,20 @@ class KitchenScreenDashboard extends Component {
         return parseInt(session_shop_id, 10) || 0;
     }
 
-    async loadOrders() {
-        if (this.state.isLoading) return;
+    async loadOrders(full = false) {
+        if (this.state.isLoading) {
+            // Changes notified during a load are fetched right after it; a
+            // requested full reload wins over a delta one
+            this.reloadPending = this.reloadPending === "full" || full ? "full" : "delta";
+            return;
+        }
 
         try {
             this.state.isLoading = true;
-            const result = await this.orm.call("pos.order", "get_details", [this.currentShopId]);
-
-            this.state.order_details = result.orders || [];
-            this.state.lines = result.order_lines || [];
+            const since = full ? null : this.feedCursor;
+            const result = await this.orm.call("pos.order", "get_kitchen_feed", [this.currentShopId, since]);
+            this.applyFeed(result);
+            this.feedCursor = result.cursor;
 
             const activeOrders = this.state.order_details.filter(order => {
                 const configMatch = Array.isArray(order.config_id) ?
@@ -100,7 +117,12 @@ class KitchenScreenDashboard extends Component {
                     order.config_id === this.currentShopId;
                 return configMatch && order.order_status !== 'cancel' && order.state !== 'cancel';
             });
-            const productIds = [...new Set(this.state.lines.map(line => line.product_id[0]))];
+            if (result.full) {
+                this.state.prepare_times = [];
+            }
+            const knownProductIds = new Set(this.state.prepare_times.map(item => item.id));
+            const productIds = [...new Set(this.state.lines.map(line => line.product_id[0]))]
+                .filter(productId => !knownProductIds.has(productId));
             if (productIds.length) {
                 const overTimes = await this.orm.call(
                     "product.product",
@@ -108,13 +130,13 @@ class KitchenScreenDashboard extends Component {
                     [[["id", "in", productIds]], ["id", "prepair_time_minutes"]]
                 );
 
-                this.state.prepare_times = overTimes.map(item => ({
+                this.state.prepare_times = this.state.prepare_times.concat(overTimes.map(item => ({
                     ...item,
                     prepare_time: !item.prepair_time_minutes ? "00:00:00" :
                         typeof item.prepair_time_minutes === 'number' ?
                         parseFloat(item.prepair_time_minutes.toFixed(2)) :
                         item.prepair_time_minutes
-                }));
+                })));
             }
             this.state.draft_count = activeOrders.filter(o => o.order_status === 'draft').length;
             this.state.waiting_count = activeOrders.filter(o => o.order_status === 'waiting').length;
@@ -137,7 +159,34 @@ class KitchenScreenDashboard extends Component {
             console.error("Error loading orders:", error);
         } finally {
             this.state.isLoading = false;
+            if (this.reloadPending) {
+                const mode = this.reloadPending;
+                this.reloadPending = false;
+                this.loadOrders(mode === "full");
+            }
+        }
+    }
+
+    applyFeed(result) {
+        const orders = result.orders || [];
+        const lines = result.order_lines || [];
+        if (result.full) {
+            this.state.order_details = orders;
+            this.state.lines = lines;
+            return;
         }
+        // Changed orders come back whole, with all their kitchen lines
+        const changedOrderIds = new Set([
+            ...orders.map(order => order.id),
+            ...(result.removed_order_ids || []),
+        ]);
+        this.state.order_details = this.state.order_details
+            .filter(order => !changedOrderIds.has(order.id))
+            .concat(orders)
+            .sort((a, b) => (a.date_order < b.date_order ? -1 : a.date_order > b.date_order ? 1 : 0));
+        this.state.lines = this.state.lines
+            .filter(line => !changedOrderIds.has(line.order_id[0]))
+            .concat(lines);
     }
 
     async startCountdown(orderId, timeString,config_id) {
@@ -296,7 +345,7 @@ class KitchenScreenDashboard extends Component {
     }
 
     forceRefresh() {
-        this.loadOrders();
+        this.loadOrders(true);
     }
 }
 
@@ -2,7 +2,7 @@
 
 {
     'name': 'Sheet Forge',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.1.0',
     'category': 'Tools',
     'license': 'LGPL-3',
     'summary': 'OCR document processing with Excel template filling',
@@ -23,7 +23,7 @@
         1. Create a new OCR task
         2. Upload your Excel template with placeholders like {{vendor_name}}, {{invoice_date}}
         3. Upload the source invoice/receipt image or PDF
-        4. Click "Start OCR" to process
+        4. Click "Start OCR" to queue the files (processed in the background)
         5. Review and edit extracted data
         6. Click "Fill Template" to generate output
         7. Download the filled Excel file
@@ -33,6 +33,7 @@
     'depends': [
         'base',
         'mail',
+        'seisei_ocr_queue',
     ],
     'external_dependencies': {
         'python': ['openpyxl'],
@@ -12,6 +12,7 @@ from datetime import datetime
 
 from odoo import models, fields, api
 from odoo.exceptions import UserError
+from odoo.addons.seisei_ocr_queue.tools.pdf_raster import iter_pdf_pages
 
 _logger = logging.getLogger(__name__)
 
@@ -20,25 +21,9 @@ OCR_SERVICE_URL = os.getenv('OCR_SERVICE_URL', 'https://ocr.seisei.tokyo/api/v1'
 OCR_SERVICE_KEY = os.getenv('OCR_SERVICE_KEY', '')
 
 
-def pdf_to_images(pdf_data: bytes, dpi: int = 150):
-    """Convert PDF to images using PyMuPDF"""
-    try:
-        import fitz  # PyMuPDF
-    except ImportError:
-        raise ImportError('PyMuPDF required. Install: pip install PyMuPDF')
-
-    images = []
-    pdf_doc = fitz.open(stream=pdf_data, filetype='pdf')
-
-    for page_num in range(len(pdf_doc)):
-        page = pdf_doc[page_num]
-        mat = fitz.Matrix(dpi / 72, dpi / 72)
-        pix = page.get_pixmap(matrix=mat)
-        img_data = pix.tobytes('jpeg')
-        images.append(img_data)
-
-    pdf_doc.close()
-    return images
+def pdf_to_images(pdf_data: bytes, dpi: int = 150, pages=None, checksum: str = None):
+    """Convert PDF pages to images (all pages unless pages is given)"""
+    return [image for _index, image in iter_pdf_pages(pdf_data, pages=pages, dpi=dpi, checksum=checksum)]
 
 
 def build_ocr_prompt(template_fields: list) -> str:
@@ -340,6 +325,138 @@ class OcrFileSource(models.Model):
     extracted_currency = fields.Char(string='Currency', default='JPY')
     extracted_line_items = fields.Text(string='Line Items (JSON)')
 
+    def _run_ocr(self):
+        """Process this file via the central OCR service (run by the OCR job queue)"""
+        self.ensure_one()
+        task = self.task_id
+        template_fields = task._get_template_fields()
+
+        try:
+            # Decode file data
+            file_data = base64.b64decode(self.source_file)
+            filename = self.source_filename or ''
+
+            # Determine mimetype
+            if filename.lower().endswith('.pdf'):
+                mimetype = 'application/pdf'
+            elif filename.lower().endswith('.png'):
+                mimetype = 'image/png'
+            else:
+                mimetype = 'image/jpeg'
+
+            _logger.info(f"[OCR File] Processing {filename} ({mimetype})")
+
+            # Get tenant ID for usage tracking
+            tenant_id = self.env.cr.dbname
+
+            # Process PDF or image via central OCR service
+            if mimetype == 'application/pdf':
+                try:
+                    # Only the first page is sent; render just that one
+                    # (cached by attachment checksum for retries)
+                    first_page = next(iter_pdf_pages(
+                        file_data, pages=0, checksum=self._source_checksum()
+                    ), None)
+                    if not first_page:
+                        raise Exception('PDF has no pages')
+
+                    # Process first page via central service
+                    result = process_image_via_central_service(
+                        first_page[1], 'image/jpeg', template_fields, tenant_id
+                    )
+                except ImportError as e:
+                    _logger.error(f"[OCR] PDF processing dependency missing: {e}")
+                    result = {'success': False, 'error_code': 'processing_failed'}
+            else:
+                result = process_image_via_central_service(
+                    file_data, mimetype, template_fields, tenant_id
+                )
+
+            if result.get('success'):
+                extracted = result.get('extracted', {})
+
+                # Store all extracted data as JSON
+                update_vals = {
+                    'state': 'done',
+                    'ocr_raw_data': json.dumps(result, ensure_ascii=False, indent=2),
+                    'extracted_data': json.dumps(extracted, ensure_ascii=False, indent=2),
+                    'ocr_error_message': False,
+                }
+
+                # Map common fields
+                update_vals['extracted_vendor_name'] = task._find_field_value(extracted,
+                    ['vendor_name', '仕入先名', '仕入先', 'supplier', 'vendor', '取引先'])
+                update_vals['extracted_invoice_number'] = task._find_field_value(extracted,
+                    ['invoice_number', '請求書番号', '伝票番号', 'invoice_no', 'number'])
+                update_vals['extracted_tax_id'] = task._find_field_value(extracted,
+                    ['tax_id', '登録番号', 'registration_number', '適格請求書発行事業者登録番号'])
+                update_vals['extracted_currency'] = task._find_field_value(extracted,
+                    ['currency', '通貨']) or 'JPY'
+
+                # Total amount
+                total = task._find_field_value(extracted,
+                    ['total', 'total_amount', '合計', '合計金額', '請求金額', 'amount'])
+                if total:
+                    try:
+                        update_vals['extracted_total_amount'] = float(str(total).replace(',', ''))
+                    except:
+                        pass
+
+                # Parse date
+                date_str = task._find_field_value(extracted,
+                    ['date', '日付', 'invoice_date', '請求日', '発行日'])
+                if date_str:
+                    try:
+                        date_str = re.sub(r'[年月]', '-', str(date_str))
+                        date_str = re.sub(r'日', '', date_str)
+                        update_vals['extracted_invoice_date'] = date_str
+                    except Exception:
+                        pass
+
+                # Store line items
+                line_items = extracted.get('line_items')
+                if line_items:
+                    update_vals['extracted_line_items'] = json.dumps(line_items, ensure_ascii=False)
+
+                self.write(update_vals)
+                _logger.info(f"[OCR File] {filename} processed successfully")
+            else:
+                # Get user-friendly error message (hide technical details)
+                error_code = result.get('error_code', 'unknown')
+                user_error = get_user_friendly_error(error_code)
+                self.write({
+                    'state': 'failed',
+                    'ocr_error_message': user_error,
+                })
+                # Log technical details for admin debugging only
+                _logger.warning(f"[OCR] {filename} failed with code: {error_code}")
+
+        except Exception as e:
+            # Log technical details for admin only
+            _logger.exception(f"[OCR] Error processing {self.source_filename}: {e}")
+            # Show user-friendly message (no technical details)
+            user_error = get_user_friendly_error('unexpected_error')
+            self.write({
+                'state': 'failed',
+                'ocr_error_message': user_error,
+            })
+
+    def _source_checksum(self):
+        """Checksum of the stored source file (render cache key)"""
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', 'source_file'),
+        ], limit=1)
+        return attachment.checksum or None
+
+    def _ocr_job_failed(self, error):
+        """Called by the OCR job queue when _run_ocr raised"""
+        self.write({
+            'state': 'failed',
+            'ocr_error_message': get_user_friendly_error('unexpected_error'),
+        })
+
 
 class OcrFileTask(models.Model):
     _name = 'ocr.file.task'
@@ -395,6 +512,7 @@ class OcrFileTask(models.Model):
 
     # === Computed Fields ===
     has_output = fields.Boolean(compute='_compute_has_output', store=False)
+    ocr_progress = fields.Float(string='Progress', compute='_compute_ocr_progress')
 
     # Usage info (computed)
     usage_this_month = fields.Integer(string='Used This Month', compute='_compute_usage_info')
@@ -417,6 +535,13 @@ class OcrFileTask(models.Model):
             else:
                 record.usage_display = f"Used: {usage.image_count} (¥{usage.billable_count * 20} charge)"
 
+    @api.depends('source_file_ids.state')
+    def _compute_ocr_progress(self):
+        for record in self:
+            sources = record.source_file_ids
+            finished = sources.filtered(lambda s: s.state in ('done', 'failed'))
+            record.ocr_progress = len(finished) * 100.0 / len(sources) if sources else 0.0
+
     @api.depends('output_file')
     def _compute_has_output(self):
         for record in self:
@@ -459,7 +584,7 @@ class OcrFileTask(models.Model):
 
     # === Actions ===
     def action_start_ocr(self):
-        """Process all source files with Gemini OCR"""
+        """Queue all source files for OCR; the OCR job queue processes them in the background"""
         self.ensure_one()
 
         if not self.template_file:
@@ -489,139 +614,49 @@ class OcrFileTask(models.Model):
         template_fields = self._get_template_fields()
         _logger.info(f"[OCR File] Using template fields: {template_fields}")
 
-        self.write({'state': 'processing', 'ocr_error_message': False})
-
-        success_count = 0
-        error_messages = []
-        file_index = 0
-
-        for source in self.source_file_ids:
-            if source.state == 'done':
-                success_count += 1
-                continue
-
-            # Add delay between API calls to avoid rate limiting (2 seconds between files)
-            if file_index > 0:
-                time.sleep(2)
-            file_index += 1
-
-            source.write({'state': 'processing'})
-
-            try:
-                # Decode file data
-                file_data = base64.b64decode(source.source_file)
-                filename = source.source_filename or ''
-
-                # Determine mimetype
-                if filename.lower().endswith('.pdf'):
-                    mimetype = 'application/pdf'
-                elif filename.lower().endswith('.png'):
-                    mimetype = 'image/png'
-                else:
-                    mimetype = 'image/jpeg'
-
-                _logger.info(f"[OCR File] Processing {filename} ({mimetype})")
-
-                # Get tenant ID for usage tracking
-                tenant_id = self.env.cr.dbname
+        if not pending_files:
+            self.write({'state': 'done', 'ocr_processed_at': fields.Datetime.now()})
+            return True
 
-                # Process PDF or image via central OCR service
-                if mimetype == 'application/pdf':
-                    try:
-                        images = pdf_to_images(file_data)
-                        if not images:
-                            raise Exception('PDF has no pages')
-
-                        # Process first page via central service
-                        result = process_image_via_central_service(
-                            images[0], 'image/jpeg', template_fields, tenant_id
-                        )
-                    except ImportError as e:
-                        _logger.error(f"[OCR] PDF processing dependency missing: {e}")
-                        result = {'success': False, 'error_code': 'processing_failed'}
-                else:
-                    result = process_image_via_central_service(
-                        file_data, mimetype, template_fields, tenant_id
-                    )
-
-                if result.get('success'):
-                    extracted = result.get('extracted', {})
-
-                    # Store all extracted data as JSON
-                    update_vals = {
-                        'state': 'done',
-                        'ocr_raw_data': json.dumps(result, ensure_ascii=False, indent=2),
-                        'extracted_data': json.dumps(extracted, ensure_ascii=False, indent=2),
-                        'ocr_error_message': False,
-                    }
-
-                    # Map common fields
-                    update_vals['extracted_vendor_name'] = self._find_field_value(extracted,
-                        ['vendor_name', '仕入先名', '仕入先', 'supplier', 'vendor', '取引先'])
-                    update_vals['extracted_invoice_number'] = self._find_field_value(extracted,
-                        ['invoice_number', '請求書番号', '伝票番号', 'invoice_no', 'number'])
-                    update_vals['extracted_tax_id'] = self._find_field_value(extracted,
-                        ['tax_id', '登録番号', 'registration_number', '適格請求書発行事業者登録番号'])
-                    update_vals['extracted_currency'] = self._find_field_value(extracted,
-                        ['currency', '通貨']) or 'JPY'
-
-                    # Total amount
-                    total = self._find_field_value(extracted,
-                        ['total', 'total_amount', '合計', '合計金額', '請求金額', 'amount'])
-                    if total:
-                        try:
-                            update_vals['extracted_total_amount'] = float(str(total).replace(',', ''))
-                        except:
-                            pass
-
-                    # Parse date
-                    date_str = self._find_field_value(extracted,
-                        ['date', '日付', 'invoice_date', '請求日', '発行日'])
-                    if date_str:
-                        try:
-                            date_str = re.sub(r'[年月]', '-', str(date_str))
-                            date_str = re.sub(r'日', '', date_str)
-                            update_vals['extracted_invoice_date'] = date_str
-                        except Exception:
-                            pass
-
-                    # Store line items
-                    line_items = extracted.get('line_items')
-                    if line_items:
-                        update_vals['extracted_line_items'] = json.dumps(line_items, ensure_ascii=False)
-
-                    source.write(update_vals)
-                    success_count += 1
-                    _logger.info(f"[OCR File] {filename} processed successfully")
-                else:
-                    # Get user-friendly error message (hide technical details)
-                    error_code = result.get('error_code', 'unknown')
-                    user_error = get_user_friendly_error(error_code)
-                    source.write({
-                        'state': 'failed',
-                        'ocr_error_message': user_error,
-                    })
-                    error_messages.append(f"{filename}: {user_error}")
-                    # Log technical details for admin debugging only
-                    _logger.warning(f"[OCR] {filename} failed with code: {error_code}")
+        pending_files.write({'state': 'processing', 'ocr_error_message': False})
+        self.write({'state': 'processing', 'ocr_error_message': False})
+        self.env['ocr.job'].enqueue(pending_files, '_run_ocr', batch=self)
 
-            except Exception as e:
-                # Log technical details for admin only
-                _logger.exception(f"[OCR] Error processing {source.source_filename}: {e}")
-                # Show user-friendly message (no technical details)
-                user_error = get_user_friendly_error('unexpected_error')
-                source.write({
-                    'state': 'failed',
-                    'ocr_error_message': user_error,
-                })
-                error_messages.append(f"{source.source_filename}: {user_error}")
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'ocr.file.task',
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'current',
+            'context': {
+                'notification': {
+                    'title': 'OCR Started',
+                    'message': f'{file_count} file(s) queued. Progress is shown on the task.',
+                    'type': 'info',
+                }
+            }
+        }
 
+    def _ocr_job_progress(self, jobs):
+        """Called by the OCR job queue as source files finish"""
+        self.ensure_one()
+        finished = self.source_file_ids.filtered(lambda s: s.id in jobs.mapped('res_id'))
+        success_count = len(finished.filtered(lambda s: s.state == 'done'))
         # Update usage count for successfully processed files
         if success_count > 0:
-            Usage = self.env['ocr.file.usage']
-            Usage.increment_usage(success_count)
+            self.env['ocr.file.usage'].increment_usage(success_count, company_id=jobs[:1].user_id.company_id.id)
             _logger.info(f"[OCR File] Incremented usage by {success_count}")
 
+        if self.state != 'processing' or self.source_file_ids.filtered(
+                lambda s: s.state in ('pending', 'processing')):
+            return
+
+        success_count = len(self.source_file_ids.filtered(lambda s: s.state == 'done'))
+        error_messages = [
+            f"{s.source_filename}: {s.ocr_error_message}"
+            for s in self.source_file_ids.filtered(lambda s: s.state == 'failed')
+        ]
+
         # Update task state
         if success_count == len(self.source_file_ids):
             self.write({
@@ -640,27 +675,16 @@ class OcrFileTask(models.Model):
                 'ocr_error_message': '; '.join(error_messages[:3]),
             })
 
-        # Return action to reload the form
         message = f'{success_count} file(s) processed successfully.'
         msg_type = 'success'
         if error_messages:
             message = f'{success_count}/{len(self.source_file_ids)} files processed. {len(error_messages)} failed.'
             msg_type = 'warning'
-
-        return {
-            'type': 'ir.actions.act_window',
-            'res_model': 'ocr.file.task',
-            'res_id': self.id,
-            'view_mode': 'form',
-            'target': 'current',
-            'context': {
-                'notification': {
-                    'title': 'OCR Completed',
-                    'message': message,
-                    'type': msg_type,
-                }
-            }
-        }
+        self.env['bus.bus']._sendone(self.create_uid.partner_id, 'simple_notification', {
+            'title': f'OCR Completed: {self.name}',
+            'message': message,
+            'type': msg_type,
+        })
 
     def _find_field_value(self, data: dict, possible_keys: list):
         """Find value in extracted data by trying multiple possible keys"""
@@ -730,6 +754,7 @@ class OcrFileTask(models.Model):
 
     def action_reset(self):
         """Reset task to draft state"""
+        self.env['ocr.job'].cancel_batch(self)
         for source in self.source_file_ids:
             source.write({
                 'state': 'pending',
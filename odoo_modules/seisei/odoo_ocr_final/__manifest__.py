@@ -1,6 +1,6 @@
 {
     'name': 'Financial OCR Integration',
-    'version': '18.0.13.13.0',
+    'version': '18.0.13.15.0',
     'category': 'Accounting',
     'summary': 'AI-powered OCR for Purchase Orders, Invoices, and Expenses',
     'description': '''
@@ -25,11 +25,11 @@ Features:
 - Chatter-integrated upload zone
 - Auto-compress images to 100KB
 - Batch OCR with real-time progress tracking
-- Background processing via cron job
+- Background processing via the shared OCR job queue
     ''',
     'author': 'Seisei',
     'website': 'https://seisei.co.jp',
-    'depends': ['base', 'account', 'purchase', 'mail', 'hr_expense'],
+    'depends': ['base', 'account', 'purchase', 'mail', 'hr_expense', 'seisei_ocr_queue'],
     'data': [
         'security/ir.model.access.csv',
         'data/server_actions.xml',
@@ -1,6 +1,7 @@
 from . import llm_ocr
 from . import ocr_usage
 from . import ocr_batch_progress
+from . import ocr_name_matcher
 from . import account_move
 from . import purchase_order
 from . import hr_expense
@@ -5,14 +5,17 @@ import logging
 import base64
 import os
 import re
-import time
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
 
+from .name_index import contains_full_name, unique_match
+
 _logger = logging.getLogger(__name__)
 
-# Batch OCR configuration
-BATCH_OCR_DELAY = 2  # Seconds between each OCR call to avoid rate limiting
+# Fuzzy score a vendor name needs when it neither equals nor contains the OCR'd name
+PARTNER_MATCH_THRESHOLD = 0.9
+# Score a product name containing (or contained in) the OCR'd name needs
+PRODUCT_MATCH_THRESHOLD = 0.9
 
 
 class AccountMove(models.Model):
@@ -299,6 +302,17 @@ class AccountMove(models.Model):
             _logger.info('[OCR] Detected FAST prompt format, creating Japanese accounting entries')
             return self._create_japanese_accounting_entries(extracted, is_purchase)
 
+        # Match the product and suggested account names of all lines at once
+        Matcher = self.env['ocr.name.matcher']
+        company = self.company_id or self.env.company
+        product_matches = Matcher.match('product', [
+            item.get('product_name') or item.get('name', '') for item in line_items
+        ], company)
+        account_matches = Matcher.match('account', [
+            item.get('suggested_account') for item in line_items
+        ], company)
+        products = {}  # product name -> product, so repeated names reuse a created product
+
         for item in line_items:
             # Support both old format (product_name) and new format (name)
             product_name = item.get('product_name') or item.get('name', '')
@@ -389,7 +403,13 @@ class AccountMove(models.Model):
                 continue
 
             # Find or create product
-            product = self._find_or_create_product(product_name, price_excl, is_sale=is_sale)
+            product = products.get(product_name)
+            if not product:
+                product = self._find_or_create_product(
+                    product_name, price_excl, is_sale=is_sale,
+                    candidates=product_matches.get(product_name, []),
+                )
+                products[product_name] = product
             if not product:
                 _logger.warning(f'[OCR] Could not find/create product: {product_name}')
                 continue
@@ -411,7 +431,7 @@ class AccountMove(models.Model):
                     if account:
                         _logger.info(f'[OCR] Using suggested_account_code "{suggested_code}" -> {account.code} {account.name}')
                 if not account and suggested:
-                    account = self._search_account_by_name(suggested)
+                    account = self._search_account_by_name(suggested, candidates=account_matches.get(suggested, []))
                     if account:
                         _logger.info(f'[OCR] Using suggested_account "{suggested}" -> {account.code} {account.name}')
 
@@ -680,32 +700,25 @@ class AccountMove(models.Model):
         account = Account.search([('code', '=like', code + '%')] + base_domain, limit=1)
         return account or False
 
-    def _search_account_by_name(self, name):
+    def _search_account_by_name(self, name, candidates=None):
         """Search account by name across multiple languages (ja_JP, zh_CN, en_US).
 
         OCR returns Japanese account names (e.g. 旅費交通費) but user's Odoo
-        may be in Chinese or English. Odoo 18 stores names as jsonb and ORM
-        searches only in current user language by default.
+        may be in Chinese or English. Odoo 18 stores names as jsonb; the
+        ocr.name.matcher index holds every translation, so one lookup covers
+        exact and partial matches in all languages.
         Excludes deprecated accounts to prefer active Yayoi chart accounts.
+
+        Args:
+            candidates: [(account, score)] from an earlier batched
+                ocr.name.matcher call, to skip the lookup
         """
-        Account = self.env['account.account']
-        company = self.company_id or self.env.company
-        base_domain = [('company_ids', 'in', [company.id]), ('deprecated', '=', False)]
-        # 1. Try current user language
-        account = Account.search([('name', '=', name)] + base_domain, limit=1)
-        if account:
-            return account
-        # 2. Try Japanese (OCR returns Japanese names)
-        account = Account.with_context(lang='ja_JP').search([('name', '=', name)] + base_domain, limit=1)
-        if account:
-            return account
-        # 3. Fuzzy match in current language
-        account = Account.search([('name', 'ilike', name)] + base_domain, limit=1)
-        if account:
-            return account
-        # 4. Fuzzy match in Japanese
-        account = Account.with_context(lang='ja_JP').search([('name', 'ilike', name)] + base_domain, limit=1)
-        return account or False
+        if not name:
+            return False
+        if candidates is None:
+            company = self.company_id or self.env.company
+            candidates = self.env['ocr.name.matcher'].match('account', [name], company).get(name, [])
+        return candidates[0][0] if candidates else False
 
     def _infer_account_from_keywords(self, text_sources):
         """Infer account from keywords when OCR suggested_account is missing.
@@ -733,44 +746,53 @@ class AccountMove(models.Model):
         if not combined:
             return False
 
-        for account_name, keywords in KEYWORD_ACCOUNT_MAP:
-            if any(kw in combined for kw in keywords):
-                account = self._search_account_by_name(account_name)
-                if account:
-                    _logger.info(f'[OCR] Keyword inference: "{account_name}" matched -> {account.code} {account.name}')
-                    return account
+        account_names = [
+            account_name for account_name, keywords in KEYWORD_ACCOUNT_MAP
+            if any(kw in combined for kw in keywords)
+        ]
+        if not account_names:
+            return False
+
+        company = self.company_id or self.env.company
+        matches = self.env['ocr.name.matcher'].match('account', account_names, company)
+        for account_name in account_names:
+            account = self._search_account_by_name(account_name, candidates=matches.get(account_name, []))
+            if account:
+                _logger.info(f'[OCR] Keyword inference: "{account_name}" matched -> {account.code} {account.name}')
+                return account
         return False
 
-    def _find_or_create_product(self, name, price=0, is_sale=False):
+    def _find_or_create_product(self, name, price=0, is_sale=False, candidates=None):
         """Find product by name, create if not found.
 
         Args:
             name: Product name to search/create
             price: Default price for new products
             is_sale: If True, create as saleable product; if False, as purchaseable
+            candidates: [(product, score)] from an earlier batched
+                ocr.name.matcher call, to skip the lookup
         """
         if not name or len(name) < 2:
             return False
 
         Product = self.env['product.product']
+        company = self.company_id or self.env.company
 
-        # Exact match
-        product = Product.search([('name', '=', name)], limit=1)
-        if product:
+        if candidates is None:
+            candidates = self.env['ocr.name.matcher'].match('product', [name], company).get(name, [])
+        # Similar names are usually other variants (A4/A3, 黒/赤): only reuse a
+        # product that is the same item, else create one
+        if unique_match(name, [(product.name, score) for product, score in candidates],
+                        PRODUCT_MATCH_THRESHOLD) is not None:
+            product, score = candidates[0]
+            _logger.info(f'[OCR] Matched product "{name}" -> {product.display_name} ({score:.2f})')
             return product
 
-        # Fuzzy match (contains)
-        product = Product.search([('name', 'ilike', name)], limit=1)
+        # The matcher index may trail products created in the last seconds
+        product = Product.search([('name', '=', name)], limit=1)
         if product:
             return product
 
-        # Word match - try significant words
-        for word in name.split():
-            if len(word) >= 3:  # Skip very short words
-                product = Product.search([('name', 'ilike', word)], limit=1)
-                if product:
-                    return product
-
         # Create new product
         _logger.info(f'[OCR] Creating product: {name} (sale={is_sale})')
         try:
@@ -786,6 +808,20 @@ class AccountMove(models.Model):
             _logger.error(f'[OCR] Failed to create product: {e}')
             return False
 
+    @api.model
+    def _is_ocr_partner_match(self, name, partner, score, tax_id=None):
+        """Whether a scored partner candidate is the vendor named on the document.
+
+        Accepted: the same normalized name, a partner name containing the whole
+        OCR'd name (legal form included, e.g. a branch suffix), or a score of
+        at least PARTNER_MATCH_THRESHOLD with the same VAT when a tax_id was read.
+        """
+        if score == 1.0 or contains_full_name(name, partner.name):
+            return True
+        if score < PARTNER_MATCH_THRESHOLD:
+            return False
+        return not tax_id or partner.vat == tax_id
+
     def _find_or_create_partner(self, name, tax_id=None, address=None):
         """Find or create supplier partner with tax_id (VAT) and address support.
 
@@ -804,8 +840,21 @@ class AccountMove(models.Model):
                 _logger.info(f'[OCR] Found partner by tax_id: {tax_id}')
                 return partner.id
 
+        # Scored candidates; a score of 1.0 is the same name once width, kana
+        # and legal forms (株式会社, (株)) are folded. Similar names are often
+        # different companies (山田建設 vs 山田建設工業), so only keep those
+        # naming the same vendor.
+        company = self.company_id or self.env.company
+        candidates = self.env['ocr.name.matcher'].match('partner', [name], company, limit=10).get(name, [])
+        candidates = [
+            (partner, score) for partner, score in candidates
+            if self._is_ocr_partner_match(name, partner, score, tax_id)
+        ]
+        suppliers = [partner for partner, _score in candidates if partner.supplier_rank > 0]
+        exact = [partner for partner, score in candidates if score == 1.0 and partner.supplier_rank > 0]
+
         # Exact supplier match by name
-        partner = Partner.search([('name', '=', name), ('supplier_rank', '>', 0)], limit=1)
+        partner = exact[0] if exact else False
         if partner:
             # If we have new tax_id or address, update the partner
             update_vals = {}
@@ -818,8 +867,8 @@ class AccountMove(models.Model):
                 _logger.info(f'[OCR] Updated partner {name} with: {update_vals}')
             return partner.id
 
-        # Fuzzy supplier match
-        partner = Partner.search([('name', 'ilike', name), ('supplier_rank', '>', 0)], limit=1)
+        # Supplier whose name contains the OCR'd name, or a near-identical one
+        partner = suppliers[0] if suppliers else False
         if partner:
             # For chain stores, if tax_id is different, create a new branch
             if tax_id and partner.vat and partner.vat != tax_id:
@@ -845,7 +894,10 @@ class AccountMove(models.Model):
             return partner.id
 
         # Any contact match
-        partner = Partner.search([('name', 'ilike', name)], limit=1)
+        partner = candidates[0][0] if candidates else False
+        if not partner:
+            # The matcher index may trail partners created in the last seconds
+            partner = Partner.search([('name', '=', name)], limit=1)
         if partner:
             partner.write({'supplier_rank': 1})
             if tax_id and not partner.vat:
@@ -875,7 +927,8 @@ class AccountMove(models.Model):
     def action_batch_send_to_ocr(self):
         """
         Batch OCR processing for multiple selected invoices.
-        Queues records for processing and starts the batch job.
+        Queues one OCR job per invoice; the job dispatcher processes them in
+        the background and the batch progress widget shows live progress.
         """
         # Filter records that can be processed
         to_process = self.filtered(
@@ -896,59 +949,40 @@ class AccountMove(models.Model):
                 }
             }
 
+        batch = self.env['ocr.batch.progress'].create({
+            'state': 'queued',
+            'total_count': len(to_process),
+            'move_ids': [(6, 0, to_process.ids)],
+        })
+
         # Mark all as queued for processing
         to_process.write({
             'ocr_status': 'processing',
-            'ocr_error_message': _('Queued for batch processing...'),
+            'ocr_error_message': _('Batch #%s: Queued for processing...') % batch.id,
         })
-
-        # Commit to save the status before processing
-        self.env.cr.commit()
-
-        # Process each record with delay
-        success_count = 0
-        fail_count = 0
-        total = len(to_process)
-
-        for idx, record in enumerate(to_process):
-            try:
-                _logger.info(f'[Batch OCR] Processing {idx + 1}/{total}: Invoice {record.id}')
-                record._process_single_ocr()
-                success_count += 1
-
-                # Commit after each successful processing
-                self.env.cr.commit()
-
-                # Delay between API calls to avoid rate limiting
-                if idx < total - 1:
-                    time.sleep(BATCH_OCR_DELAY)
-
-            except Exception as e:
-                fail_count += 1
-                _logger.error(f'[Batch OCR] Failed invoice {record.id}: {e}')
-                record.write({
-                    'ocr_status': 'failed',
-                    'ocr_error_message': str(e)[:500],
-                })
-                self.env.cr.commit()
-
-        # Return notification with results
-        message = _('Batch OCR completed: %d succeeded, %d failed out of %d total.') % (
-            success_count, fail_count, total
-        )
+        self.env['ocr.job'].enqueue(to_process, '_process_single_ocr', batch=batch)
+        _logger.info(f'[Batch OCR] Queued batch {batch.id} with {len(to_process)} invoices')
 
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
             'params': {
-                'title': _('Batch OCR Complete'),
-                'message': message,
-                'type': 'success' if fail_count == 0 else 'warning',
-                'sticky': True,
+                'title': _('Batch OCR'),
+                'message': _('%d invoices queued for OCR. Progress is shown while they are processed.') % len(
+                    to_process),
+                'type': 'info',
+                'sticky': False,
                 'next': {'type': 'ir.actions.client', 'tag': 'reload'},
             }
         }
 
+    def _ocr_job_failed(self, error):
+        """Called by the OCR job queue when _process_single_ocr raised"""
+        self.write({
+            'ocr_status': 'failed',
+            'ocr_error_message': str(error)[:500],
+        })
+
     def _process_single_ocr(self):
         """
         Process OCR for a single record without UI interaction.
@@ -1039,33 +1073,22 @@ class AccountMove(models.Model):
 
     @api.model
     def cron_process_ocr_queue(self):
-        """Cron job to process queued OCR records."""
-        _logger.info('[OCR Cron] Processing queued OCR records')
+        """Cron job: queue invoices left in 'processing' without an OCR job.
 
+        The ocr.job dispatcher does the processing; this only picks up
+        records marked for OCR by other paths (or before the job queue).
+        """
         to_process = self.search([
             ('ocr_status', '=', 'processing'),
             ('message_main_attachment_id', '!=', False),
             ('move_type', 'in', ('in_invoice', 'in_refund', 'out_invoice', 'out_refund')),
-        ], limit=10, order='write_date asc')
+        ], limit=100, order='write_date asc')
 
-        if not to_process:
-            _logger.info('[OCR Cron] No queued records to process')
-            return
-
-        for idx, record in enumerate(to_process):
-            try:
-                _logger.info(f'[OCR Cron] Processing {idx + 1}/{len(to_process)}: Invoice {record.id}')
-                record._process_single_ocr()
-                self.env.cr.commit()
-                if idx < len(to_process) - 1:
-                    time.sleep(BATCH_OCR_DELAY)
-            except Exception as e:
-                _logger.error(f'[OCR Cron] Failed invoice {record.id}: {e}')
-                record.write({
-                    'ocr_status': 'failed',
-                    'ocr_error_message': str(e)[:500],
-                })
-                self.env.cr.commit()
+        queued = self.env['ocr.job'].active_job_res_ids(self._name, to_process.ids)
+        orphans = to_process.filtered(lambda r: r.id not in queued)
+        if orphans:
+            _logger.info(f'[OCR Cron] Queueing {len(orphans)} invoices without an OCR job')
+            self.env['ocr.job'].enqueue(orphans, '_process_single_ocr')
 
     def _create_japanese_accounting_entries(self, extracted, is_purchase=True):
         """Create accounting entries according to Japanese GAAP for FAST prompt receipts.
@@ -227,34 +227,14 @@ EXPENSE_OCR_PROMPT = '''あなたはレシート・領収書のOCR専門家で
 JSONのみを返す（説明文不要）'''
 
 
-def pdf_to_images(pdf_data: bytes, dpi: int = 150) -> List[bytes]:
-    """Convert PDF to images using PyMuPDF"""
-    try:
-        import fitz  # PyMuPDF
-    except ImportError:
-        _logger.error('[OCR] PyMuPDF not installed')
-        raise ImportError('PyMuPDF required. Install: pip install PyMuPDF')
-
-    images = []
-
-    try:
-        pdf_doc = fitz.open(stream=pdf_data, filetype='pdf')
-
-        for page_num in range(len(pdf_doc)):
-            page = pdf_doc[page_num]
-            mat = fitz.Matrix(dpi / 72, dpi / 72)
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes('jpeg')
-            images.append(img_data)
-            _logger.info(f'[OCR] PDF page {page_num + 1}/{len(pdf_doc)} converted')
-
-        pdf_doc.close()
-
-    except Exception as e:
-        _logger.exception(f'[OCR] PDF conversion error: {e}')
-        raise
+def pdf_to_images(pdf_data: bytes, dpi: int = 150, pages=None, checksum: str = None) -> List[bytes]:
+    """Convert PDF pages to JPEG images (all pages unless pages is given).
 
-    return images
+    Renders through seisei_ocr_queue's cached rasterizer; use iter_pdf_pages
+    directly to get pages one at a time.
+    """
+    from odoo.addons.seisei_ocr_queue.tools.pdf_raster import iter_pdf_pages
+    return [image for _index, image in iter_pdf_pages(pdf_data, pages=pages, dpi=dpi, checksum=checksum)]
 
 
 def process_document(file_data: bytes, mimetype: str, tenant_id: str = 'default') -> Dict[str, Any]:
@@ -347,26 +327,50 @@ def process_bank_statement(file_data: bytes, mimetype: str, tenant_id: str = 'de
         isinstance(file_data, bytes) and file_data[:5] == b'%PDF-'
     )
 
-    if is_pdf:
+    # All pages in one request, OCR'd concurrently by the service
+    page_results = _call_ocr_service_batch(
+        file_data, mimetype, is_pdf, tenant_id, BANK_STATEMENT_TEMPLATE_FIELDS, 'bank_statement',
+    )
+    if page_results is None:
+        # Service without /ocr/batch: render locally (one page in memory at a
+        # time) and send page by page
+        page_results = []
+        # Only rendering errors are conversion errors: pages are rendered
+        # lazily, so guard each step of the iterator, not the service calls
         try:
-            page_images = pdf_to_images(file_data)
+            if is_pdf:
+                from odoo.addons.seisei_ocr_queue.tools.pdf_raster import iter_pdf_pages, pdf_page_count
+                page_count = pdf_page_count(file_data)
+                page_images = (image for _index, image in iter_pdf_pages(file_data))
+            else:
+                page_count = 1
+                page_images = iter([file_data])
+            while True:
+                img_data = next(page_images, None)
+                if img_data is None:
+                    break
+                _logger.info(f'[OCR-BankStmt] Processing page {len(page_results) + 1}/{page_count}')
+                try:
+                    result = _call_ocr_service_raw(
+                        img_data, 'image/jpeg' if is_pdf else mimetype,
+                        tenant_id, BANK_STATEMENT_TEMPLATE_FIELDS, 'bank_statement',
+                    )
+                except Exception as e:
+                    _logger.exception(f'[OCR-BankStmt] OCR service call failed: {e}')
+                    result = {'success': False, 'error': f'OCRサービスエラー: {e}'}
+                page_results.append(result)
         except Exception as e:
             _logger.exception(f'[OCR-BankStmt] PDF conversion failed: {e}')
             return {'success': False, 'error': f'PDF変換エラー: {e}'}
-    else:
-        page_images = [file_data]
+    elif isinstance(page_results, dict):
+        return page_results
 
     all_transactions = []
     first_page_header = {}
     last_page_header = {}
     errors = []
 
-    for i, img_data in enumerate(page_images):
-        _logger.info(f'[OCR-BankStmt] Processing page {i + 1}/{len(page_images)}')
-        result = _call_ocr_service_raw(
-            img_data, 'image/jpeg' if is_pdf else mimetype,
-            tenant_id, BANK_STATEMENT_TEMPLATE_FIELDS, 'bank_statement',
-        )
+    for i, result in enumerate(page_results):
         if result.get('success'):
             extracted = result.get('extracted', {})
             txns = extracted.get('transactions', [])
@@ -402,7 +406,7 @@ def process_bank_statement(file_data: bytes, mimetype: str, tenant_id: str = 'de
     return {
         'success': True,
         'extracted': merged,
-        'pages': len(page_images),
+        'pages': len(page_results),
     }
 
 
@@ -430,9 +434,68 @@ def _deduplicate_bank_transactions(transactions: list) -> list:
     return unique
 
 
-def _call_ocr_service_raw(file_data: bytes, mimetype: str, tenant_id: str,
-                          template_fields: List[str], output_level: str = 'accounting') -> Dict[str, Any]:
-    """Call OCR service and return raw extracted data without invoice-specific normalization."""
+# OCR service URLs that answered 404 on the binary upload endpoint
+_UPLOAD_UNSUPPORTED = set()
+
+
+def _post_ocr_document(ocr_url: str, ocr_key: str, file_data: bytes, mimetype: str, tenant_id: str,
+                       template_fields: List[str], output_level: str, timeout: int = 120):
+    """POST one document to the OCR service's process endpoint.
+
+    Sends the raw bytes as multipart to /ocr/process/upload, avoiding the
+    base64-in-JSON copies. Falls back to the JSON endpoint for services that
+    predate the upload endpoint.
+    """
+    headers = {}
+    if ocr_key:
+        headers['X-Service-Key'] = ocr_key
+
+    if ocr_url not in _UPLOAD_UNSUPPORTED:
+        response = requests.post(
+            f'{ocr_url}/ocr/process/upload',
+            files={'file': ('document', file_data, mimetype)},
+            data={
+                'mime_type': mimetype,
+                'template_fields': json.dumps(template_fields),
+                'tenant_id': tenant_id,
+                'output_level': output_level,
+            },
+            headers=headers,
+            timeout=timeout,
+        )
+        if response.status_code != 404:
+            return response
+        _logger.info(f'[OCR] {ocr_url} has no upload endpoint, using JSON')
+        _UPLOAD_UNSUPPORTED.add(ocr_url)
+
+    headers['Content-Type'] = 'application/json'
+    payload = {
+        'image_data': base64.standard_b64encode(file_data).decode('utf-8'),
+        'mime_type': mimetype,
+        'template_fields': template_fields,
+        'tenant_id': tenant_id,
+        'output_level': output_level,
+    }
+    return requests.post(
+        f'{ocr_url}/ocr/process',
+        json=payload,
+        headers=headers,
+        timeout=timeout,
+    )
+
+
+def _call_ocr_service_batch(file_data: bytes, mimetype: str, is_pdf: bool, tenant_id: str,
+                            template_fields: List[str], output_level: str = 'accounting'):
+    """Send a whole document to the service's batch endpoint.
+
+    The service rasterizes PDFs itself, OCRs the pages concurrently and
+    streams one NDJSON line per page as it completes.
+
+    Returns:
+        list of per-page results in page order (same shape as
+        _call_ocr_service_raw), a failure dict, or None when the service
+        has no batch endpoint
+    """
     try:
         config = _get_ocr_config()
         ocr_url = config['url']
@@ -445,18 +508,75 @@ def _call_ocr_service_raw(file_data: bytes, mimetype: str, tenant_id: str,
             headers['X-Service-Key'] = ocr_key
 
         payload = {
-            'image_data': b64_data,
-            'mime_type': mimetype,
             'template_fields': template_fields,
             'tenant_id': tenant_id,
             'output_level': output_level,
         }
+        if is_pdf:
+            payload['pdf_data'] = b64_data
+        else:
+            payload['items'] = [{'image_data': b64_data, 'mime_type': mimetype}]
 
-        response = requests.post(
-            f'{ocr_url}/ocr/process',
+        with requests.post(
+            f'{ocr_url}/ocr/batch',
             json=payload,
             headers=headers,
-            timeout=120,
+            timeout=(10, 300),
+            stream=True,
+        ) as response:
+            if response.status_code in (404, 405, 501):
+                return None
+            if response.status_code != 200:
+                body = response.text[:500] if response.text else 'no body'
+                _logger.error(f'[OCR] Batch HTTP {response.status_code}: {body}')
+                return {'success': False, 'error': f'OCR service error {response.status_code}: {body}'}
+
+            results = {}
+            count = None
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                item = json.loads(line)
+                if item.get('done'):
+                    count = item.get('count')
+                    break
+                _logger.info(f'[OCR-Batch] Page {item["index"] + 1} done, success={item.get("success")}')
+                if item.get('skipped'):
+                    # Blank PDF page, not OCR'd
+                    results[item['index']] = None
+                elif item.get('success'):
+                    results[item['index']] = {
+                        'success': True,
+                        'extracted': item.get('extracted') or {},
+                        'raw_response': item.get('raw_response', ''),
+                    }
+                else:
+                    results[item['index']] = {'success': False, 'error': item.get('error_code', 'Unknown error')}
+
+        if count is None:
+            # Stream ended early
+            count = max(results, default=-1) + 1
+        page_results = [results.get(index, {'success': False, 'error': 'missing result'})
+                        for index in range(count)]
+        return [result for result in page_results if result is not None]
+
+    except requests.exceptions.Timeout:
+        return {'success': False, 'error': 'OCR service timeout'}
+    except Exception as e:
+        _logger.exception(f'[OCR-Batch] Service call error: {e}')
+        return {'success': False, 'error': str(e)}
+
+
+def _call_ocr_service_raw(file_data: bytes, mimetype: str, tenant_id: str,
+                          template_fields: List[str], output_level: str = 'accounting') -> Dict[str, Any]:
+    """Call OCR service and return raw extracted data without invoice-specific normalization."""
+    try:
+        config = _get_ocr_config()
+        ocr_url = config['url']
+        ocr_key = config['key']
+
+        response = _post_ocr_document(
+            ocr_url, ocr_key, file_data, mimetype, tenant_id, template_fields, output_level,
         )
 
         if response.status_code != 200:
@@ -558,25 +678,9 @@ def _call_ocr_service(file_data: bytes, mimetype: str, tenant_id: str,
 
         _logger.info(f'[OCR] Calling service at {ocr_url}, output_level={output_level}, key present: {bool(ocr_key)}')
 
-        b64_data = base64.standard_b64encode(file_data).decode('utf-8')
-
-        headers = {'Content-Type': 'application/json'}
-        if ocr_key:
-            headers['X-Service-Key'] = ocr_key
-
-        payload = {
-            'image_data': b64_data,
-            'mime_type': mimetype,
-            'template_fields': template_fields,
-            'tenant_id': tenant_id,
-            'output_level': output_level,  # 'summary' or 'accounting'
-        }
-
-        response = requests.post(
-            f'{ocr_url}/ocr/process',
-            json=payload,
-            headers=headers,
-            timeout=120
+        response = _post_ocr_document(
+            ocr_url, ocr_key, file_data, mimetype, tenant_id, template_fields,
+            output_level,  # 'summary' or 'accounting'
         )
 
         if response.status_code != 200:
@@ -0,0 +1,174 @@
+"""
+Normalized name index for OCR matching
+
+OCR text and master data rarely agree byte for byte: ＡＢＣ vs ABC, ｺｰﾋｰ vs
+コーヒー, ほっかほっか亭 vs ホッカホッカ亭, 株式会社 prefixes. normalize_name()
+folds those differences away and NameIndex answers fuzzy lookups from
+in-memory trigram sets, so matching the lines of a document costs no SQL.
+
+Scores are between 0 and 1:
+    1.0         same normalized name
+    0.5 - 1.0   one name contains the other (longer overlap scores higher)
+    otherwise   trigram similarity |A & B| / |A | B| (as pg_trgm similarity)
+
+Pure Python (no Odoo imports) so it can be tested standalone.
+"""
+import unicodedata
+from collections import defaultdict
+
+# Legal forms are noise for matching: 株式会社セイセイ == (株)セイセイ == セイセイ
+LEGAL_FORMS = (
+    '株式会社', '有限会社', '合同会社', '合資会社', '合名会社',
+    '一般社団法人', '一般財団法人', '特定非営利活動法人',
+    '(株)', '(有)', '(同)', '(合)', '(資)', '(名)',
+)
+
+# Variant kanji common in Japanese company and person names
+KANJI_VARIANTS = str.maketrans({
+    '髙': '高', '﨑': '崎', '嵜': '崎', '邊': '辺', '邉': '辺', '齋': '斎', '齊': '斉', '濵': '浜',
+})
+
+_HIRAGANA_START, _HIRAGANA_END = 0x3041, 0x3096
+_KATAKANA_OFFSET = 0x60
+
+
+def _hiragana_to_katakana(text):
+    return ''.join(
+        chr(ord(ch) + _KATAKANA_OFFSET) if _HIRAGANA_START <= ord(ch) <= _HIRAGANA_END else ch
+        for ch in text
+    )
+
+
+def normalize_name(text, keep_legal_forms=False):
+    """Fold width, case, kana and legal forms; drop spaces and punctuation.
+
+    NFKC turns full-width ASCII into ASCII and half-width katakana into
+    full-width (ｺｰﾋｰ -> コーヒー), ㈱ into (株). Hiragana becomes katakana so
+    both spellings of a name meet.
+    """
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', str(text)).casefold()
+    if not keep_legal_forms:
+        for form in LEGAL_FORMS:
+            text = text.replace(form, '')
+    text = _hiragana_to_katakana(text.translate(KANJI_VARIANTS))
+    # Keep letters, digits and marks; ー (prolonged sound) is a letter (Lm)
+    return ''.join(ch for ch in text if unicodedata.category(ch)[0] in 'LNM')
+
+
+def contains_full_name(query, name):
+    """Whether the whole query, legal form included, appears in name.
+
+    山田建設株式会社 is in 山田建設株式会社東京支店 but not in
+    山田建設工業株式会社, although both contain 山田建設 once legal forms
+    are dropped.
+    """
+    query = normalize_name(query, keep_legal_forms=True)
+    return bool(query) and query in normalize_name(name, keep_legal_forms=True)
+
+
+def unique_match(query, candidates, threshold):
+    """Position of the one candidate that is surely the named item, or None.
+
+    candidates are [(name, score), ...] best first. The best one counts when
+    its normalized name equals the query, or when one name contains the
+    other, the score reaches threshold and no other candidate scores as
+    high. Trigram similarity alone never counts: コピー用紙A4 is close to
+    コピー用紙A3, ボールペン黒 to ボールペン赤.
+    """
+    if not candidates:
+        return None
+    name, score = candidates[0]
+    if score == 1.0:
+        return 0
+    if score < threshold or (len(candidates) > 1 and candidates[1][1] >= score):
+        return None
+    shorter, longer = sorted((normalize_name(query), normalize_name(name)), key=len)
+    return 0 if shorter and shorter in longer else None
+
+
+def trigrams(normalized):
+    """pg_trgm style trigrams: two leading blanks, one trailing"""
+    if not normalized:
+        return frozenset()
+    padded = f'  {normalized} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def score_names(query, name, query_grams=None, name_grams=None):
+    """Similarity of two normalized names (see module docstring)"""
+    if not query or not name:
+        return 0.0
+    if query == name:
+        return 1.0
+    score = 0.0
+    shorter, longer = sorted((query, name), key=len)
+    if len(shorter) >= 2 and shorter in longer:
+        score = 0.5 + 0.5 * len(shorter) / len(longer)
+    query_grams = query_grams if query_grams is not None else trigrams(query)
+    name_grams = name_grams if name_grams is not None else trigrams(name)
+    shared = len(query_grams & name_grams)
+    if shared:
+        score = max(score, shared / (len(query_grams) + len(name_grams) - shared))
+    return score
+
+
+class NameIndex:
+    """In-memory index of (record id, names) with fuzzy search.
+
+    A record may have several names (translations, aliases); it scores with
+    its best one. Extra data per record (e.g. supplier rank) is kept as-is.
+    """
+
+    def __init__(self):
+        self._names = []  # entry -> (rec_id, normalized, grams)
+        self._exact = defaultdict(set)  # normalized -> rec_ids
+        self._postings = defaultdict(list)  # trigram -> entries
+        self.extra = {}
+
+    def __len__(self):
+        return len(self.extra)
+
+    def add(self, rec_id, names, extra=None):
+        if isinstance(names, str):
+            names = [names]
+        seen = set()
+        for name in names:
+            normalized = normalize_name(name)
+            if not normalized or normalized in seen:
+                continue
+            seen.add(normalized)
+            entry = len(self._names)
+            grams = trigrams(normalized)
+            self._names.append((rec_id, normalized, grams))
+            self._exact[normalized].add(rec_id)
+            for gram in grams:
+                self._postings[gram].append(entry)
+        self.extra[rec_id] = extra
+
+    def search(self, query, limit=5, threshold=0.45):
+        """Best matches for one name: [(rec_id, score), ...], best first"""
+        normalized = normalize_name(query)
+        if not normalized:
+            return []
+        best = dict.fromkeys(self._exact.get(normalized, ()), 1.0)
+
+        query_grams = trigrams(normalized)
+        candidates = set()
+        for gram in query_grams:
+            candidates.update(self._postings.get(gram, ()))
+        for entry in candidates:
+            rec_id, name, grams = self._names[entry]
+            if best.get(rec_id) == 1.0:
+                continue
+            score = score_names(normalized, name, query_grams, grams)
+            if score >= threshold and score > best.get(rec_id, 0.0):
+                best[rec_id] = score
+
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+    def search_many(self, queries, limit=5, threshold=0.45):
+        """{query: [(rec_id, score), ...]} for each distinct non-empty query"""
+        return {query: self.search(query, limit, threshold) for query in set(queries) if query}
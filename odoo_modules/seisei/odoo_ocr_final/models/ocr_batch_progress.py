@@ -148,7 +148,14 @@ class OcrBatchProgress(models.Model):
             error: Error message if failed
         """
         self.ensure_one()
+        self._apply_progress(current_move, success, error)
+        self.env.cr.commit()
+
+        # Send bus notification for real-time progress updates
+        self._send_progress_notification()
 
+    def _apply_progress(self, current_move=None, success=True, error=None):
+        """Count one processed record (no commit)."""
         vals = {
             "processed_count": self.processed_count + 1,
         }
@@ -175,9 +182,27 @@ class OcrBatchProgress(models.Model):
             vals["completed_at"] = fields.Datetime.now()
 
         self.write(vals)
-        self.env.cr.commit()
 
-        # Send bus notification for real-time progress updates
+    def _ocr_job_progress(self, jobs):
+        """
+        Called by the OCR job queue when jobs of this batch finish.
+
+        Args:
+            jobs: ocr.job records that just finished (done or failed)
+        """
+        self.ensure_one()
+        if self.state not in ("queued", "processing"):
+            return
+        if self.state == "queued":
+            self.write({
+                "state": "processing",
+                "started_at": min(jobs.filtered("started_at").mapped("started_at") or [fields.Datetime.now()]),
+            })
+        moves = self.env["account.move"].browse(jobs.mapped("res_id"))
+        for job in jobs:
+            move = moves.filtered(lambda m: m.id == job.res_id)
+            success = job.state == "done" and move.ocr_status == "done"
+            self._apply_progress(move, success, job.error or move.ocr_error_message)
         self._send_progress_notification()
 
     def mark_failed(self, error=None):
@@ -198,6 +223,7 @@ class OcrBatchProgress(models.Model):
                 "state": "cancelled",
                 "completed_at": fields.Datetime.now(),
             })
+            self.env["ocr.job"].cancel_batch(self)
             # Reset remaining invoices
             remaining = self.move_ids.filtered(lambda m: m.ocr_status == "processing")
             remaining.write({
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+OCR Name Matcher
+
+Resolves OCR'd product, partner and account names against master data.
+Each worker keeps a normalized NameIndex per (database, kind, company),
+rebuilt when the underlying table changes, and answers every line of a
+document in one call: no per-line `=` / `ilike` / per-word `ilike` queries.
+
+Tables too large to keep in memory (MAX_INDEX_ROWS) are prefiltered in SQL
+with pg_trgm word similarity when the extension is available, then scored
+the same way in Python.
+"""
+
+import logging
+import threading
+import time
+
+from odoo import api, models
+
+from .name_index import NameIndex
+
+_logger = logging.getLogger(__name__)
+
+MATCH_THRESHOLD = 0.45
+MAX_INDEX_ROWS = 200000
+SIGNATURE_TTL = 5  # seconds between table change checks
+SQL_CANDIDATES = 2000
+
+# kind -> model, domain of the indexed records, SQL fetching (id, name) for
+#         ids, SQL change signature and optional pg_trgm prefilter
+KINDS = {
+    'product': {
+        'model': 'product.product',
+        'domain': lambda company: [('company_id', 'in', [False, company.id])],
+        'names': """
+            SELECT pp.id, t.name FROM product_product pp
+            JOIN product_template t ON t.id = pp.product_tmpl_id
+            WHERE pp.id = ANY(%s)
+        """,
+        'signature': """
+            SELECT (SELECT count(*) FROM product_product),
+                   (SELECT max(write_date) FROM product_product),
+                   (SELECT max(write_date) FROM product_template)
+        """,
+        'trigram': {
+            'table': 'product_template',
+            # Same expression as core's index='trigram' on translated fields
+            'expression': "(jsonb_path_query_array(name, '$.*')::text)",
+            'indexdef': '%jsonb_path_query_array(name%gin_trgm_ops%',
+            'candidates': """
+                SELECT pp.id FROM product_template t
+                JOIN product_product pp ON pp.product_tmpl_id = t.id
+                WHERE pp.active AND t.active AND (t.company_id IS NULL OR t.company_id = %s)
+                  AND ({match})
+                LIMIT %s
+            """,
+        },
+    },
+    'partner': {
+        'model': 'res.partner',
+        'domain': lambda company: [('company_id', 'in', [False, company.id])],
+        'names': "SELECT id, name FROM res_partner WHERE id = ANY(%s)",
+        'signature': "SELECT count(*), max(write_date) FROM res_partner",
+        'trigram': {
+            'table': 'res_partner',
+            'expression': '(name)',
+            'indexdef': '%(name gin_trgm_ops)%',
+            'candidates': """
+                SELECT t.id FROM res_partner t
+                WHERE t.active AND (t.company_id IS NULL OR t.company_id = %s)
+                  AND ({match})
+                LIMIT %s
+            """,
+        },
+    },
+    'account': {
+        'model': 'account.account',
+        'domain': lambda company: [('company_ids', 'in', [company.id]), ('deprecated', '=', False)],
+        'names': "SELECT id, name FROM account_account WHERE id = ANY(%s)",
+        'signature': "SELECT count(*), max(write_date) FROM account_account",
+    },
+}
+
+_indexes = {}  # (dbname, kind, company_id) -> (signature, checked_at, NameIndex or None)
+_indexes_lock = threading.Lock()
+
+
+def _all_names(name):
+    """Translated fields come back as {lang: value}; index every language"""
+    if isinstance(name, dict):
+        return [value for value in name.values() if value]
+    return [name] if name else []
+
+
+class OcrNameMatcher(models.AbstractModel):
+    _name = 'ocr.name.matcher'
+    _description = 'OCR Name Matcher'
+
+    def init(self):
+        """Create the pg_trgm GIN indexes used by the SQL prefilter, unless
+        an equivalent one exists already (core's index='trigram')"""
+        if not self.env.registry.has_trigram:
+            return
+        for spec in KINDS.values():
+            trigram = spec.get('trigram')
+            if not trigram:
+                continue
+            self.env.cr.execute("""
+                SELECT 1 FROM pg_indexes WHERE tablename = %s AND indexdef LIKE %s
+            """, (trigram['table'], trigram['indexdef']))
+            if self.env.cr.fetchone():
+                continue
+            table = trigram['table']
+            _logger.info(f'[OCR Match] Creating trigram index on {table}')
+            self.env.cr.execute(
+                f'CREATE INDEX IF NOT EXISTS {table}_ocr_name_trgm_idx ON {table} '
+                f'USING gin ({trigram["expression"]} gin_trgm_ops)'
+            )
+
+    # ==================== Public API ====================
+
+    @api.model
+    def match(self, kind, names, company=None, limit=5, threshold=MATCH_THRESHOLD):
+        """Match many names at once.
+
+        Args:
+            kind: 'product', 'partner' or 'account'
+            names: iterable of OCR'd names (duplicates and blanks ignored)
+            company: res.company, defaults to the current company
+
+        Returns:
+            {name: [(record, score), ...]} best first, records in self.env
+        """
+        company = company or self.env.company
+        names = [name for name in set(names) if name and str(name).strip()]
+        if not names:
+            return {}
+        index = self._get_index(kind, company)
+        if index is None:
+            index = self._build_sql_candidates(kind, names, company)
+        results = index.search_many(names, limit, threshold)
+        # The cached index may trail deletions by up to SIGNATURE_TTL
+        Model = self.env[KINDS[kind]['model']]
+        found = {rec_id for hits in results.values() for rec_id, _score in hits}
+        existing = set(Model.browse(found).exists().ids) if found else set()
+        return {
+            name: [(Model.browse(rec_id), score) for rec_id, score in hits if rec_id in existing]
+            for name, hits in results.items()
+        }
+
+    @api.model
+    def match_one(self, kind, name, company=None, threshold=MATCH_THRESHOLD):
+        """Best (record, score) for one name, or (empty recordset, 0.0)"""
+        hits = self.match(kind, [name], company, limit=1, threshold=threshold).get(name)
+        if hits:
+            return hits[0]
+        return self.env[KINDS[kind]['model']], 0.0
+
+    # ==================== Index ====================
+
+    def _signature(self, kind):
+        self.env.cr.execute(KINDS[kind]['signature'])
+        return tuple(self.env.cr.fetchone())
+
+    def _get_index(self, kind, company):
+        """Cached NameIndex, or None when the table is too large to hold"""
+        key = (self.env.cr.dbname, kind, company.id)
+        now = time.monotonic()
+        entry = _indexes.get(key)
+        if entry and now - entry[1] < SIGNATURE_TTL:
+            return entry[2]
+
+        signature = self._signature(kind)
+        if entry and entry[0] == signature:
+            with _indexes_lock:
+                _indexes[key] = (signature, now, entry[2])
+            return entry[2]
+
+        index = self._build_index(kind, company)
+        with _indexes_lock:
+            _indexes[key] = (signature, now, index)
+        return index
+
+    def _load(self, kind, ids, index):
+        spec = KINDS[kind]
+        for start in range(0, len(ids), 10000):
+            self.env.cr.execute(spec['names'], (ids[start:start + 10000],))
+            for rec_id, name in self.env.cr.fetchall():
+                index.add(rec_id, _all_names(name))
+        return index
+
+    def _build_index(self, kind, company):
+        spec = KINDS[kind]
+        Model = self.env[spec['model']].sudo().with_company(company)
+        domain = spec['domain'](company)
+        if 'trigram' in spec and self.env.registry.has_trigram:
+            count = Model.search_count(domain)
+            if count > MAX_INDEX_ROWS:
+                _logger.info(f'[OCR Match] {kind}: {count} rows, using pg_trgm prefilter')
+                return None
+        ids = Model.search(domain, order='id').ids
+        started = time.monotonic()
+        index = self._load(kind, ids, NameIndex())
+        _logger.info(f'[OCR Match] Indexed {len(index)} {kind} names for company {company.id} '
+                     f'in {time.monotonic() - started:.2f}s')
+        return index
+
+    def _build_sql_candidates(self, kind, names, company):
+        """Small index of the rows pg_trgm finds similar to any of the names"""
+        trigram = KINDS[kind]['trigram']
+        expression = trigram['expression'].replace('name', 't.name')
+        match = ' OR '.join([f'%s <%% {expression}'] * len(names))
+        self.env.cr.execute(
+            trigram['candidates'].format(match=match),
+            (company.id, *names, SQL_CANDIDATES),
+        )
+        ids = [row[0] for row in self.env.cr.fetchall()]
+        return self._load(kind, ids, NameIndex())
@@ -0,0 +1,122 @@
+"""Tests for the normalized name index behind ocr.name.matcher.
+
+Imports name_index.py directly to avoid triggering Odoo package imports
+via models/__init__.py.
+"""
+import importlib.util
+import os
+import unittest
+
+_name_index_path = os.path.join(os.path.dirname(__file__), '..', 'models', 'name_index.py')
+_spec = importlib.util.spec_from_file_location('name_index', _name_index_path)
+_name_index = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_name_index)
+
+NameIndex = _name_index.NameIndex
+contains_full_name = _name_index.contains_full_name
+normalize_name = _name_index.normalize_name
+score_names = _name_index.score_names
+unique_match = _name_index.unique_match
+
+
+class TestNormalizeName(unittest.TestCase):
+
+    def test_halfwidth_katakana(self):
+        self.assertEqual(normalize_name('ｺｰﾋｰ'), 'コーヒー')
+
+    def test_fullwidth_ascii_and_case(self):
+        self.assertEqual(normalize_name('ＡＢＣ Store'), 'abcstore')
+
+    def test_hiragana_folds_to_katakana(self):
+        self.assertEqual(normalize_name('ほっかほっか亭'), normalize_name('ホッカホッカ亭'))
+
+    def test_legal_forms_removed(self):
+        self.assertEqual(normalize_name('㈱セイセイ'), 'セイセイ')
+        self.assertEqual(normalize_name('株式会社 セイセイ'), 'セイセイ')
+
+    def test_keep_legal_forms(self):
+        self.assertEqual(normalize_name('㈱セイセイ', keep_legal_forms=True), '株セイセイ')
+
+    def test_contains_full_name(self):
+        self.assertTrue(contains_full_name('山田建設株式会社', '山田建設株式会社 東京支店'))
+        self.assertTrue(contains_full_name('ｾｲｾｲ', 'セイセイ'))
+        self.assertFalse(contains_full_name('山田建設株式会社', '山田建設工業株式会社'))
+        self.assertFalse(contains_full_name('', 'セイセイ'))
+
+    def test_kanji_variants(self):
+        self.assertEqual(normalize_name('髙島屋'), '高島屋')
+
+    def test_empty(self):
+        self.assertEqual(normalize_name(None), '')
+        self.assertEqual(normalize_name('・ー'), 'ー')
+
+
+class TestUniqueMatch(unittest.TestCase):
+
+    def _candidates(self, query, *names):
+        normalized = normalize_name(query)
+        scored = [(name, score_names(normalized, normalize_name(name))) for name in names]
+        return sorted(scored, key=lambda item: -item[1])
+
+    def test_exact(self):
+        self.assertEqual(unique_match('ｺﾋﾟｰ用紙A4', self._candidates('ｺﾋﾟｰ用紙A4', 'コピー用紙A4'), 0.9), 0)
+
+    def test_other_size_is_not_a_match(self):
+        candidates = self._candidates('コピー用紙A4', 'コピー用紙A3')
+        self.assertGreaterEqual(candidates[0][1], 0.45)
+        self.assertIsNone(unique_match('コピー用紙A4', candidates, 0.9))
+
+    def test_other_colour_is_not_a_match(self):
+        candidates = self._candidates('ボールペン黒', 'ボールペン赤', 'ボールペン青')
+        self.assertGreaterEqual(candidates[0][1], 0.45)
+        self.assertIsNone(unique_match('ボールペン黒', candidates, 0.9))
+
+    def test_containment_needs_threshold(self):
+        # Contained, but a third of the product name is something else
+        candidates = self._candidates('ボールペン黒', 'ボールペン黒0.5mm')
+        self.assertIsNone(unique_match('ボールペン黒', candidates, 0.9))
+        self.assertEqual(unique_match('ボールペン黒', candidates, 0.75), 0)
+
+    def test_containment_must_be_unique(self):
+        candidates = [('ボールペン黒 太字', 0.9), ('ボールペン黒 細字', 0.9)]
+        self.assertIsNone(unique_match('ボールペン黒', candidates, 0.9))
+        self.assertEqual(unique_match('ボールペン黒', candidates[:1], 0.9), 0)
+
+    def test_empty(self):
+        self.assertIsNone(unique_match('コピー用紙A4', [], 0.9))
+
+
+class TestNameIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = NameIndex()
+        self.index.add(1, ['コーヒー豆', 'Coffee beans'])
+        self.index.add(2, 'ホットコーヒー')
+        self.index.add(3, '旅費交通費')
+        self.index.add(4, '株式会社セイセイ')
+
+    def test_exact_after_normalization(self):
+        self.assertEqual(self.index.search('(株)セイセイ')[0], (4, 1.0))
+        self.assertEqual(self.index.search('coffee BEANS')[0], (1, 1.0))
+
+    def test_partial_match_ranked(self):
+        ids = [rec_id for rec_id, _score in self.index.search('ｺｰﾋｰ')]
+        self.assertEqual(ids[:2], [1, 2])  # shorter containing name first
+
+    def test_containment(self):
+        rec_id, score = self.index.search('旅費')[0]
+        self.assertEqual(rec_id, 3)
+        self.assertGreaterEqual(score, 0.5)
+
+    def test_no_match(self):
+        self.assertEqual(self.index.search('xyz'), [])
+        self.assertEqual(self.index.search(''), [])
+
+    def test_search_many(self):
+        result = self.index.search_many(['旅費交通費', 'セイセイ', None, 'セイセイ'])
+        self.assertEqual(set(result), {'旅費交通費', 'セイセイ'})
+        self.assertEqual(result['セイセイ'][0], (4, 1.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
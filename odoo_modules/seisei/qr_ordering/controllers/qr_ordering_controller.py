@@ -2,13 +2,14 @@
 
 import json
 import logging
-import base64
 import hashlib
 import traceback
 import uuid
 import time
 from odoo import http
-from odoo.http import request
+from odoo.http import request, Stream
+
+from ..models.qr_image_cache import QR_IMAGE_SIZES
 
 _logger = logging.getLogger(__name__)
 
@@ -290,36 +291,49 @@ class QrOrderingController(http.Controller):
         """
         公开访问产品图片
         URL: /qr/image/product/{product_id}?size=256
+
+        - 直接读取附件原始字节（文件存储 / S3），不做 base64 往返
+        - ETag 取自附件 checksum，支持 If-None-Match (304) 与 Range (206)
+        - 客户端 Accept 支持时返回预生成的 AVIF / WebP 缩略图
         """
         try:
             product = request.env['product.product'].sudo().browse(product_id)
             if not product.exists():
                 return request.not_found()
-            
-            # 获取图片字段名
-            field_name = f'image_{size}' if size in ['128', '256', '512', '1024', '1920'] else 'image_256'
-            
-            # 获取图片数据
-            image_data = getattr(product, field_name, None)
-            if not image_data:
-                # 尝试从模板获取
-                image_data = getattr(product.product_tmpl_id, field_name, None)
-            
-            if not image_data:
+
+            size = size if size in QR_IMAGE_SIZES else '256'
+            attachment = request.env['qr.image.cache'].sudo().get_image_attachment(
+                product, size, accept=request.httprequest.headers.get('Accept', '')
+            )
+            if not attachment:
                 # 返回默认占位图
                 return request.redirect('/web/static/img/placeholder.png')
-            
-            # 解码 base64 图片
-            image_bytes = base64.b64decode(image_data)
-            
-            # 返回图片
-            headers = [
-                ('Content-Type', 'image/png'),
-                ('Content-Length', len(image_bytes)),
-                ('Cache-Control', 'public, max-age=86400'),
-            ]
-            return request.make_response(image_bytes, headers)
-            
+
+            # 命中客户端缓存时不读取图片内容
+            if request.httprequest.if_none_match.contains(attachment.checksum):
+                return request.make_response(b'', [
+                    ('ETag', '"%s"' % attachment.checksum),
+                    ('Cache-Control', 'public, max-age=86400'),
+                    ('Vary', 'Accept'),
+                ], status=304)
+
+            if attachment.store_fname and not attachment.store_fname.startswith('s3://'):
+                # 文件存储：按路径流式发送（可由反向代理 X-Sendfile 接管）
+                stream = Stream.from_attachment(attachment)
+            else:
+                stream = Stream(
+                    type='data',
+                    data=attachment.raw,
+                    mimetype=attachment.mimetype,
+                    download_name=attachment.name,
+                    etag=attachment.checksum,
+                    last_modified=attachment.write_date,
+                    size=attachment.file_size,
+                )
+            response = stream.get_response(as_attachment=False, max_age=86400)
+            response.headers['Vary'] = 'Accept'
+            return response
+
         except Exception as e:
             _logger.error(f"Error serving product image: {e}")
             return request.redirect('/web/static/img/placeholder.png')
@@ -399,6 +413,37 @@ class QrOrderingController(http.Controller):
             'data': self._get_menu_data(session.table_id.pos_config_id, lang)
         }
 
+    @http.route('/qr/api/menu/snapshot', type='http', auth='public', methods=['GET'], csrf=False)
+    def api_get_menu_snapshot(self, table_token, access_token, lang='zh_CN', **kwargs):
+        """
+        获取预序列化的菜单快照（GET，支持 ETag / If-None-Match）
+        URL: /qr/api/menu/snapshot?table_token=...&access_token=...&lang=zh_CN
+
+        菜单未变化时返回 304，整店顾客同时扫码只需一次缓存查找。
+        """
+        session, error_code, error_msg = self._validate_session(table_token, access_token)
+        if error_code:
+            return request.make_json_response(
+                {'success': False, 'error': error_code, 'message': error_msg}, status=403
+            )
+
+        snapshot = request.env['qr.menu.cache'].sudo().get_snapshot(
+            session.table_id.pos_config_id, self._map_lang(lang)
+        )
+        headers = [
+            ('ETag', snapshot['etag']),
+            ('Cache-Control', 'private, no-cache'),
+        ]
+        if_none_match = request.httprequest.headers.get('If-None-Match', '')
+        if snapshot['etag'] in [tag.strip() for tag in if_none_match.split(',')]:
+            return request.make_response(b'', headers, status=304)
+
+        headers += [
+            ('Content-Type', 'application/json; charset=utf-8'),
+            ('Content-Length', len(snapshot['payload'])),
+        ]
+        return request.make_response(snapshot['payload'], headers)
+
     @http.route('/qr/api/cart/add', type='json', auth='public', csrf=False)
     def api_add_to_cart(self, table_token, access_token, product_id, qty=1, note='', **kwargs):
         """
@@ -570,26 +615,44 @@ class QrOrderingController(http.Controller):
             return {'success': False, 'error': 'ADD_ITEMS_FAILED', 'message': str(e)}
 
     @http.route('/qr/api/order/status', type='json', auth='public', csrf=False)
-    def api_get_order_status(self, table_token, access_token, **kwargs):
+    def api_get_order_status(self, table_token, access_token, since=None, **kwargs):
         """
         获取订单状态（双向同步）
 
         包含：
         1. QR 订单（包括关联的 POS 订单商品）
         2. POS 直接下单的订单（未关联 QR）
+
+        since: 客户端上次拿到的 version。与当前版本一致时只返回
+        {'changed': False}，不再查询和序列化订单。版本变化同时通过
+        bus.bus 频道 qr_order_<access_token> 推送（qr_order_status 消息）。
         """
         session, error_code, error_msg = self._validate_session(table_token, access_token)
         if error_code:
             return {'success': False, 'error': error_code, 'message': error_msg}
 
+        version = session.status_version
+        if since is not None and str(since) == str(version):
+            return {
+                'success': True,
+                'data': {
+                    'changed': False,
+                    'version': version,
+                    'session_state': session.state,
+                }
+            }
+
         # 使用 _get_current_order 获取所有订单（含 POS 直接下单）
         orders = self._get_current_order(session) or []
 
         return {
             'success': True,
             'data': {
+                'changed': True,
+                'version': version,
                 'orders': orders,
                 'session_state': session.state,
+                'channel': f'qr_order_{session.access_token}',
             }
         }
 
@@ -634,112 +697,10 @@ class QrOrderingController(http.Controller):
         return order
 
     def _get_menu_data(self, pos_config, lang='zh_CN'):
-        """获取菜单数据"""
+        """获取菜单数据（来自菜单快照缓存，返回共享对象，不得修改）"""
         # 映射前端语言代码到 Odoo 安装的语言
         lang = self._map_lang(lang)
-        # 获取 POS 可用的产品
-        products = request.env['product.product'].sudo().with_context(lang=lang).search([
-            ('available_in_pos', '=', True),
-            ('product_tmpl_id.qr_available', '=', True),
-            ('product_tmpl_id.qr_sold_out', '=', False),
-        ])
-        
-        # 获取分类
-        categories = request.env['pos.category'].sudo().with_context(lang=lang).search([])
-        
-        # 按分类组织数据
-        menu = {
-            'categories': [],
-            'products': [],   # 变体列表（用于购物车与下单）
-            'templates': [],  # 模板列表（用于菜单展示）
-        }
-        
-        for cat in categories:
-            menu['categories'].append({
-                'id': cat.id,
-                'name': cat.name,
-                'sequence': cat.sequence,
-                'parent_id': cat.parent_id.id if cat.parent_id else False,
-            })
-        
-        templates_map = {}
-        for product in products:
-            # 传递 POS 配置以计算含税价格
-            pdata = product.get_qr_ordering_data(lang, pos_config=pos_config)
-            menu['products'].append(pdata)
-
-            tmpl = product.product_tmpl_id.with_context(lang=lang)
-            tmpl_id = tmpl.id
-            tdata = templates_map.get(tmpl_id)
-            if not tdata:
-                tdata = {
-                    'id': tmpl_id,
-                    'name': tmpl.name,
-                    'description': pdata.get('description', ''),
-                    'image_url': pdata.get('image_url'),
-                    'video_url': pdata.get('video_url'),
-                    'category_id': pdata.get('category_id'),
-                    'category_name': pdata.get('category_name'),
-                    'available': pdata.get('available'),
-                    'sold_out': pdata.get('sold_out'),
-                    'highlight': pdata.get('highlight'),
-                    'pinned': pdata.get('pinned'),
-                    'pinned_sequence': pdata.get('pinned_sequence'),
-                    'tags': pdata.get('tags') or [],
-                    'variants': [],
-                    'price_min': pdata.get('price', 0.0),
-                    'price_max': pdata.get('price', 0.0),
-                    'price_with_tax_min': pdata.get('price_with_tax', pdata.get('price', 0.0)),
-                    'price_with_tax_max': pdata.get('price_with_tax', pdata.get('price', 0.0)),
-                    'default_variant_id': pdata.get('id'),
-                }
-                templates_map[tmpl_id] = tdata
-
-            # 追加变体
-            tdata['variants'].append({
-                'id': pdata.get('id'),
-                'name': pdata.get('name'),  # 完整产品名称
-                'variant_display_name': pdata.get('variant_display_name', pdata.get('name')),  # 变体显示名称
-                'attribute_values': pdata.get('attribute_values', []),  # 属性值列表
-                'price': pdata.get('price', 0.0),
-                'price_with_tax': pdata.get('price_with_tax', pdata.get('price', 0.0)),
-                'tax_rate': pdata.get('tax_rate', 0.0),
-                'image_url': pdata.get('image_url'),
-                'available': pdata.get('available'),
-                'sold_out': pdata.get('sold_out'),
-            })
-
-            # 更新价格区间
-            price = pdata.get('price', 0.0)
-            price_with_tax = pdata.get('price_with_tax', price)
-            tdata['price_min'] = min(tdata['price_min'], price)
-            tdata['price_max'] = max(tdata['price_max'], price)
-            tdata['price_with_tax_min'] = min(tdata['price_with_tax_min'], price_with_tax)
-            tdata['price_with_tax_max'] = max(tdata['price_with_tax_max'], price_with_tax)
-
-        # Build search keywords for each template (all supported languages)
-        LANGS = ['zh_CN', 'ja_JP', 'en_GB']
-        for tdata in templates_map.values():
-            keywords = set()
-            tmpl_record = request.env['product.template'].sudo().browse(tdata['id'])
-            for l in LANGS:
-                name = tmpl_record.with_context(lang=l).name
-                if name:
-                    keywords.add(name)
-            # Tags in all languages
-            for tag in tmpl_record.qr_tags:
-                for l in LANGS:
-                    tag_name = tag.with_context(lang=l).name
-                    if tag_name:
-                        keywords.add(tag_name)
-            tdata['search_keywords'] = ' '.join(keywords)
-
-        # 输出模板列表（保持稳定顺序：置顶优先，其次序号、名称）
-        menu['templates'] = sorted(
-            templates_map.values(),
-            key=lambda t: (not t.get('pinned', False), t.get('pinned_sequence', 10), t.get('name', ''))
-        )
-        return menu
+        return request.env['qr.menu.cache'].sudo().get_snapshot(pos_config, lang)['data']
 
     def _get_current_order(self, session):
         """
@@ -748,7 +709,7 @@ class QrOrderingController(http.Controller):
         只返回与当前 QR Session 关联的订单，不再自动显示餐桌上其他 POS 订单
         避免混入前一桌客人的未结账订单
         """
-        _logger.info(f"[GetOrder] Session: id={session.id}, name={session.name}, state={session.state}")
+        _logger.debug(f"[GetOrder] Session: id={session.id}, name={session.name}, state={session.state}")
 
         result = []
         processed_pos_ids = set()  # 已处理的 POS 订单 ID，避免重复
@@ -759,25 +720,25 @@ class QrOrderingController(http.Controller):
             ('state', '!=', 'cancelled'),
         ], order='create_date desc')
 
-        _logger.info(f"[GetOrder] Found {len(qr_orders)} QR orders for session {session.id}")
+        _logger.debug(f"[GetOrder] Found {len(qr_orders)} QR orders for session {session.id}")
 
         for order in qr_orders:
-            _logger.info(f"[GetOrder] QR Order: id={order.id}, state={order.state}, pos_order_id={order.pos_order_id.id if order.pos_order_id else None}")
+            _logger.debug(f"[GetOrder] QR Order: id={order.id}, state={order.state}, pos_order_id={order.pos_order_id.id if order.pos_order_id else None}")
 
             # 如果这个 QR 订单关联的 POS 订单已经处理过，跳过（避免重复）
             if order.pos_order_id and order.pos_order_id.id in processed_pos_ids:
-                _logger.info(f"[GetOrder] Skipping duplicate POS order {order.pos_order_id.id}")
+                _logger.debug(f"[GetOrder] Skipping duplicate POS order {order.pos_order_id.id}")
                 continue
 
             serialized = self._serialize_order(order)
             result.append(serialized)
-            _logger.info(f"[GetOrder] Serialized order: lines={len(serialized.get('lines', []))}, amount={serialized.get('amount_total')}")
+            _logger.debug(f"[GetOrder] Serialized order: lines={len(serialized.get('lines', []))}, amount={serialized.get('amount_total')}")
 
             # 标记 POS 订单已处理
             if order.pos_order_id:
                 processed_pos_ids.add(order.pos_order_id.id)
 
-        _logger.info(f"[GetOrder] Returning {len(result)} orders")
+        _logger.debug(f"[GetOrder] Returning {len(result)} orders")
         return result if result else None
 
     def _serialize_session(self, session):
@@ -788,6 +749,7 @@ class QrOrderingController(http.Controller):
             'state': session.state,
             'expire_time': session.expire_time.isoformat() if session.expire_time else None,
             'total_amount': session.total_amount,
+            'status_version': session.status_version,
         }
 
     def _serialize_table(self, table):
@@ -829,9 +791,10 @@ class QrOrderingController(http.Controller):
             _logger.warning(f"[Serialize] QR Order {order.name} -> POS Order {pos_order.name}: lines={len(lines_data)}, amount_total={amount_total_incl}, amount_tax={amount_tax}")
         else:
             # ===== 从 QR 订单获取（购物车状态）=====
+            tax_amounts = self._get_lines_tax_amounts(order)
             lines_data = []
             for line in order.line_ids:
-                line_data = self._serialize_order_line(line)
+                line_data = self._serialize_order_line(line, tax_amounts=tax_amounts)
                 lines_data.append(line_data)
 
             # 从订单行计算金额
@@ -859,8 +822,24 @@ class QrOrderingController(http.Controller):
             'lines': lines_data,
         }
 
-    def _serialize_order_line(self, line):
-        """序列化订单行数据（含税信息）"""
+    def _get_lines_tax_amounts(self, order):
+        """整批计算 QR 订单行税额，返回 {line_id: (taxes, 不含税, 含税)}"""
+        session = order.session_id
+        pos_config = session.pos_config_id if session else None
+        if not pos_config:
+            return {}
+        try:
+            return order.line_ids._get_tax_amounts(pos_config, currency=pos_config.company_id.currency_id)
+        except Exception as e:
+            _logger.warning(f"Tax calculation failed for order {order.id}: {e}")
+            return {}
+
+    def _serialize_order_line(self, line, tax_amounts=None):
+        """序列化订单行数据（含税信息）
+
+        Args:
+            tax_amounts: _get_lines_tax_amounts() 的结果，缺省时单独计算
+        """
         subtotal = line.subtotal  # 税前小计
         subtotal_incl = subtotal  # 含税小计（默认同税前）
         tax_amount = 0.0
@@ -868,29 +847,15 @@ class QrOrderingController(http.Controller):
 
         # 计算含税价格
         if line.product_id and line.product_id.taxes_id:
-            try:
-                # 获取公司和税规则
-                session = line.order_id.session_id
-                pos_config = session.pos_config_id if session else None
-                if pos_config:
-                    company = pos_config.company_id
-                    fiscal_position = pos_config.default_fiscal_position_id
-                    taxes = line.product_id.taxes_id.filtered(lambda t: t.company_id == company)
-                    if fiscal_position:
-                        taxes = fiscal_position.map_tax(taxes)
-                    if taxes:
-                        tax_result = taxes.compute_all(
-                            line.price_unit,
-                            currency=company.currency_id,
-                            quantity=line.qty,
-                            product=line.product_id
-                        )
-                        subtotal_incl = tax_result['total_included']
-                        tax_amount = subtotal_incl - tax_result['total_excluded']
-                        if subtotal > 0:
-                            tax_rate = (tax_amount / subtotal) * 100
-            except Exception as e:
-                _logger.warning(f"Tax calculation failed for line {line.id}: {e}")
+            if tax_amounts is None:
+                tax_amounts = self._get_lines_tax_amounts(line.order_id) if line.order_id else {}
+            amounts = tax_amounts.get(line.id)
+            if amounts and amounts[0]:
+                _taxes, total_excluded, total_included = amounts
+                subtotal_incl = total_included
+                tax_amount = subtotal_incl - total_excluded
+                if subtotal > 0:
+                    tax_rate = (tax_amount / subtotal) * 100
 
         return {
             'id': line.id,
@@ -6,4 +6,6 @@ from . import qr_order
 from . import product_template
 from . import pos_order
 from . import pos_print_job
-
+from . import qr_menu_cache
+from . import qr_image_cache
+from . import qr_print_task
@@ -95,8 +95,17 @@ class PosOrder(models.Model):
         if 'state' in vals:
             self._sync_state_to_qr_orders(vals['state'])
 
+        # POS 端改单（状态/菜品）推送给扫码顾客
+        if {'state', 'lines'} & set(vals):
+            self._mark_qr_status_changed()
+
         return result
 
+    def _mark_qr_status_changed(self):
+        """标记关联 QR 会话的订单状态有变化"""
+        qr_orders = self.sudo().qr_order_ids
+        qr_orders.session_id._mark_status_changed(qr_orders)
+
     def _sync_state_to_qr_orders(self, pos_state):
         """同步 POS 订单状态到所有关联的 QR 订单"""
         # POS 状态到 QR 状态的映射
@@ -201,3 +210,25 @@ class PosOrder(models.Model):
                     _logger.warning(f"Failed to process table cleanup after payment: {e}")
 
         return res
+
+
+class PosOrderLine(models.Model):
+    """继承 pos.order.line，POS 端加菜/退菜时通知扫码顾客"""
+    _inherit = 'pos.order.line'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        lines.order_id._mark_qr_status_changed()
+        return lines
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.order_id._mark_qr_status_changed()
+        return res
+
+    def unlink(self):
+        orders = self.order_id
+        res = super().unlink()
+        orders._mark_qr_status_changed()
+        return res
@@ -5,6 +5,17 @@ from odoo import models, fields, api
 import logging
 _logger = logging.getLogger(__name__)
 
+# 影响扫码点餐菜单快照的字段（变更时使菜单缓存失效）
+QR_MENU_TEMPLATE_FIELDS = {
+    'name', 'active', 'list_price', 'taxes_id', 'available_in_pos', 'pos_categ_ids',
+    'description_sale', 'attribute_line_ids', 'company_id',
+    'qr_video', 'qr_video_url', 'qr_short_desc', 'qr_available', 'qr_highlight',
+    'qr_pinned', 'qr_pinned_sequence', 'qr_sold_out', 'qr_tags',
+}
+QR_MENU_PRODUCT_FIELDS = QR_MENU_TEMPLATE_FIELDS | {
+    'lst_price', 'product_template_attribute_value_ids', 'product_tmpl_id',
+}
+
 
 class ProductTemplate(models.Model):
     """产品模板扩展 - 添加视频支持"""
@@ -63,6 +74,23 @@ class ProductTemplate(models.Model):
         help='菜品标签：辣、素食、推荐等'
     )
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['qr.menu.cache'].invalidate()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if QR_MENU_TEMPLATE_FIELDS & set(vals):
+            self.env['qr.menu.cache'].invalidate()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['qr.menu.cache'].invalidate()
+        return res
+
     def get_qr_video_url(self):
         """获取视频 URL"""
         self.ensure_one()
@@ -84,12 +112,106 @@ class ProductProduct(models.Model):
     """产品变体扩展"""
     _inherit = 'product.product'
 
-    def get_qr_ordering_data(self, lang='zh_CN', pos_config=None):
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['qr.menu.cache'].invalidate()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if QR_MENU_PRODUCT_FIELDS & set(vals):
+            self.env['qr.menu.cache'].invalidate()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['qr.menu.cache'].invalidate()
+        return res
+
+    @api.model
+    def _qr_compute_taxes_batch(self, items, pos_config, currency=None):
+        """批量计算税额
+
+        财务位置映射按原始税组合缓存，compute_all 按 (税组合, 单价, 数量)
+        去重，同一组合只调用一次税引擎。依赖产品的税（Python 代码税、税组）
+        仍按产品单独计算。
+
+        Args:
+            items: [(product, price_unit, qty), ...]
+            pos_config: POS 配置，提供公司与财务位置
+            currency: 计算币种（默认为税所属公司币种）
+
+        Returns:
+            list: 与 items 一一对应的 (taxes, total_excluded, total_included)
+        """
+        company = pos_config.company_id
+        fiscal_position = pos_config.default_fiscal_position_id
+        mapped_taxes = {}  # 原始税 ids -> 映射后的税
+        tax_results = {}   # (税 ids, 单价, 数量[, 产品]) -> (不含税, 含税)
+        results = []
+        for product, price_unit, qty in items:
+            source_key = tuple(product.taxes_id.ids)
+            taxes = mapped_taxes.get(source_key)
+            if taxes is None:
+                taxes = product.taxes_id.filtered(lambda t: t.company_id == company)
+                if fiscal_position:
+                    taxes = fiscal_position.map_tax(taxes)
+                mapped_taxes[source_key] = taxes
+
+            if not taxes:
+                total = price_unit * qty
+                results.append((taxes, total, total))
+                continue
+
+            key = (tuple(taxes.ids), price_unit, qty)
+            if any(t.amount_type in ('code', 'group') for t in taxes):
+                key += (product.id,)
+            amounts = tax_results.get(key)
+            if amounts is None:
+                tax_result = taxes.compute_all(price_unit, currency=currency, quantity=qty, product=product)
+                amounts = tax_results[key] = (tax_result['total_excluded'], tax_result['total_included'])
+            results.append((taxes, amounts[0], amounts[1]))
+        return results
+
+    def get_qr_prices(self, pos_config=None):
+        """批量获取扫码点餐价格
+
+        Args:
+            pos_config: POS 配置，用于获取税率和财务位置
+
+        Returns:
+            dict: {product_id: {'price', 'price_with_tax', 'tax_rate'}}
+        """
+        prices = {}
+        if pos_config:
+            tax_amounts = self._qr_compute_taxes_batch(
+                [(product, product.lst_price, 1.0) for product in self], pos_config
+            )
+        else:
+            tax_amounts = [(None, product.lst_price, product.lst_price) for product in self]
+
+        for product, (taxes, _total_excluded, total_included) in zip(self, tax_amounts):
+            # 基础价格（不含税）
+            price = product.lst_price
+            price_with_tax = total_included if taxes else price
+            tax_rate = 0.0
+            if taxes and price > 0:
+                tax_rate = (price_with_tax - price) / price * 100
+            prices[product.id] = {
+                'price': price,
+                'price_with_tax': price_with_tax,
+                'tax_rate': tax_rate,
+            }
+        return prices
+
+    def get_qr_ordering_data(self, lang='zh_CN', pos_config=None, prices=None):
         """获取扫码点餐数据
 
         Args:
             lang: 语言代码
             pos_config: POS 配置，用于获取税率和财务位置
+            prices: get_qr_prices() 的结果（批量构建菜单时传入，避免逐个计算税额）
         """
         self.ensure_one()
 
@@ -97,24 +219,12 @@ class ProductProduct(models.Model):
         product = self.with_context(lang=lang)
         template = product.product_tmpl_id
 
-        # 基础价格（不含税）
-        price = self.lst_price
-
-        # 如果提供了 POS 配置，计算含税价格
-        price_with_tax = price
-        tax_rate = 0.0
-        if pos_config:
-            company = pos_config.company_id
-            fiscal_position = pos_config.default_fiscal_position_id
-            taxes = self.taxes_id.filtered(lambda t: t.company_id == company)
-            if fiscal_position:
-                taxes = fiscal_position.map_tax(taxes)
-            if taxes:
-                # 计算含税价格
-                tax_result = taxes.compute_all(price, product=self)
-                price_with_tax = tax_result['total_included']
-                if price > 0:
-                    tax_rate = (price_with_tax - price) / price * 100
+        if prices is None or self.id not in prices:
+            prices = self.get_qr_prices(pos_config)
+        price_data = prices[self.id]
+        price = price_data['price']
+        price_with_tax = price_data['price_with_tax']
+        tax_rate = price_data['tax_rate']
 
         # 获取产品变体属性值（用于前端展示区分不同规格）
         # 例如: JJ 产品的 Size=中杯/350ml 和 Size=大杯/500ml
@@ -197,3 +307,13 @@ class QrProductTag(models.Model):
         ('name_unique', 'unique(name)', 'Tag name must be unique!'),
     ]
 
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['qr.menu.cache'].invalidate()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['qr.menu.cache'].invalidate()
+        return res
+
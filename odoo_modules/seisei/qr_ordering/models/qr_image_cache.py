@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+
+import io
+import logging
+import warnings
+
+import psycopg2
+
+from odoo import api, models
+
+try:
+    from PIL import Image, features
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+_logger = logging.getLogger(__name__)
+
+# 公开图片接口允许的尺寸（对应 image_* 字段）
+QR_IMAGE_SIZES = ('128', '256', '512', '1024', '1920')
+# 扫码点餐菜单实际使用的尺寸（预生成缩略图）
+QR_THUMBNAIL_SIZES = ('256',)
+
+# 派生格式，按客户端偏好顺序
+QR_DERIVED_FORMATS = (
+    ('avif', 'image/avif', 'AVIF'),
+    ('webp', 'image/webp', 'WEBP'),
+)
+QR_DERIVED_QUALITY = 80
+
+
+def _check_feature(name):
+    if not HAS_PIL:
+        return False
+    with warnings.catch_warnings():
+        # 旧版 Pillow 对未知特性名只给出警告
+        warnings.simplefilter('ignore')
+        try:
+            return bool(features.check(name))
+        except ValueError:
+            return False
+
+
+# 当前 Pillow 可编码的派生格式
+QR_SUPPORTED_FORMATS = [f for f in QR_DERIVED_FORMATS if _check_feature(f[0])]
+
+# 派生图片附件的 res_model（description 中记录源附件 checksum）
+QR_DERIVED_RES_MODEL = 'qr.image.cache'
+
+# 待生成的派生图片 (源附件, 格式)，由预生成 cron 处理
+QR_DERIVED_QUEUE_TABLE = 'qr_image_cache_queue'
+# cron 每次最多处理的排队派生图片数
+QR_DERIVED_QUEUE_BATCH = 200
+
+
+class QrImageCache(models.AbstractModel):
+    """扫码点餐产品图片服务
+
+    直接读取 image_* 字段对应的 ir.attachment（文件存储或 S3），
+    不经过 ORM 二进制字段的 base64 编解码；并按源附件 checksum
+    缓存 WebP / AVIF 派生图片。
+    """
+    _name = 'qr.image.cache'
+    _description = 'QR Product Image Cache / 产品图片缓存'
+
+    def init(self):
+        cr = self.env.cr
+        cr.execute(f"""
+            CREATE TABLE IF NOT EXISTS {QR_DERIVED_QUEUE_TABLE} (
+                source_id integer NOT NULL REFERENCES ir_attachment(id) ON DELETE CASCADE,
+                fmt varchar NOT NULL,
+                PRIMARY KEY (source_id, fmt)
+            )
+        """)
+        # 派生图片名称为 qr_thumb_<源附件 checksum>.<格式>，源附件 checksum 已区分尺寸，
+        # 名称唯一即 (源图片, 尺寸, 格式) 唯一；建索引前先删除历史重复项
+        cr.execute("""
+            SELECT id FROM (
+                SELECT id, row_number() OVER (PARTITION BY name ORDER BY id) AS rank
+                  FROM ir_attachment WHERE res_model = %s
+            ) d WHERE rank > 1
+        """, [QR_DERIVED_RES_MODEL])
+        duplicate_ids = [row[0] for row in cr.fetchall()]
+        if duplicate_ids:
+            self.env['ir.attachment'].sudo().browse(duplicate_ids).unlink()
+            _logger.info("Removed %d duplicate QR menu thumbnails", len(duplicate_ids))
+        cr.execute(f"""
+            CREATE UNIQUE INDEX IF NOT EXISTS ir_attachment_qr_derived_name_uniq
+                ON ir_attachment (name) WHERE res_model = '{QR_DERIVED_RES_MODEL}'
+        """)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    @api.model
+    def get_image_attachment(self, product, size='256', accept=''):
+        """获取要返回给客户端的图片附件
+
+        Args:
+            product: product.product 记录
+            size: 图片尺寸（QR_IMAGE_SIZES 之一）
+            accept: 请求的 Accept 头，用于选择 AVIF / WebP
+
+        Returns:
+            ir.attachment: 派生图片或源图片附件，无图片时为空
+
+        派生图片尚未生成时不在请求中编码，返回源图片并排队交给预生成 cron。
+        """
+        source = self._get_source_attachment(product, size)
+        if not source:
+            return source
+
+        for fmt, mimetype, _pil_format in QR_SUPPORTED_FORMATS:
+            if mimetype in accept:
+                derived = self._find_derived(source, fmt)
+                if not derived:
+                    self._queue_derived(source, fmt)
+                    break
+                # 派生图不比源图小时直接使用源图
+                if derived.file_size < (source.file_size or 0):
+                    return derived
+        return source
+
+    @api.model
+    def pregenerate(self, products=None):
+        """为菜单产品预生成派生缩略图（cron 调用）
+
+        Args:
+            products: product.product 记录集，缺省为所有扫码点餐可用产品
+
+        Returns:
+            int: 新生成的派生图片数
+        """
+        generated = self._process_queue()
+        if products is None:
+            products = self.env['product.product'].sudo().search([
+                ('available_in_pos', '=', True),
+                ('product_tmpl_id.qr_available', '=', True),
+            ])
+        formats = QR_SUPPORTED_FORMATS
+        if not formats:
+            return generated
+
+        for product in products:
+            for size in QR_THUMBNAIL_SIZES:
+                source = self._get_source_attachment(product, size)
+                if not source:
+                    continue
+                for fmt, _mimetype, _pil_format in formats:
+                    if not self._find_derived(source, fmt):
+                        generated += bool(self._create_derived(source, fmt))
+
+        self._cleanup_orphans()
+        if generated:
+            _logger.info("Pre-generated %d QR menu thumbnails", generated)
+        return generated
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _get_source_attachment(self, product, size):
+        """变体图片优先，其次模板图片（与 product.product.image_* 计算逻辑一致）"""
+        Attachment = self.env['ir.attachment'].sudo()
+        candidates = (
+            ('product.product', product.id, f'image_variant_{size}'),
+            ('product.template', product.product_tmpl_id.id, f'image_{size}'),
+        )
+        for res_model, res_id, res_field in candidates:
+            attachment = Attachment.search([
+                ('res_model', '=', res_model),
+                ('res_id', '=', res_id),
+                ('res_field', '=', res_field),
+            ], limit=1)
+            if attachment and attachment.checksum:
+                return attachment
+        return Attachment
+
+    def _derived_name(self, source, fmt):
+        return f'qr_thumb_{source.checksum}.{fmt}'
+
+    @api.model
+    def _find_derived(self, source, fmt):
+        return self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', QR_DERIVED_RES_MODEL),
+            ('name', '=', self._derived_name(source, fmt)),
+        ], limit=1)
+
+    @api.model
+    def _queue_derived(self, source, fmt):
+        """登记待生成的派生图片，新登记时唤醒预生成 cron"""
+        try:
+            # 并发请求同时登记同一项时，可重复读隔离级别下 ON CONFLICT 也可能报序列化错误
+            with self.env.cr.savepoint(flush=False):
+                self.env.cr.execute(f"""
+                    INSERT INTO {QR_DERIVED_QUEUE_TABLE} (source_id, fmt) VALUES (%s, %s)
+                    ON CONFLICT DO NOTHING
+                """, [source.id, fmt])
+                queued = self.env.cr.rowcount
+        except psycopg2.Error:
+            return
+        if queued:
+            self.env.ref('qr_ordering.ir_cron_pregenerate_menu_thumbnails').sudo()._trigger()
+
+    @api.model
+    def _process_queue(self):
+        """生成排队中的派生图片，返回新生成数"""
+        self.env.cr.execute(f"""
+            DELETE FROM {QR_DERIVED_QUEUE_TABLE}
+             WHERE (source_id, fmt) IN (
+                   SELECT source_id, fmt FROM {QR_DERIVED_QUEUE_TABLE}
+                    LIMIT %s FOR UPDATE SKIP LOCKED)
+         RETURNING source_id, fmt
+        """, [QR_DERIVED_QUEUE_BATCH])
+        rows = self.env.cr.fetchall()
+        generated = 0
+        Attachment = self.env['ir.attachment'].sudo()
+        for source_id, fmt in rows:
+            source = Attachment.browse(source_id).exists()
+            if source and source.checksum and not self._find_derived(source, fmt):
+                generated += bool(self._create_derived(source, fmt))
+        if len(rows) == QR_DERIVED_QUEUE_BATCH:
+            self.env.ref('qr_ordering.ir_cron_pregenerate_menu_thumbnails')._trigger()
+        return generated
+
+    @api.model
+    def _create_derived(self, source, fmt):
+        """将源图片重新编码为 fmt 并保存为附件；编码失败时返回空"""
+        for derived_fmt, mimetype, pil_format in QR_SUPPORTED_FORMATS:
+            if derived_fmt == fmt:
+                break
+        else:
+            return self.env['ir.attachment']
+
+        try:
+            with Image.open(io.BytesIO(source.raw)) as img:
+                img = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+                output = io.BytesIO()
+                img.save(output, format=pil_format, quality=QR_DERIVED_QUALITY)
+        except Exception as e:
+            _logger.warning("Failed to encode %s thumbnail for attachment %s: %s", fmt, source.id, e)
+            return self.env['ir.attachment']
+
+        try:
+            with self.env.cr.savepoint():
+                return self.env['ir.attachment'].sudo().create({
+                    'name': self._derived_name(source, fmt),
+                    'raw': output.getvalue(),
+                    'mimetype': mimetype,
+                    'res_model': QR_DERIVED_RES_MODEL,
+                    'description': source.checksum,
+                })
+        except psycopg2.IntegrityError:
+            # 已由其他事务生成（唯一索引）
+            return self._find_derived(source, fmt)
+
+    @api.model
+    def _cleanup_orphans(self):
+        """删除源图片已不存在的派生图片"""
+        self.env['ir.attachment'].flush_model()
+        self.env.cr.execute("""
+            SELECT d.id
+              FROM ir_attachment d
+             WHERE d.res_model = %s
+               AND NOT EXISTS (
+                   SELECT 1
+                     FROM ir_attachment s
+                    WHERE s.checksum = d.description
+                      AND s.res_model IN ('product.product', 'product.template')
+               )
+        """, [QR_DERIVED_RES_MODEL])
+        orphan_ids = [row[0] for row in self.env.cr.fetchall()]
+        if orphan_ids:
+            self.env['ir.attachment'].sudo().browse(orphan_ids).unlink()
+            _logger.info("Removed %d orphaned QR menu thumbnails", len(orphan_ids))
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import logging
+import threading
+
+from odoo import api, models
+
+_logger = logging.getLogger(__name__)
+
+# Module-level cache: {(dbname, pos_config_id, lang, version): snapshot}
+# snapshot = {'etag': str, 'data': dict, 'payload': bytes}
+_menu_cache = {}
+_menu_cache_lock = threading.Lock()
+_MENU_CACHE_MAX_ENTRIES = 256
+
+# 菜单版本：修改了菜单数据的事务提交后，用独立游标向此表插入一行，版本即可见的最大 id。
+# - 只插入不更新：并发提交之间没有行锁与序列化冲突，也不清空各 worker 的 ormcache
+# - 在数据提交之后插入：看到某个版本的快照必然也看到该版本对应的数据，
+#   不会把旧数据缓存到新版本号下
+# - 读取走事务快照，与同一快照中读取的菜单数据一致
+MENU_VERSION_TABLE = 'qr_menu_version'
+# 本事务已登记提交后递增版本（cr.postcommit.data 的键）
+MENU_DIRTY_KEY = 'qr_menu_cache.dirty'
+
+# 菜单搜索关键字使用的语言
+MENU_KEYWORD_LANGS = ['zh_CN', 'ja_JP', 'en_GB']
+
+
+class QrMenuCache(models.AbstractModel):
+    """扫码点餐菜单快照缓存
+
+    按 (db, pos_config, lang, 菜单版本) 缓存已构建并预序列化的菜单，
+    产品/税/POS 分类等相关字段变更时递增菜单版本号使缓存失效。
+    """
+    _name = 'qr.menu.cache'
+    _description = 'QR Menu Snapshot Cache / 菜单快照缓存'
+
+    def init(self):
+        self.env.cr.execute(
+            f"CREATE TABLE IF NOT EXISTS {MENU_VERSION_TABLE} (id bigserial PRIMARY KEY)"
+        )
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    @api.model
+    def get_snapshot(self, pos_config, lang='zh_CN'):
+        """获取菜单快照
+
+        Args:
+            pos_config: pos.config 记录（可为空）
+            lang: Odoo 语言代码（已映射）
+
+        Returns:
+            dict: {'etag': str, 'data': dict, 'payload': bytes}
+                  data 为共享对象，调用方不得修改
+        """
+        # 本事务修改过菜单数据（版本尚未递增）：现场构建，不读写共享缓存
+        dirty = self.env.cr.postcommit.data.get(MENU_DIRTY_KEY)
+        version = self._get_version()
+        key = (self.env.cr.dbname, pos_config.id if pos_config else 0, lang, version)
+        snapshot = None if dirty else _menu_cache.get(key)
+        if snapshot:
+            return snapshot
+
+        data = self._build_menu_data(pos_config, lang)
+        payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+        snapshot = {
+            'etag': '"%s"' % hashlib.sha1(payload).hexdigest(),
+            'data': data,
+            'payload': payload,
+        }
+        if dirty:
+            return snapshot
+
+        with _menu_cache_lock:
+            # 本事务的快照可能早于其他请求已缓存的新版本：只丢弃更旧的版本，
+            # 已有更新版本时不写入（不能让旧快照把新版本挤掉）
+            versions = [k[3] for k in _menu_cache if k[0] == key[0]]
+            if any(v > version for v in versions):
+                return snapshot
+            stale = [k for k in _menu_cache if k[0] == key[0] and k[3] < version]
+            for k in stale:
+                _menu_cache.pop(k, None)
+            if len(_menu_cache) >= _MENU_CACHE_MAX_ENTRIES:
+                _menu_cache.clear()
+            _menu_cache[key] = snapshot
+
+        _logger.info(
+            "Built QR menu snapshot: config=%s, lang=%s, version=%s, size=%d bytes",
+            key[1], lang, version, len(payload),
+        )
+        return snapshot
+
+    @api.model
+    def invalidate(self):
+        """本事务提交后递增一次菜单版本号，所有 worker 的菜单快照随之失效
+
+        批量编辑、导入时每条记录都会调用，只在首次调用时登记提交后回调。
+        """
+        postcommit = self.env.cr.postcommit
+        if postcommit.data.get(MENU_DIRTY_KEY):
+            return
+        postcommit.data[MENU_DIRTY_KEY] = True
+        postcommit.add(self._bump_version)
+
+    @api.model
+    def clear_cache(self):
+        """清空本进程的菜单快照缓存"""
+        with _menu_cache_lock:
+            _menu_cache.clear()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _get_version(self):
+        self.env.cr.execute(f"SELECT max(id) FROM {MENU_VERSION_TABLE}")
+        return self.env.cr.fetchone()[0] or 0
+
+    @api.model
+    def _bump_version(self):
+        """插入一行新版本（提交后回调，使用独立游标）"""
+        try:
+            with self.env.registry.cursor() as cr:
+                cr.execute(f"INSERT INTO {MENU_VERSION_TABLE} DEFAULT VALUES")
+        except Exception:
+            _logger.exception("Failed to bump QR menu version")
+
+    @api.autovacuum
+    def _gc_menu_versions(self):
+        """只保留最新的版本行（删除旧行不改变最大 id）"""
+        self.env.cr.execute(f"""
+            DELETE FROM {MENU_VERSION_TABLE}
+             WHERE id < (SELECT max(id) FROM {MENU_VERSION_TABLE})
+        """)
+
+    @api.model
+    def _build_menu_data(self, pos_config, lang='zh_CN'):
+        """构建菜单数据（分类、变体、模板）"""
+        # 获取 POS 可用的产品
+        products = self.env['product.product'].sudo().with_context(lang=lang).search([
+            ('available_in_pos', '=', True),
+            ('product_tmpl_id.qr_available', '=', True),
+            ('product_tmpl_id.qr_sold_out', '=', False),
+        ])
+
+        # 获取分类
+        categories = self.env['pos.category'].sudo().with_context(lang=lang).search([])
+
+        # 按分类组织数据
+        menu = {
+            'categories': [],
+            'products': [],   # 变体列表（用于购物车与下单）
+            'templates': [],  # 模板列表（用于菜单展示）
+        }
+
+        for cat in categories:
+            menu['categories'].append({
+                'id': cat.id,
+                'name': cat.name,
+                'sequence': cat.sequence,
+                'parent_id': cat.parent_id.id if cat.parent_id else False,
+            })
+
+        # 整批计算含税价格（相同税组合与单价只计算一次）
+        prices = products.get_qr_prices(pos_config)
+
+        templates_map = {}
+        for product in products:
+            pdata = product.get_qr_ordering_data(lang, pos_config=pos_config, prices=prices)
+            menu['products'].append(pdata)
+
+            tmpl = product.product_tmpl_id
+            tmpl_id = tmpl.id
+            tdata = templates_map.get(tmpl_id)
+            if not tdata:
+                tdata = {
+                    'id': tmpl_id,
+                    'name': tmpl.name,
+                    'description': pdata.get('description', ''),
+                    'image_url': pdata.get('image_url'),
+                    'video_url': pdata.get('video_url'),
+                    'category_id': pdata.get('category_id'),
+                    'category_name': pdata.get('category_name'),
+                    'available': pdata.get('available'),
+                    'sold_out': pdata.get('sold_out'),
+                    'highlight': pdata.get('highlight'),
+                    'pinned': pdata.get('pinned'),
+                    'pinned_sequence': pdata.get('pinned_sequence'),
+                    'tags': pdata.get('tags') or [],
+                    'variants': [],
+                    'price_min': pdata.get('price', 0.0),
+                    'price_max': pdata.get('price', 0.0),
+                    'price_with_tax_min': pdata.get('price_with_tax', pdata.get('price', 0.0)),
+                    'price_with_tax_max': pdata.get('price_with_tax', pdata.get('price', 0.0)),
+                    'default_variant_id': pdata.get('id'),
+                }
+                templates_map[tmpl_id] = tdata
+
+            # 追加变体
+            tdata['variants'].append({
+                'id': pdata.get('id'),
+                'name': pdata.get('name'),  # 完整产品名称
+                'variant_display_name': pdata.get('variant_display_name', pdata.get('name')),  # 变体显示名称
+                'attribute_values': pdata.get('attribute_values', []),  # 属性值列表
+                'price': pdata.get('price', 0.0),
+                'price_with_tax': pdata.get('price_with_tax', pdata.get('price', 0.0)),
+                'tax_rate': pdata.get('tax_rate', 0.0),
+                'image_url': pdata.get('image_url'),
+                'available': pdata.get('available'),
+                'sold_out': pdata.get('sold_out'),
+            })
+
+            # 更新价格区间
+            price = pdata.get('price', 0.0)
+            price_with_tax = pdata.get('price_with_tax', price)
+            tdata['price_min'] = min(tdata['price_min'], price)
+            tdata['price_max'] = max(tdata['price_max'], price)
+            tdata['price_with_tax_min'] = min(tdata['price_with_tax_min'], price_with_tax)
+            tdata['price_with_tax_max'] = max(tdata['price_with_tax_max'], price_with_tax)
+
+        # 搜索关键字：每种语言整批读取一次模板与标签名称（利用预取，避免逐条 browse）
+        keywords_map = {tmpl_id: set() for tmpl_id in templates_map}
+        templates = self.env['product.template'].sudo().browse(list(templates_map))
+        for l in MENU_KEYWORD_LANGS:
+            for tmpl in templates.with_context(lang=l):
+                keywords = keywords_map[tmpl.id]
+                if tmpl.name:
+                    keywords.add(tmpl.name)
+                for tag in tmpl.qr_tags:
+                    if tag.name:
+                        keywords.add(tag.name)
+        for tmpl_id, tdata in templates_map.items():
+            tdata['search_keywords'] = ' '.join(keywords_map[tmpl_id])
+
+        # 输出模板列表（保持稳定顺序：置顶优先，其次序号、名称）
+        menu['templates'] = sorted(
+            templates_map.values(),
+            key=lambda t: (not t.get('pinned', False), t.get('pinned_sequence', 10), t.get('name', ''))
+        )
+        return menu
+
+
+class AccountTax(models.Model):
+    _inherit = 'account.tax'
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['qr.menu.cache'].invalidate()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['qr.menu.cache'].invalidate()
+        return res
+
+
+class PosCategory(models.Model):
+    _inherit = 'pos.category'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['qr.menu.cache'].invalidate()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['qr.menu.cache'].invalidate()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['qr.menu.cache'].invalidate()
+        return res
+
+
+class PosConfig(models.Model):
+    _inherit = 'pos.config'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'default_fiscal_position_id' in vals:
+            self.env['qr.menu.cache'].invalidate()
+        return res
+
+
+class ProductTemplateAttributeValue(models.Model):
+    _inherit = 'product.template.attribute.value'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'price_extra', 'name', 'ptav_active'} & set(vals):
+            self.env['qr.menu.cache'].invalidate()
+        return res
@@ -10,7 +10,7 @@ from odoo.exceptions import UserError, ValidationError
 
 # PIL for image-based printing (same approach as POS CloudPrinter)
 try:
-    from PIL import Image, ImageDraw, ImageFont
+    from ..tools import raster, ticket_render
     HAS_PIL = True
 except ImportError:
     HAS_PIL = False
@@ -168,6 +168,28 @@ class QrOrder(models.Model):
             record.total_amount = sum(record.line_ids.mapped('subtotal'))
             record.total_qty = sum(record.line_ids.mapped('qty'))
 
+    # 影响顾客端订单状态的字段
+    _QR_STATUS_FIELDS = {'state', 'line_ids', 'pos_order_id', 'session_id'}
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        orders = super().create(vals_list)
+        orders.session_id._mark_status_changed(orders)
+        return orders
+
+    def write(self, vals):
+        sessions = self.session_id
+        res = super().write(vals)
+        if self._QR_STATUS_FIELDS & set(vals):
+            (sessions | self.session_id)._mark_status_changed(self)
+        return res
+
+    def unlink(self):
+        sessions = self.session_id
+        res = super().unlink()
+        sessions._mark_status_changed()
+        return res
+
     def action_submit_order(self):
         """
         提交订单
@@ -341,34 +363,17 @@ class QrOrder(models.Model):
 
     def _append_lines_to_pos_order(self, pos_order, pos_session):
         """将当前 QR 订单的商品行追加到现有 POS 订单"""
+        # 整批计算含税/不含税价格（使用 POS 会话的财务位置）
+        tax_amounts = self.line_ids._get_tax_amounts(pos_session.config_id, currency=pos_session.currency_id)
         for line in self.line_ids:
             product = line.product_id
-            # 获取产品的税率配置
-            fiscal_position = pos_session.config_id.default_fiscal_position_id
-            taxes = product.taxes_id.filtered(lambda t: t.company_id == pos_session.company_id)
-            if fiscal_position:
-                taxes = fiscal_position.map_tax(taxes)
-
-            # 计算含税/不含税价格
-            price_unit = line.price_unit
-            if taxes:
-                tax_result = taxes.compute_all(
-                    price_unit,
-                    currency=pos_session.currency_id,
-                    quantity=line.qty,
-                    product=product,
-                )
-                price_subtotal = tax_result['total_excluded']
-                price_subtotal_incl = tax_result['total_included']
-            else:
-                price_subtotal = price_unit * line.qty
-                price_subtotal_incl = price_subtotal
+            taxes, price_subtotal, price_subtotal_incl = tax_amounts[line.id]
 
             self.env['pos.order.line'].create({
                 'order_id': pos_order.id,
                 'product_id': product.id,
                 'qty': line.qty,
-                'price_unit': price_unit,
+                'price_unit': line.price_unit,
                 'price_subtotal': price_subtotal,
                 'price_subtotal_incl': price_subtotal_incl,
                 'full_product_name': product.name,
@@ -403,31 +408,13 @@ class QrOrder(models.Model):
         total_tax = 0.0
         total_amount = 0.0
 
+        # 整批计算含税/不含税价格（使用 POS 会话的财务位置）
+        tax_amounts = self.line_ids._get_tax_amounts(pos_session.config_id, currency=pos_session.currency_id)
         for line in self.line_ids:
             product = line.product_id
-            # 获取产品的税率配置（使用 POS 会话的财务位置）
-            fiscal_position = pos_session.config_id.default_fiscal_position_id
-            taxes = product.taxes_id.filtered(lambda t: t.company_id == pos_session.company_id)
-            if fiscal_position:
-                taxes = fiscal_position.map_tax(taxes)
-
-            # 计算含税/不含税价格
+            taxes, price_subtotal, price_subtotal_incl = tax_amounts[line.id]
             price_unit = line.price_unit
-            if taxes:
-                # 计算税额
-                tax_result = taxes.compute_all(
-                    price_unit,
-                    currency=pos_session.currency_id,
-                    quantity=line.qty,
-                    product=product,
-                )
-                price_subtotal = tax_result['total_excluded']
-                price_subtotal_incl = tax_result['total_included']
-                line_tax = price_subtotal_incl - price_subtotal
-            else:
-                price_subtotal = price_unit * line.qty
-                price_subtotal_incl = price_subtotal
-                line_tax = 0.0
+            line_tax = price_subtotal_incl - price_subtotal
 
             total_tax += line_tax
             total_amount += price_subtotal_incl
@@ -495,34 +482,17 @@ class QrOrder(models.Model):
         # 获取新批次的订单行
         new_lines = self.line_ids.filtered(lambda l: l.batch_number == batch_number)
 
+        # 整批计算含税/不含税价格
+        tax_amounts = new_lines._get_tax_amounts(pos_session.config_id, currency=pos_session.currency_id)
         for line in new_lines:
             product = line.product_id
-            # 获取产品的税率配置
-            fiscal_position = pos_session.config_id.default_fiscal_position_id
-            taxes = product.taxes_id.filtered(lambda t: t.company_id == pos_session.company_id)
-            if fiscal_position:
-                taxes = fiscal_position.map_tax(taxes)
-
-            # 计算含税/不含税价格
-            price_unit = line.price_unit
-            if taxes:
-                tax_result = taxes.compute_all(
-                    price_unit,
-                    currency=pos_session.currency_id,
-                    quantity=line.qty,
-                    product=product,
-                )
-                price_subtotal = tax_result['total_excluded']
-                price_subtotal_incl = tax_result['total_included']
-            else:
-                price_subtotal = price_unit * line.qty
-                price_subtotal_incl = price_subtotal
+            taxes, price_subtotal, price_subtotal_incl = tax_amounts[line.id]
 
             self.env['pos.order.line'].create({
                 'order_id': self.pos_order_id.id,
                 'product_id': product.id,
                 'qty': line.qty,
-                'price_unit': price_unit,
+                'price_unit': line.price_unit,
                 'price_subtotal': price_subtotal,
                 'price_subtotal_incl': price_subtotal_incl,
                 'full_product_name': product.name,
@@ -726,10 +696,10 @@ class QrOrder(models.Model):
                     ], limit=1)
 
                 if ylhc_printer:
-                    # 使用过滤后的行创建打印任务
-                    self._create_kitchen_print_job(ylhc_printer, pos_order, is_batch=False, qr_lines=filtered_lines)
+                    # 使用过滤后的行登记打印任务（渲染在后台队列完成）
+                    self._enqueue_kitchen_print(ylhc_printer, pos_order, is_batch=False, qr_lines=filtered_lines)
                     printers_sent += 1
-                    _logger.info(f"Created print job for QR order {self.name} on printer {ylhc_printer.name} with {len(filtered_lines)} lines")
+                    _logger.info(f"Queued print job for QR order {self.name} on printer {ylhc_printer.name} with {len(filtered_lines)} lines")
 
             if printers_sent == 0:
                 # 没有找到 YLHC 打印机，回退到旧方式（通知 POS 前端）
@@ -783,6 +753,31 @@ class QrOrder(models.Model):
         pos_config._notify('QR_ORDER_PRINT', notification_data)
         _logger.info(f"Sent legacy print notification to POS frontend for QR order {self.name}")
 
+    def _enqueue_kitchen_print(self, printer, pos_order, is_batch=False, qr_lines=None):
+        """
+        登记厨房打印任务（不在下单事务内渲染小票）
+
+        任务进入该打印机的有序队列，由 qr.print.task 后台派发，
+        最终调用 _dispatch_kitchen_print 渲染并创建打印作业。
+        """
+        self.ensure_one()
+        return self.env['qr.print.task'].enqueue(self, printer, pos_order, is_batch=is_batch, qr_lines=qr_lines)
+
+    def _dispatch_kitchen_print(self, printer, pos_order, is_batch=False, qr_lines=None):
+        """
+        渲染小票并发送到指定打印机（打印队列工作线程调用）
+
+        打印机模型可提供 _dispatch_qr_kitchen_ticket 自行处理
+        （如 Seisei Print Manager 的 seisei.printer），否则按 ylhc.printer 处理。
+
+        Returns:
+            打印作业记录，失败时为 None / 空
+        """
+        self.ensure_one()
+        if hasattr(printer, '_dispatch_qr_kitchen_ticket'):
+            return printer._dispatch_qr_kitchen_ticket(self, pos_order, is_batch=is_batch, qr_lines=qr_lines)
+        return self._create_kitchen_print_job(printer, pos_order, is_batch=is_batch, qr_lines=qr_lines)
+
     def _create_kitchen_print_job(self, ylhc_printer, pos_order, is_batch=False, qr_lines=None):
         """
         创建厨房打印任务
@@ -852,150 +847,80 @@ class QrOrder(models.Model):
 
     def _render_receipt_image(self, pos_order, lines, is_batch=False):
         """
-        使用 PIL 渲染收据图像
+        使用进程内布局渲染器绘制收据图像
 
-        模板格式与 POS KDS (OrderChangePrint.vue) 保持一致
+        模板格式与 POS KDS (OrderChangePrint.vue) 保持一致。字体与字形
+        （重复的菜品名、标题）在进程内缓存，直接输出 1-bit 图像，
+        光栅化时无需再抖动。
 
         Returns:
-            PIL.Image: 收据图像（RGB模式）
+            PIL.Image: 收据图像（'1' 模式）
         """
         from datetime import timezone, timedelta as td
-        import os
-
-        # 图像参数 - 80mm 热敏打印机标准宽度 576 像素
-        # 7.2 像素/mm (576px / 80mm)
-        IMG_WIDTH = 576
-        PADDING_TOP = 5       # 最小上边距
-        PADDING_BOTTOM = 5    # 最小下边距
-        PADDING_SIDE = 16     # 左右边距
+
+        # 80mm 热敏打印机标准宽度 576 像素 (7.2 像素/mm)
         LINE_HEIGHT_NORMAL = 28
         LINE_HEIGHT_LARGE = 48
         LINE_HEIGHT_XLARGE = 64
 
-        # 尝试加载字体，优先使用日文CJK字体
-        font_paths = [
-            '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',  # Debian/Ubuntu
-            '/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc',
-            '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
-            '/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc',
-            '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
-            '/usr/share/fonts/dejavu/DejaVuSans.ttf',
-        ]
-
-        def load_font(size):
-            for path in font_paths:
-                if os.path.exists(path):
-                    try:
-                        return ImageFont.truetype(path, size)
-                    except Exception:
-                        continue
-            return ImageFont.load_default()
-
-        font_small = load_font(20)
-        font_normal = load_font(24)
-        font_large = load_font(36)
-        font_xlarge = load_font(48)
-
-        # 计算所需高度
-        y = PADDING_TOP
+        FONT_SMALL = 20
+        FONT_NORMAL = 24
+        FONT_LARGE = 36
+        FONT_XLARGE = 48
+
         content_lines = []
 
         # === 标题：订单变更名称 ===
         change_seq = self._get_change_sequence(pos_order)
-        change_name = f'Order-{change_seq:03d}'
-        content_lines.append(('center', font_normal, change_name, LINE_HEIGHT_NORMAL))
-        y += LINE_HEIGHT_NORMAL
+        content_lines.append(('center', FONT_NORMAL, f'Order-{change_seq:03d}', LINE_HEIGHT_NORMAL))
 
         # === 订单号 (UID) ===
         order_uid = pos_order.pos_reference or pos_order.name or self.name
-        content_lines.append(('center', font_small, order_uid, LINE_HEIGHT_NORMAL))
-        y += LINE_HEIGHT_NORMAL
+        content_lines.append(('center', FONT_SMALL, order_uid, LINE_HEIGHT_NORMAL))
 
         # === 桌号 + 时间 ===
         table_name = self.table_id.name if self.table_id else ''
         jst = timezone(td(hours=9))
         order_time = datetime.now(jst).strftime('%H:%M')
-        content_lines.append(('two_column', font_xlarge, (table_name, order_time), LINE_HEIGHT_XLARGE))
-        y += LINE_HEIGHT_XLARGE + 10
+        content_lines.append(('two_column', FONT_XLARGE, (table_name, order_time), LINE_HEIGHT_XLARGE))
+        content_lines.append(('spacer', None, None, 10))
 
         # === 客户信息 (如有) ===
         partner = pos_order.partner_id if pos_order.partner_id else None
         if partner:
-            content_lines.append(('center', font_normal, 'CUSTOMER DETAILS', LINE_HEIGHT_NORMAL))
-            y += LINE_HEIGHT_NORMAL
+            content_lines.append(('center', FONT_NORMAL, 'CUSTOMER DETAILS', LINE_HEIGHT_NORMAL))
             if partner.name:
-                content_lines.append(('left', font_normal, partner.name, LINE_HEIGHT_NORMAL))
-                y += LINE_HEIGHT_NORMAL
+                content_lines.append(('left', FONT_NORMAL, partner.name, LINE_HEIGHT_NORMAL))
             if partner.phone:
-                content_lines.append(('left', font_normal, partner.phone, LINE_HEIGHT_NORMAL))
-                y += LINE_HEIGHT_NORMAL
+                content_lines.append(('left', FONT_NORMAL, partner.phone, LINE_HEIGHT_NORMAL))
 
-        # === 分组 ===
+        # === 分组：CANCELED / ORDERED ===
         canceled_lines = [l for l in lines if l.qty <= 0 or l.state == 'cancelled']
         ordered_lines = [l for l in lines if l.qty > 0 and l.state != 'cancelled']
 
-        # CANCELED 分组
-        if canceled_lines:
-            y += 10
-            content_lines.append(('center', font_normal, 'CANCELED', LINE_HEIGHT_NORMAL))
-            y += LINE_HEIGHT_NORMAL
-            for line in canceled_lines:
+        for title, group in (('CANCELED', canceled_lines), ('ORDERED', ordered_lines)):
+            if not group:
+                continue
+            content_lines.append(('spacer', None, None, 10))
+            content_lines.append(('center', FONT_NORMAL, title, LINE_HEIGHT_NORMAL))
+            for line in group:
                 qty = abs(int(line.qty) if line.qty == int(line.qty) else line.qty)
                 product_name = line.product_id.name or ''
-                content_lines.append(('left', font_large, f'{qty}   {product_name}', LINE_HEIGHT_LARGE))
-                y += LINE_HEIGHT_LARGE
+                content_lines.append(('left', FONT_LARGE, f'{qty}   {product_name}', LINE_HEIGHT_LARGE))
                 if line.note:
-                    content_lines.append(('left', font_normal, f'NOTE: {line.note}', LINE_HEIGHT_NORMAL))
-                    y += LINE_HEIGHT_NORMAL
+                    content_lines.append(('left', FONT_NORMAL, f'NOTE: {line.note}', LINE_HEIGHT_NORMAL))
 
-        # ORDERED 分组
-        if ordered_lines:
-            y += 10
-            content_lines.append(('center', font_normal, 'ORDERED', LINE_HEIGHT_NORMAL))
-            y += LINE_HEIGHT_NORMAL
-            for line in ordered_lines:
-                qty = abs(int(line.qty) if line.qty == int(line.qty) else line.qty)
-                product_name = line.product_id.name or ''
-                content_lines.append(('left', font_large, f'{qty}   {product_name}', LINE_HEIGHT_LARGE))
-                y += LINE_HEIGHT_LARGE
-                if line.note:
-                    content_lines.append(('left', font_normal, f'NOTE: {line.note}', LINE_HEIGHT_NORMAL))
-                    y += LINE_HEIGHT_NORMAL
-
-        # 底部留白
-        y += PADDING_BOTTOM
-
-        # 创建图像（白底黑字）
-        img = Image.new('RGB', (IMG_WIDTH, y), color='white')
-        draw = ImageDraw.Draw(img)
-
-        # 绘制内容
-        current_y = PADDING_TOP
-        for align, font, text, height in content_lines:
-            if align == 'center':
-                bbox = draw.textbbox((0, 0), text, font=font)
-                text_width = bbox[2] - bbox[0]
-                x = (IMG_WIDTH - text_width) // 2
-                draw.text((x, current_y), text, font=font, fill='black')
-            elif align == 'left':
-                draw.text((PADDING_SIDE, current_y), text, font=font, fill='black')
-            elif align == 'two_column':
-                left_text, right_text = text
-                draw.text((PADDING_SIDE, current_y), left_text, font=font, fill='black')
-                bbox = draw.textbbox((0, 0), right_text, font=font)
-                text_width = bbox[2] - bbox[0]
-                draw.text((IMG_WIDTH - PADDING_SIDE - text_width, current_y), right_text, font=font, fill='black')
-            current_y += height
-
-        return img
+        return ticket_render.render_ticket(content_lines)
 
     def _image_to_raster_escpos(self, img):
         """
         将 PIL 图像转换为 ESC/POS GS v 0 光栅格式
 
-        使用与 POS CloudPrinter.js 相同的算法：
-        - Floyd-Steinberg 抖动算法转换为单色
-        - GS v 0 光栅图像命令
+        使用共享光栅引擎 (qr_ordering.tools.raster)，抖动方式由系统参数
+        qr_ordering.raster_dither 决定：
+        - floyd_steinberg（默认）: PIL 原生 Floyd-Steinberg 抖动
+        - threshold / bayer: 阈值 / 有序抖动
+        - compat: 旧版浮点算法，输出与 POS CloudPrinter.js 逐字节一致
 
         Args:
             img: PIL.Image 对象
@@ -1003,78 +928,15 @@ class QrOrder(models.Model):
         Returns:
             bytes: ESC/POS 命令
         """
-        # 转换为灰度
-        if img.mode != 'L':
-            img = img.convert('L')
-
-        width, height = img.size
-        pixels = list(img.getdata())
-
-        # Floyd-Steinberg 抖动算法
-        errors = [[0.0] * height for _ in range(width)]
-        raster_data = []
-
-        for y in range(height):
-            for x in range(width):
-                idx = y * width + x
-                old_color = pixels[idx] + errors[x][y]
-                old_color = max(0, min(255, old_color))
-
-                if old_color < 128:
-                    new_color = 0
-                    raster_data.append(1)  # black pixel
-                else:
-                    new_color = 255
-                    raster_data.append(0)  # white pixel
-
-                error = old_color - new_color
-                if error:
-                    if x < width - 1:
-                        errors[x + 1][y] += (7 / 16) * error
-                    if x > 0 and y < height - 1:
-                        errors[x - 1][y + 1] += (3 / 16) * error
-                    if y < height - 1:
-                        errors[x][y + 1] += (5 / 16) * error
-                    if x < width - 1 and y < height - 1:
-                        errors[x + 1][y + 1] += (1 / 16) * error
-
-        # 将像素数据转换为字节（每8个像素一个字节）
-        bytes_per_line = (width + 7) // 8
-        raster_bytes = []
-        for y in range(height):
-            for byte_idx in range(bytes_per_line):
-                byte_val = 0
-                for bit in range(8):
-                    pixel_x = byte_idx * 8 + bit
-                    if pixel_x < width:
-                        pixel_idx = y * width + pixel_x
-                        if raster_data[pixel_idx]:
-                            byte_val |= (0x80 >> bit)
-                raster_bytes.append(byte_val)
-
-        # 构建 ESC/POS 命令
-        commands = bytearray()
+        dither = self.env['ir.config_parameter'].sudo().get_param(
+            'qr_ordering.raster_dither', raster.DITHER_FLOYD_STEINBERG)
+        compat = dither == 'compat'
+        if compat or dither not in raster.DITHER_MODES:
+            if not compat:
+                _logger.warning(f"Unknown raster dither mode '{dither}', using {raster.DITHER_FLOYD_STEINBERG}")
+            dither = raster.DITHER_FLOYD_STEINBERG
 
-        # ESC @ - 初始化
-        commands.extend(b'\x1b\x40')
-
-        # ESC a 1 - 居中对齐
-        commands.extend(b'\x1b\x61\x01')
-
-        # GS v 0 - 光栅位图
-        # GS v 0 m xL xH yL yH d1...dk
-        xL = bytes_per_line & 0xff
-        xH = (bytes_per_line >> 8) & 0xff
-        yL = height & 0xff
-        yH = (height >> 8) & 0xff
-        commands.extend(b'\x1d\x76\x30\x00')  # GS v 0 mode=0
-        commands.extend(bytes([xL, xH, yL, yH]))
-        commands.extend(bytes(raster_bytes))
-
-        # GS V A 0 - 直接半切（不额外走纸）
-        commands.extend(b'\x1d\x56\x41\x00')
-
-        return bytes(commands)
+        return raster.image_to_gs_v0(img, dither=dither, compat=compat, cut=raster.CUT_HALF_DIRECT)
 
     def _generate_escpos_commands_text(self, pos_order, lines, is_batch=False):
         """
@@ -1354,10 +1216,10 @@ class QrOrder(models.Model):
                     ], limit=1)
 
                 if ylhc_printer:
-                    # 使用过滤后的行创建打印任务
-                    self._create_kitchen_print_job(ylhc_printer, pos_order, is_batch=True, qr_lines=filtered_lines)
+                    # 使用过滤后的行登记打印任务（渲染在后台队列完成）
+                    self._enqueue_kitchen_print(ylhc_printer, pos_order, is_batch=True, qr_lines=filtered_lines)
                     printers_sent += 1
-                    _logger.info(f"Created batch print job for QR order {self.name} on printer {ylhc_printer.name} with {len(filtered_lines)} lines")
+                    _logger.info(f"Queued batch print job for QR order {self.name} on printer {ylhc_printer.name} with {len(filtered_lines)} lines")
 
             if printers_sent == 0:
                 # 回退到旧方式
@@ -1553,6 +1415,40 @@ class QrOrderLine(models.Model):
         ('cancelled', 'Cancelled / 已取消'),
     ], string='Status / 状态', default='pending')
 
+    def _get_tax_amounts(self, pos_config, currency=None):
+        """批量计算订单行税额
+
+        Args:
+            pos_config: POS 配置，提供公司与财务位置
+            currency: 计算币种
+
+        Returns:
+            dict: {line_id: (taxes, price_subtotal, price_subtotal_incl)}
+        """
+        amounts = self.env['product.product']._qr_compute_taxes_batch(
+            [(line.product_id, line.price_unit, line.qty) for line in self],
+            pos_config,
+            currency=currency,
+        )
+        return dict(zip(self.ids, amounts))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        lines.order_id.session_id._mark_status_changed(lines.order_id)
+        return lines
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.order_id.session_id._mark_status_changed(self.order_id)
+        return res
+
+    def unlink(self):
+        orders = self.order_id
+        res = super().unlink()
+        orders.session_id._mark_status_changed(orders)
+        return res
+
     @api.depends('product_id', 'qty')
     def _compute_price(self):
         """计算价格"""
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from odoo import api, fields, models, SUPERUSER_ID
+from odoo.modules.registry import Registry
+
+_logger = logging.getLogger(__name__)
+
+# 并行派发的打印机队列数（每台打印机同一时刻只有一个线程处理）
+PRINT_WORKERS_PARAM = 'qr_ordering.print_workers'
+_DEFAULT_PRINT_WORKERS = 4
+
+# 重试：5s, 10s, 20s, 40s 后放弃
+_MAX_ATTEMPTS = 5
+_RETRY_BASE_DELAY = 5  # seconds
+_RETRY_MAX_DELAY = 300  # seconds
+
+# 已完成任务保留天数
+_DONE_TASK_RETENTION_DAYS = 7
+
+
+class QrPrintTask(models.Model):
+    """厨房打印队列
+
+    下单事务只登记任务（不渲染小票），提交后由 cron 工作线程渲染并派发。
+    每台打印机一个有序队列（按 id 顺序），失败时按指数退避重试，
+    latency_ms 记录从下单到派发完成的耗时。
+    """
+    _name = 'qr.print.task'
+    _description = 'QR Kitchen Print Task / 厨房打印任务'
+    _order = 'id desc'
+
+    qr_order_id = fields.Many2one(
+        'qr.order',
+        string='QR Order / QR订单',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    pos_order_id = fields.Many2one(
+        'pos.order',
+        string='POS Order / POS订单',
+        ondelete='cascade'
+    )
+    line_ids = fields.Many2many(
+        'qr.order.line',
+        string='Lines / 打印菜品'
+    )
+    is_batch = fields.Boolean(
+        string='Add Items / 加菜单',
+        default=False
+    )
+
+    # 目标打印机（ylhc.printer / seisei.printer，两者均为可选模块）
+    printer_model = fields.Char(
+        string='Printer Model / 打印机模型',
+        required=True
+    )
+    printer_res_id = fields.Integer(
+        string='Printer ID / 打印机ID',
+        required=True
+    )
+    queue_key = fields.Char(
+        string='Queue / 队列',
+        required=True,
+        index=True,
+        help='每台打印机一个队列：{printer_model},{printer_res_id}'
+    )
+
+    state = fields.Selection([
+        ('queued', 'Queued / 排队中'),
+        ('done', 'Done / 已派发'),
+        ('failed', 'Failed / 失败'),
+    ], string='Status / 状态', default='queued', required=True, index=True)
+    attempts = fields.Integer(
+        string='Attempts / 尝试次数',
+        default=0
+    )
+    next_attempt_at = fields.Datetime(
+        string='Next Attempt / 下次尝试',
+        default=fields.Datetime.now
+    )
+    dispatched_at = fields.Datetime(
+        string='Dispatched At / 派发时间',
+        readonly=True
+    )
+    latency_ms = fields.Integer(
+        string='Latency (ms) / 延迟',
+        readonly=True,
+        help='从登记到派发完成的耗时（毫秒）'
+    )
+    render_ms = fields.Integer(
+        string='Render (ms) / 渲染耗时',
+        readonly=True
+    )
+    error_message = fields.Text(
+        string='Error Message / 错误信息'
+    )
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    @api.model
+    def enqueue(self, qr_order, printer, pos_order, is_batch=False, qr_lines=None):
+        """登记打印任务，事务提交后唤醒派发 cron
+
+        Args:
+            qr_order: qr.order 记录
+            printer: ylhc.printer / seisei.printer 记录
+            pos_order: pos.order 记录
+            is_batch: 是否为加菜单
+            qr_lines: 要打印的订单行，为空时打印全部
+
+        Returns:
+            qr.print.task: 新任务
+        """
+        lines = qr_lines if qr_lines else qr_order.line_ids
+        task = self.sudo().create({
+            'qr_order_id': qr_order.id,
+            'pos_order_id': pos_order.id,
+            'line_ids': [(6, 0, lines.ids)],
+            'is_batch': is_batch,
+            'printer_model': printer._name,
+            'printer_res_id': printer.id,
+            'queue_key': f'{printer._name},{printer.id}',
+        })
+        self._trigger_dispatch()
+        return task
+
+    @api.model
+    def get_latency_stats(self, hours=1):
+        """最近 N 小时的派发延迟统计（毫秒）
+
+        Returns:
+            dict: {'count', 'avg_ms', 'p50_ms', 'p95_ms', 'failed', 'queued'}
+        """
+        self.flush_model()
+        since = fields.Datetime.now() - timedelta(hours=hours)
+        self.env.cr.execute("""
+            SELECT count(*) FILTER (WHERE state = 'done'),
+                   avg(latency_ms) FILTER (WHERE state = 'done'),
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY latency_ms)
+                       FILTER (WHERE state = 'done'),
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY latency_ms)
+                       FILTER (WHERE state = 'done'),
+                   count(*) FILTER (WHERE state = 'failed'),
+                   count(*) FILTER (WHERE state = 'queued')
+              FROM qr_print_task
+             WHERE create_date >= %s
+        """, [since])
+        count, avg_ms, p50, p95, failed, queued = self.env.cr.fetchone()
+        return {
+            'count': count,
+            'avg_ms': round(avg_ms or 0.0, 1),
+            'p50_ms': round(p50 or 0.0, 1),
+            'p95_ms': round(p95 or 0.0, 1),
+            'failed': failed,
+            'queued': queued,
+        }
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _cron_dispatch(self):
+        """派发所有到期任务：每个打印机队列一个线程，队列内按顺序处理"""
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT DISTINCT queue_key
+              FROM qr_print_task
+             WHERE state = 'queued'
+               AND next_attempt_at <= %s
+        """, [fields.Datetime.now()])
+        queue_keys = [row[0] for row in self.env.cr.fetchall()]
+        if not queue_keys:
+            return
+
+        workers = min(len(queue_keys), self._get_worker_count())
+        if workers <= 1 or getattr(threading.current_thread(), 'testing', False):
+            for queue_key in queue_keys:
+                self._drain_queue(queue_key)
+            return
+
+        dbname = self.env.cr.dbname
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='qr_print') as pool:
+            for queue_key in queue_keys:
+                pool.submit(self._drain_queue_in_thread, dbname, queue_key)
+
+    @api.model
+    def _drain_queue_in_thread(self, dbname, queue_key):
+        try:
+            with Registry(dbname).cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                env['qr.print.task']._drain_queue(queue_key)
+        except Exception:
+            _logger.exception("QR print queue %s crashed", queue_key)
+
+    @api.model
+    def _drain_queue(self, queue_key):
+        """按 id 顺序处理一个打印机队列；队首未到重试时间时停止，保证出单顺序
+
+        cron 本身不会并发运行，同一队列只会由一个线程处理。
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        while True:
+            task = self.search([
+                ('queue_key', '=', queue_key),
+                ('state', '=', 'queued'),
+            ], order='id', limit=1)
+            if not task:
+                break
+            if task.next_attempt_at and task.next_attempt_at > fields.Datetime.now():
+                break
+            if not task._run():
+                break
+            if auto_commit:
+                self.env.cr.commit()
+
+    def _run(self):
+        """渲染并派发单个任务
+
+        Returns:
+            bool: True 表示任务已出队（成功或最终失败），False 表示等待重试
+        """
+        self.ensure_one()
+        printer = self._get_printer()
+        if not printer:
+            self.write({
+                'state': 'failed',
+                'error_message': f'Printer {self.queue_key} not found',
+            })
+            _logger.warning("QR print task %s dropped: printer %s not found", self.id, self.queue_key)
+            return True
+
+        started = time.monotonic()
+        error = None
+        try:
+            with self.env.cr.savepoint():
+                job = self.qr_order_id._dispatch_kitchen_print(
+                    printer, self.pos_order_id, is_batch=self.is_batch, qr_lines=self.line_ids,
+                )
+                if not job:
+                    error = 'Print job was not created'
+        except Exception as e:
+            error = str(e)
+        render_ms = int((time.monotonic() - started) * 1000)
+
+        if error:
+            return self._schedule_retry(error)
+
+        now = fields.Datetime.now()
+        latency_ms = int((now - self.create_date).total_seconds() * 1000)
+        self.write({
+            'state': 'done',
+            'attempts': self.attempts + 1,
+            'dispatched_at': now,
+            'latency_ms': latency_ms,
+            'render_ms': render_ms,
+            'error_message': False,
+        })
+        _logger.info(
+            "Dispatched QR print task %s (%s, order %s): latency=%dms render=%dms",
+            self.id, self.queue_key, self.qr_order_id.name, latency_ms, render_ms,
+        )
+        return True
+
+    def _schedule_retry(self, error):
+        self.ensure_one()
+        attempts = self.attempts + 1
+        if attempts >= _MAX_ATTEMPTS:
+            self.write({'state': 'failed', 'attempts': attempts, 'error_message': error})
+            _logger.error("QR print task %s failed after %d attempts: %s", self.id, attempts, error)
+            return True
+
+        delay = min(_RETRY_MAX_DELAY, _RETRY_BASE_DELAY * 2 ** (attempts - 1))
+        next_attempt_at = fields.Datetime.now() + timedelta(seconds=delay)
+        self.write({
+            'attempts': attempts,
+            'next_attempt_at': next_attempt_at,
+            'error_message': error,
+        })
+        self._trigger_dispatch(at=next_attempt_at)
+        _logger.warning("QR print task %s failed (attempt %d), retry in %ds: %s", self.id, attempts, delay, error)
+        return False
+
+    def _get_printer(self):
+        self.ensure_one()
+        if self.printer_model not in self.env:
+            return None
+        return self.env[self.printer_model].sudo().browse(self.printer_res_id).exists()
+
+    @api.model
+    def _get_worker_count(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(PRINT_WORKERS_PARAM)
+        try:
+            return max(1, int(value)) if value else _DEFAULT_PRINT_WORKERS
+        except ValueError:
+            return _DEFAULT_PRINT_WORKERS
+
+    @api.model
+    def _trigger_dispatch(self, at=None):
+        cron = self.env.ref('qr_ordering.ir_cron_dispatch_print_tasks', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger(at)
+
+    @api.autovacuum
+    def _gc_done_tasks(self):
+        """清理已派发的历史任务"""
+        cutoff = fields.Datetime.now() - timedelta(days=_DONE_TASK_RETENTION_DAYS)
+        self.search([('state', '=', 'done'), ('create_date', '<', cutoff)]).unlink()
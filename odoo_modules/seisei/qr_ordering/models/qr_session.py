@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 
 import secrets
+import threading
+import time
 from datetime import datetime, timedelta
 from odoo import models, fields, api
 from odoo.exceptions import UserError, ValidationError
@@ -8,6 +10,32 @@ from odoo.exceptions import UserError, ValidationError
 import logging
 _logger = logging.getLogger(__name__)
 
+# Module-level cache: {(dbname, table_token): (table_id, session_id, expire_time, cached_until)}
+# 本进程内 qr.table / qr.session 写入时立即失效；其他 worker 的写入依赖 TTL
+_token_cache = {}
+_token_cache_lock = threading.Lock()
+_TOKEN_CACHE_TTL = 10  # seconds
+_TOKEN_CACHE_MAX_ENTRIES = 4096
+
+# 本事务内订单状态有变化的会话：{session_id: set(qr_order_id)}，提交前统一推送
+_STATUS_PRECOMMIT_KEY = 'qr_ordering.status_changed_sessions'
+
+
+def invalidate_token_cache(dbname, table_ids=None):
+    """使餐桌 token 缓存失效
+
+    Args:
+        dbname: 数据库名
+        table_ids: 需要失效的餐桌 ID，None 表示该数据库全部
+    """
+    with _token_cache_lock:
+        stale = [
+            key for key, entry in _token_cache.items()
+            if key[0] == dbname and (table_ids is None or entry[0] in table_ids)
+        ]
+        for key in stale:
+            _token_cache.pop(key, None)
+
 
 class QrSession(models.Model):
     """点餐会话模型 - 用于防恶意点餐和状态管理"""
@@ -90,6 +118,15 @@ class QrSession(models.Model):
         store=True
     )
 
+    # 订单状态版本号（客户端轮询游标）
+    status_version = fields.Integer(
+        string='Status Version / 状态版本',
+        default=0,
+        readonly=True,
+        copy=False,
+        help='会话内订单状态或菜品变化时递增，客户端据此判断是否需要重新拉取订单'
+    )
+
     _sql_constraints = [
         ('access_token_unique', 'unique(access_token)', 'Access token must be unique!'),
     ]
@@ -146,6 +183,11 @@ class QrSession(models.Model):
         - 所有人共享同一个会话（current_session_id）
         - access_token 用于区分不同客户端，但不阻止新客户加入
         """
+        # 快速路径：token 对应的餐桌有未过期的活跃会话，直接返回（不产生任何写入）
+        session = self._get_active_session_by_token(table_token)
+        if session:
+            return session, None, None
+
         # 查找餐桌
         table = self.env['qr.table'].sudo().search([
             ('qr_token', '=', table_token),
@@ -179,6 +221,120 @@ class QrSession(models.Model):
         # 没有活跃会话，创建新会话
         return self._create_new_session(table, client_ip)
 
+    @api.model
+    def _get_active_session_by_token(self, table_token):
+        """按餐桌 token 获取有效会话（带进程内缓存）
+
+        Returns:
+            qr.session: 未关闭且未过期的当前会话；不存在时为空记录集
+        """
+        if not table_token:
+            return self.browse()
+
+        key = (self.env.cr.dbname, table_token)
+        entry = _token_cache.get(key)
+        if entry is None or entry[3] < time.time():
+            entry = self._lookup_token(table_token)
+            if entry is None:
+                return self.browse()
+            with _token_cache_lock:
+                if len(_token_cache) >= _TOKEN_CACHE_MAX_ENTRIES:
+                    _token_cache.clear()
+                _token_cache[key] = entry
+
+        _table_id, session_id, expire_time, _cached_until = entry
+        if expire_time <= fields.Datetime.now():
+            # 已过期：交给慢路径关闭并重建会话
+            return self.browse()
+        return self.sudo().browse(session_id)
+
+    @api.model
+    def _lookup_token(self, table_token):
+        """单条 SQL 查询餐桌及其活跃会话
+
+        Returns:
+            tuple: (table_id, session_id, expire_time, cached_until)，无活跃会话时为 None
+        """
+        self.env['qr.table'].flush_model(['qr_token', 'active', 'current_session_id'])
+        self.flush_model(['state', 'expire_time'])
+        self.env.cr.execute("""
+            SELECT t.id, s.id, s.expire_time
+              FROM qr_table t
+              JOIN qr_session s ON s.id = t.current_session_id
+             WHERE t.qr_token = %s
+               AND t.active
+               AND s.state != 'closed'
+        """, [table_token])
+        row = self.env.cr.fetchone()
+        if not row:
+            return None
+        return row[0], row[1], row[2], time.time() + _TOKEN_CACHE_TTL
+
+    def write(self, vals):
+        table_ids = set(self.table_id.ids)
+        res = super().write(vals)
+        if {'state', 'expire_time', 'table_id'} & set(vals):
+            invalidate_token_cache(self.env.cr.dbname, table_ids | set(self.table_id.ids))
+        if 'state' in vals:
+            self._mark_status_changed()
+        return res
+
+    def unlink(self):
+        table_ids = set(self.table_id.ids)
+        res = super().unlink()
+        invalidate_token_cache(self.env.cr.dbname, table_ids)
+        return res
+
+    def _mark_status_changed(self, qr_orders=None):
+        """标记会话订单状态有变化
+
+        同一事务内的多次变更合并，提交前每个会话只递增一次版本号并推送一条总线消息。
+
+        Args:
+            qr_orders: 发生变化的 qr.order 记录（用于推送增量）
+        """
+        if not self:
+            return
+        precommit = self.env.cr.precommit
+        pending = precommit.data.get(_STATUS_PRECOMMIT_KEY)
+        if pending is None:
+            pending = precommit.data[_STATUS_PRECOMMIT_KEY] = {}
+            precommit.add(self.sudo().browse()._flush_status_changes)
+        for session in self:
+            order_ids = pending.setdefault(session.id, set())
+            if qr_orders:
+                order_ids.update(qr_orders.filtered(lambda o: o.session_id == session).ids)
+
+    def _flush_status_changes(self):
+        """递增版本号并通过 bus.bus 推送增量（precommit 回调）"""
+        pending = self.env.cr.precommit.data.pop(_STATUS_PRECOMMIT_KEY, {})
+        sessions = self.browse(sorted(pending)).exists()
+        if not sessions:
+            return
+
+        self.env.cr.execute("""
+            UPDATE qr_session
+               SET status_version = status_version + 1
+             WHERE id IN %s
+         RETURNING id, status_version
+        """, [tuple(sessions.ids)])
+        versions = dict(self.env.cr.fetchall())
+        sessions.invalidate_recordset(['status_version'])
+
+        QrOrder = self.env['qr.order']
+        for session in sessions:
+            orders = QrOrder.browse(sorted(pending[session.id])).exists()
+            self.env['bus.bus']._sendone(f'qr_order_{session.access_token}', 'qr_order_status', {
+                'version': versions[session.id],
+                'session_state': session.state,
+                'orders': [{
+                    'id': order.id,
+                    'name': order.name,
+                    'state': order.state,
+                    'total_amount': order.total_amount,
+                } for order in orders],
+            })
+
     def _create_new_session(self, table, client_ip=None):
         """创建新的点餐会话"""
         # 关闭餐桌的旧会话
@@ -9,6 +9,8 @@ from datetime import datetime, timedelta
 from odoo import models, fields, api
 from odoo.exceptions import UserError
 
+from .qr_session import invalidate_token_cache
+
 import logging
 _logger = logging.getLogger(__name__)
 
@@ -150,7 +152,16 @@ class QrTable(models.Model):
                     )
                     vals = {k: v for k, v in vals.items() if k not in protected_fields}
                     break
-        return super().write(vals)
+        res = super().write(vals)
+        if {'qr_token', 'active', 'current_session_id'} & set(vals):
+            invalidate_token_cache(self.env.cr.dbname, set(self.ids))
+        return res
+
+    def unlink(self):
+        table_ids = set(self.ids)
+        res = super().unlink()
+        invalidate_token_cache(self.env.cr.dbname, table_ids)
+        return res
 
     def copy(self, default=None):
         """复制餐桌时，强制生成新的 qr_token 和 short_code"""
@@ -4,3 +4,9 @@ from . import test_pos_order_flow
 from . import test_inventory_consumption
 from . import test_purchase_requisition
 from . import test_full_flow_integration
+from . import test_escpos_raster
+from . import test_menu_cache
+from . import test_qr_pricing
+from . import test_session_token_cache
+from . import test_order_status_push
+from . import test_print_queue
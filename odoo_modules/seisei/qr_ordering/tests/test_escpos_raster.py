@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+ESC/POS 光栅引擎测试
+====================
+
+测试范围：
+- compat 模式与旧版逐像素实现逐字节一致
+- 各抖动模式输出的 GS v 0 头部与数据长度
+- Seisei Print Manager 走纸/切纸尾部格式
+- 进程内小票渲染器：1-bit 直出与字形缓存
+"""
+
+from odoo.tests.common import TransactionCase, tagged
+
+from PIL import Image, ImageDraw
+
+from odoo.addons.qr_ordering.tools import raster, ticket_render
+
+
+def _legacy_raster_bytes(img):
+    """旧版 qr.order._image_to_raster_escpos 的位图算法（参考实现）"""
+    img = img.convert('L')
+    width, height = img.size
+    pixels = list(img.tobytes())
+    errors = [[0.0] * height for _ in range(width)]
+    raster_data = []
+    for y in range(height):
+        for x in range(width):
+            old_color = max(0, min(255, pixels[y * width + x] + errors[x][y]))
+            if old_color < 128:
+                new_color = 0
+                raster_data.append(1)
+            else:
+                new_color = 255
+                raster_data.append(0)
+            error = old_color - new_color
+            if error:
+                if x < width - 1:
+                    errors[x + 1][y] += (7 / 16) * error
+                if x > 0 and y < height - 1:
+                    errors[x - 1][y + 1] += (3 / 16) * error
+                if y < height - 1:
+                    errors[x][y + 1] += (5 / 16) * error
+                if x < width - 1 and y < height - 1:
+                    errors[x + 1][y + 1] += (1 / 16) * error
+    bytes_per_line = (width + 7) // 8
+    raster_bytes = bytearray()
+    for y in range(height):
+        for byte_idx in range(bytes_per_line):
+            byte_val = 0
+            for bit in range(8):
+                pixel_x = byte_idx * 8 + bit
+                if pixel_x < width and raster_data[y * width + pixel_x]:
+                    byte_val |= (0x80 >> bit)
+            raster_bytes.append(byte_val)
+    return bytes(raster_bytes)
+
+
+@tagged('post_install', '-at_install', 'qr_ordering', 'raster')
+class TestEscposRaster(TransactionCase):
+    """测试共享光栅引擎"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # 非 8 的整数倍宽度，覆盖行尾补齐
+        cls.img = Image.new('RGB', (101, 40), color='white')
+        draw = ImageDraw.Draw(cls.img)
+        draw.rectangle((4, 4, 60, 14), fill='black')
+        for i, shade in enumerate((32, 96, 160, 224)):
+            draw.rectangle((4 + i * 24, 20, 24 + i * 24, 36), fill=(shade, shade, shade))
+
+    def _header(self, img):
+        bytes_per_line = (img.size[0] + 7) // 8
+        height = img.size[1]
+        return b'\x1b\x40\x1b\x61\x01\x1d\x76\x30\x00' + bytes([
+            bytes_per_line & 0xff, bytes_per_line >> 8, height & 0xff, height >> 8,
+        ])
+
+    def test_compat_matches_legacy(self):
+        """compat 模式与旧实现逐字节一致"""
+        expected = self._header(self.img) + _legacy_raster_bytes(self.img) + b'\x1d\x56\x41\x00'
+        self.assertEqual(raster.image_to_gs_v0(self.img, compat=True), expected)
+
+    def test_dither_modes(self):
+        """各抖动模式数据长度正确，纯黑/纯白像素不受抖动影响"""
+        data_len = ((101 + 7) // 8) * 40
+        for mode in raster.DITHER_MODES:
+            bytes_per_line, height, data = raster.rasterize(self.img, dither=mode)
+            self.assertEqual((bytes_per_line, height), (13, 40), mode)
+            self.assertEqual(len(data), data_len, mode)
+            # 第 5 行左侧为纯黑块
+            self.assertEqual(data[5 * 13 + 1], 0xff, mode)
+            # 行尾补齐位为 0
+            self.assertEqual(data[5 * 13 + 12] & 0x07, 0, mode)
+            # 第 0 行纯白
+            self.assertEqual(data[:13], bytes(13), mode)
+
+    def test_compat_ignores_dither_mode(self):
+        """compat=True 时不校验 dither（qr_ordering.raster_dither=compat 的取值）"""
+        expected = raster.image_to_gs_v0(self.img, compat=True)
+        self.assertEqual(raster.image_to_gs_v0(self.img, dither='compat', compat=True), expected)
+
+    def test_order_compat_param(self):
+        """qr_ordering.raster_dither=compat 时厨房单走旧版算法"""
+        self.env['ir.config_parameter'].sudo().set_param('qr_ordering.raster_dither', 'compat')
+        expected = self._header(self.img) + _legacy_raster_bytes(self.img) + b'\x1d\x56\x41\x00'
+        self.assertEqual(self.env['qr.order']._image_to_raster_escpos(self.img), expected)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            raster.rasterize(self.img, dither='halftone')
+
+    def test_feed_and_cut_trailer(self):
+        """Seisei Print Manager 尾部：ESC d 3 + GS V 1"""
+        commands = raster.image_to_gs_v0(self.img, feed_lines=3, cut=raster.CUT_PARTIAL)
+        self.assertTrue(commands.startswith(self._header(self.img)))
+        self.assertTrue(commands.endswith(b'\x1bd\x03\x1dV\x01'))
+
+
+@tagged('post_install', '-at_install', 'qr_ordering', 'raster')
+class TestTicketRender(TransactionCase):
+    """测试进程内小票渲染器"""
+
+    def setUp(self):
+        super().setUp()
+        ticket_render.clear_glyph_cache()
+        self.lines = [
+            ('center', 24, 'Order-001', 28),
+            ('two_column', 48, ('A12', '12:30'), 64),
+            ('spacer', None, None, 10),
+            ('rule', None, None, 16),
+            ('banner', 20, 'New', 38),
+            ('left', 36, '2   Gyoza', 48),
+            ('left', 36, '2   Gyoza', 48),
+        ]
+
+    def test_render_one_bit(self):
+        """输出 '1' 模式图像，高度为各行高度之和加上下边距"""
+        img = ticket_render.render_ticket(self.lines)
+        height = sum(line[3] for line in self.lines) + ticket_render.PADDING_TOP + ticket_render.PADDING_BOTTOM
+        self.assertEqual(img.mode, '1')
+        self.assertEqual(img.size, (ticket_render.TICKET_WIDTH, height))
+        # 有墨迹
+        self.assertLess(img.convert('L').getextrema()[0], 128)
+
+    def test_glyph_cache_reused(self):
+        """重复的文本只渲染一次"""
+        first = ticket_render.render_text('2   Gyoza', 36)
+        second = ticket_render.render_text('2   Gyoza', 36)
+        self.assertIs(first, second)
+
+    def test_one_bit_raster_matches_threshold(self):
+        """1-bit 图像直接打包，与阈值二值化结果一致"""
+        img = ticket_render.render_ticket(self.lines)
+        direct = raster.rasterize(img)
+        thresholded = raster.rasterize(img.convert('L'), dither=raster.DITHER_THRESHOLD)
+        self.assertEqual(direct, thresholded)
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            ticket_render.render_ticket([('marquee', 24, 'x', 28)])
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+菜单快照缓存测试
+================
+
+测试范围：
+- 同一 (POS 配置, 语言, 版本) 复用快照
+- 售罄 / 价格变更使快照失效
+- 无关字段写入不使快照失效
+- 版本号在提交后递增，每个事务只递增一次
+- 旧版本快照不覆盖已缓存的新版本
+"""
+from contextlib import nullcontext
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase, tagged
+
+from odoo.addons.qr_ordering.models import qr_menu_cache
+from odoo.addons.qr_ordering.models.qr_menu_cache import MENU_DIRTY_KEY
+
+
+@tagged('post_install', '-at_install', 'qr_ordering', 'menu_cache')
+class TestQrMenuCache(TransactionCase):
+    """测试菜单快照缓存与失效"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.pos_config = cls.env['pos.config'].create({
+            'name': 'Test Menu Cache POS',
+        })
+        cls.product = cls.env['product.product'].create({
+            'name': 'Test Udon / 测试乌冬',
+            'type': 'consu',
+            'list_price': 800.0,
+            'available_in_pos': True,
+        })
+        cls.MenuCache = cls.env['qr.menu.cache']
+
+    def setUp(self):
+        super().setUp()
+        self.MenuCache.clear_cache()
+        # 测试不提交，上一个用例登记的版本递增不会执行
+        self.env.cr.postcommit.data.pop(MENU_DIRTY_KEY, None)
+
+    def _menu_product_ids(self, snapshot):
+        return [p['id'] for p in snapshot['data']['products']]
+
+    def test_01_snapshot_reused(self):
+        """版本不变时返回同一快照"""
+        first = self.MenuCache.get_snapshot(self.pos_config, 'zh_CN')
+        second = self.MenuCache.get_snapshot(self.pos_config, 'zh_CN')
+        self.assertIs(first, second)
+        self.assertIn(self.product.id, self._menu_product_ids(first))
+        self.assertTrue(first['etag'].startswith('"'))
+
+    def test_02_sold_out_invalidates(self):
+        """售罄后菜单不再包含该菜品"""
+        before = self.MenuCache.get_snapshot(self.pos_config, 'zh_CN')
+        self.product.product_tmpl_id.qr_sold_out = True
+        after = self.MenuCache.get_snapshot(self.pos_config, 'zh_CN')
+        self.assertNotEqual(before['etag'], after['etag'])
+        self.assertNotIn(self.product.id, self._menu_product_ids(after))
+
+    def test_03_price_change_invalidates(self):
+        """价格变更后快照重建"""
+        self.MenuCache.get_snapshot(self.pos_config, 'zh_CN')
+        self.product.product_tmpl_id.list_price = 900.0
+        after = self.MenuCache.get_snapshot(self.pos_config, 'zh_CN')
+        prices = {p['id']: p['price'] for p in after['data']['products']}
+        self.assertEqual(prices[self.product.id], 900.0)
+
+    def test_04_unrelated_write_keeps_snapshot(self):
+        """与菜单无关的字段写入不使缓存失效"""
+        before = self.MenuCache.get_snapshot(self.pos_config, 'zh_CN')
+        self.product.product_tmpl_id.default_code = 'UDON-01'
+        after = self.MenuCache.get_snapshot(self.pos_config, 'zh_CN')
+        self.assertIs(before, after)
+
+    def test_05_version_bumped_once_after_commit(self):
+        """失效只登记一次提交后回调，回调递增版本号"""
+        version = self.MenuCache._get_version()
+        postcommit = self.env.cr.postcommit
+        hooks = len(postcommit._funcs)
+        self.MenuCache.invalidate()
+        self.MenuCache.invalidate()
+        self.assertEqual(len(postcommit._funcs), hooks + 1)
+        self.assertEqual(self.MenuCache._get_version(), version)
+
+        # 回调使用独立游标并提交；测试中改用本事务游标，不向数据库泄漏版本行
+        with patch.object(self.env.registry, 'cursor', lambda: nullcontext(self.env.cr)):
+            self.MenuCache._bump_version()
+        self.assertGreater(self.MenuCache._get_version(), version)
+
+    def test_06_older_version_keeps_newer_snapshot(self):
+        """旧快照中的请求不淘汰、不覆盖其他请求缓存的新版本"""
+        version = self.MenuCache._get_version()
+        dbname = self.env.cr.dbname
+        newer_key = (dbname, self.pos_config.id, 'zh_CN', version + 1)
+        older_key = (dbname, self.pos_config.id, 'zh_CN', version - 1)
+        newer = {'etag': '"newer"', 'data': {}, 'payload': b'{}'}
+        qr_menu_cache._menu_cache[newer_key] = newer
+        qr_menu_cache._menu_cache[older_key] = newer
+
+        snapshot = self.MenuCache.get_snapshot(self.pos_config, 'zh_CN')
+        self.assertIn(self.product.id, self._menu_product_ids(snapshot))
+        self.assertIs(qr_menu_cache._menu_cache.get(newer_key), newer)
+        self.assertNotIn((dbname, self.pos_config.id, 'zh_CN', version), qr_menu_cache._menu_cache)
+
+        # 没有更新版本时写入并淘汰更旧的版本
+        del qr_menu_cache._menu_cache[newer_key]
+        self.MenuCache.get_snapshot(self.pos_config, 'zh_CN')
+        self.assertIn((dbname, self.pos_config.id, 'zh_CN', version), qr_menu_cache._menu_cache)
+        self.assertNotIn(older_key, qr_menu_cache._menu_cache)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+订单状态推送测试
+================
+
+测试范围：
+- 同一事务内多次变更只递增一次版本号
+- 通过 bus.bus 推送增量
+- 与顾客端无关的写入不产生推送
+"""
+
+import json
+
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install', 'qr_ordering', 'status_push')
+class TestOrderStatusPush(TransactionCase):
+    """测试会话状态版本号与总线推送"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.pos_config = cls.env['pos.config'].create({
+            'name': 'Test Status Push POS',
+        })
+        cls.table = cls.env['qr.table'].create({
+            'name': 'Push Table 01',
+            'pos_config_id': cls.pos_config.id,
+        })
+        cls.product = cls.env['product.product'].create({
+            'name': 'Test Ramen / 测试拉面',
+            'type': 'consu',
+            'list_price': 900.0,
+            'available_in_pos': True,
+        })
+        cls.session = cls.env['qr.session'].create({'table_id': cls.table.id})
+        cls.order = cls.env['qr.order'].create({'session_id': cls.session.id})
+        cls.env.cr.precommit.run()
+
+    def _commit_hooks(self):
+        self.env.cr.precommit.run()
+        self.session.invalidate_recordset(['status_version'])
+
+    def _pushed(self):
+        return self.env['bus.bus'].search([
+            ('channel', 'like', f'qr_order_{self.session.access_token}'),
+            ('message', 'like', 'qr_order_status'),
+        ])
+
+    def test_01_changes_coalesced(self):
+        """加菜 + 改状态在同一事务内只推送一次"""
+        version = self.session.status_version
+        before = len(self._pushed())
+
+        self.env['qr.order.line'].create({
+            'order_id': self.order.id,
+            'product_id': self.product.id,
+            'qty': 2,
+        })
+        self.order.state = 'ordered'
+        self._commit_hooks()
+
+        self.assertEqual(self.session.status_version, version + 1)
+        pushed = self._pushed()
+        self.assertEqual(len(pushed), before + 1)
+        message = json.loads(pushed.sorted('id')[-1].message)
+        self.assertEqual(message['payload']['version'], version + 1)
+        self.assertEqual(message['payload']['orders'][0]['state'], 'ordered')
+
+    def test_02_unrelated_write_not_pushed(self):
+        """备注等无关字段写入不递增版本"""
+        version = self.session.status_version
+        self.order.note = 'no onion'
+        self._commit_hooks()
+        self.assertEqual(self.session.status_version, version)
+
+    def test_03_session_close_pushed(self):
+        """会话关闭同样通知顾客端"""
+        version = self.session.status_version
+        self.session.action_close()
+        self._commit_hooks()
+        self.assertEqual(self.session.status_version, version + 1)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+厨房打印队列测试
+================
+
+测试范围：
+- 登记任务时不渲染小票
+- 每台打印机按登记顺序派发，并记录延迟
+- 失败时指数退避重试，超过次数后标记失败
+"""
+
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install', 'qr_ordering', 'print_queue')
+class TestPrintQueue(TransactionCase):
+    """测试 qr.print.task 队列"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.pos_config = cls.env['pos.config'].create({
+            'name': 'Test Print Queue POS',
+        })
+        cls.table = cls.env['qr.table'].create({
+            'name': 'Queue Table 01',
+            'pos_config_id': cls.pos_config.id,
+        })
+        cls.product = cls.env['product.product'].create({
+            'name': 'Test Gyoza / 测试煎饺',
+            'type': 'consu',
+            'list_price': 400.0,
+            'available_in_pos': True,
+        })
+        session = cls.env['qr.session'].create({'table_id': cls.table.id})
+        cls.order = cls.env['qr.order'].create({'session_id': session.id})
+        cls.env['qr.order.line'].create({
+            'order_id': cls.order.id,
+            'product_id': cls.product.id,
+            'qty': 1,
+        })
+        cls.printers = cls.env['pos.printer'].create([
+            {'name': 'Kitchen A'},
+            {'name': 'Kitchen B'},
+        ])
+        cls.pos_order = cls.env['pos.order']
+        cls.QrOrder = type(cls.env['qr.order'])
+
+    def _enqueue(self, printer, is_batch=False):
+        return self.order._enqueue_kitchen_print(printer, self.pos_order, is_batch=is_batch)
+
+    def test_01_enqueue_does_not_render(self):
+        """下单事务内只登记任务"""
+        with patch.object(self.QrOrder, '_dispatch_kitchen_print') as dispatch:
+            task = self._enqueue(self.printers[0])
+        dispatch.assert_not_called()
+        self.assertEqual(task.state, 'queued')
+        self.assertEqual(task.queue_key, f'pos.printer,{self.printers[0].id}')
+        self.assertEqual(task.line_ids, self.order.line_ids)
+
+    def test_02_dispatch_in_order(self):
+        """同一打印机按登记顺序派发，并记录延迟"""
+        tasks = self._enqueue(self.printers[0]) | self._enqueue(self.printers[1]) \
+            | self._enqueue(self.printers[0], is_batch=True)
+        calls = []
+
+        def fake_dispatch(order, printer, pos_order, is_batch=False, qr_lines=None):
+            calls.append((printer.id, is_batch))
+            return True
+
+        with patch.object(self.QrOrder, '_dispatch_kitchen_print', autospec=True, side_effect=fake_dispatch):
+            self.env['qr.print.task']._cron_dispatch()
+
+        self.assertEqual(set(tasks.mapped('state')), {'done'})
+        printer_a_calls = [c for c in calls if c[0] == self.printers[0].id]
+        self.assertEqual(printer_a_calls, [(self.printers[0].id, False), (self.printers[0].id, True)])
+        self.assertTrue(all(latency >= 0 for latency in tasks.mapped('latency_ms')))
+        self.assertEqual(self.env['qr.print.task'].get_latency_stats()['count'], 3)
+
+    def test_03_retry_with_backoff(self):
+        """派发失败时退避重试，且阻塞同一打印机的后续任务"""
+        first = self._enqueue(self.printers[0])
+        second = self._enqueue(self.printers[0])
+
+        with patch.object(self.QrOrder, '_dispatch_kitchen_print', return_value=None):
+            self.env['qr.print.task']._cron_dispatch()
+
+        self.assertEqual(first.state, 'queued')
+        self.assertEqual(first.attempts, 1)
+        self.assertGreater(first.next_attempt_at, fields.Datetime.now())
+        self.assertEqual(second.attempts, 0)
+
+        # 超过最大次数后标记失败，队列继续
+        first.attempts = 4
+        first.next_attempt_at = fields.Datetime.now()
+        with patch.object(self.QrOrder, '_dispatch_kitchen_print', side_effect=[None, True]):
+            self.env['qr.print.task']._cron_dispatch()
+        self.assertEqual(first.state, 'failed')
+        self.assertEqual(second.state, 'done')
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+批量价格计算测试
+================
+
+测试范围：
+- get_qr_prices 与逐个 compute_all 结果一致
+- 相同 (税组合, 单价) 只调用一次税引擎
+- 订单行批量税额
+"""
+
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install', 'qr_ordering', 'pricing')
+class TestQrPricing(TransactionCase):
+    """测试批量价格 / 税额计算"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tax = cls.env['account.tax'].create({
+            'name': 'Test QR 10%',
+            'amount': 10.0,
+            'amount_type': 'percent',
+            'type_tax_use': 'sale',
+        })
+        cls.pos_config = cls.env['pos.config'].create({
+            'name': 'Test Pricing POS',
+        })
+        cls.products = cls.env['product.product'].create([{
+            'name': f'Test Drink {i}',
+            'type': 'consu',
+            'list_price': 500.0 if i % 2 else 700.0,
+            'available_in_pos': True,
+            'taxes_id': [(6, 0, cls.tax.ids)],
+        } for i in range(6)])
+
+    def test_01_prices_match_compute_all(self):
+        """批量结果与逐个 compute_all 一致"""
+        prices = self.products.get_qr_prices(self.pos_config)
+        for product in self.products:
+            expected = self.tax.compute_all(product.lst_price, product=product)['total_included']
+            self.assertAlmostEqual(prices[product.id]['price_with_tax'], expected)
+            self.assertAlmostEqual(prices[product.id]['tax_rate'], 10.0)
+
+    def test_02_identical_pairs_computed_once(self):
+        """6 个产品只有 2 种 (税, 单价) 组合"""
+        AccountTax = type(self.env['account.tax'])
+        with patch.object(AccountTax, 'compute_all', autospec=True,
+                          side_effect=AccountTax.compute_all) as mocked:
+            self.products.get_qr_prices(self.pos_config)
+        self.assertEqual(mocked.call_count, 2)
+
+    def test_03_line_tax_amounts(self):
+        """订单行批量税额"""
+        table = self.env['qr.table'].create({
+            'name': 'Pricing Table',
+            'pos_config_id': self.pos_config.id,
+        })
+        session = self.env['qr.session'].create({'table_id': table.id})
+        order = self.env['qr.order'].create({'session_id': session.id})
+        lines = self.env['qr.order.line'].create([{
+            'order_id': order.id,
+            'product_id': product.id,
+            'qty': 2,
+        } for product in self.products[:2]])
+
+        amounts = lines._get_tax_amounts(self.pos_config)
+        for line in lines:
+            taxes, total_excluded, total_included = amounts[line.id]
+            self.assertEqual(taxes, self.tax)
+            self.assertAlmostEqual(total_excluded, line.price_unit * 2)
+            self.assertAlmostEqual(total_included, line.price_unit * 2 * 1.1)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+会话 token 缓存测试
+===================
+
+测试范围：
+- 活跃会话走快速路径，不产生写入
+- 会话关闭 / token 重新生成后缓存失效
+"""
+
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install', 'qr_ordering', 'session_cache')
+class TestSessionTokenCache(TransactionCase):
+    """测试 validate_access 快速路径与缓存失效"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.pos_config = cls.env['pos.config'].create({
+            'name': 'Test Token Cache POS',
+        })
+        cls.table = cls.env['qr.table'].create({
+            'name': 'Cache Table 01',
+            'pos_config_id': cls.pos_config.id,
+        })
+        cls.QrSession = cls.env['qr.session']
+
+    def test_01_fast_path_no_writes(self):
+        """第二次访问命中缓存，且不写入会话"""
+        session, error_code, _msg = self.QrSession.validate_access(self.table.qr_token, None)
+        self.assertFalse(error_code)
+        # 首次访问创建会话，第二次访问加载缓存
+        self.QrSession.validate_access(self.table.qr_token, None)
+        write_date = session.write_date
+
+        with self.assertQueryCount(0):
+            again, error_code, _msg = self.QrSession.validate_access(self.table.qr_token, 'other-client')
+        self.assertFalse(error_code)
+        self.assertEqual(again, session)
+        self.assertEqual(session.write_date, write_date)
+
+    def test_02_closed_session_invalidates(self):
+        """关闭会话后重新创建新会话"""
+        session, _code, _msg = self.QrSession.validate_access(self.table.qr_token, None)
+        session.action_close()
+        new_session, error_code, _msg = self.QrSession.validate_access(self.table.qr_token, None)
+        self.assertFalse(error_code)
+        self.assertNotEqual(new_session, session)
+
+    def test_03_expired_session_uses_slow_path(self):
+        """过期会话由慢路径关闭"""
+        session, _code, _msg = self.QrSession.validate_access(self.table.qr_token, None)
+        session.expire_time = fields.Datetime.now() - timedelta(minutes=1)
+        new_session, _code, _msg = self.QrSession.validate_access(self.table.qr_token, None)
+        self.assertEqual(session.state, 'closed')
+        self.assertNotEqual(new_session, session)
+
+    def test_04_regenerated_token_rejected(self):
+        """重新生成 token 后旧 token 失效"""
+        old_token = self.table.qr_token
+        self.QrSession.validate_access(old_token, None)
+        self.table.action_regenerate_token()
+        session, error_code, _msg = self.QrSession.validate_access(old_token, None)
+        self.assertFalse(session)
+        self.assertEqual(error_code, 'TABLE_NOT_FOUND')
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+from . import raster
+from . import ticket_render
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+光栅引擎微基准 / Raster engine microbenchmark
+
+对比旧版逐像素 Python 实现与 raster.py 各抖动模式的耗时。
+无需 Odoo 环境：
+
+    python bench_raster.py                 # 默认 576x2000（80mm 长小票）
+    python bench_raster.py 576 800 5       # 宽 高 重复次数
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+import raster  # noqa: E402
+
+
+def make_ticket(width, height):
+    """生成接近真实小票的测试图像：文字块 + 灰度块 + 噪点"""
+    rnd = random.Random(42)
+    img = Image.new('RGB', (width, height), color='white')
+    draw = ImageDraw.Draw(img)
+    y = 10
+    while y < height - 40:
+        line_w = rnd.randint(width // 4, width - 32)
+        draw.rectangle((16, y, 16 + line_w, y + rnd.choice((18, 30, 44))), fill='black')
+        y += 64
+    for _ in range(height // 100):
+        x0, y0 = rnd.randrange(width - 60), rnd.randrange(height - 60)
+        shade = rnd.randrange(40, 220)
+        draw.rectangle((x0, y0, x0 + 60, y0 + 60), fill=(shade, shade, shade))
+    return img
+
+
+def legacy_image_to_raster(img):
+    """旧版 qr.order._image_to_raster_escpos 的位图部分（逐像素 Python 循环）"""
+    img = img.convert('L')
+    width, height = img.size
+    pixels = list(img.tobytes())
+    errors = [[0.0] * height for _ in range(width)]
+    raster_data = []
+    for y in range(height):
+        for x in range(width):
+            old_color = max(0, min(255, pixels[y * width + x] + errors[x][y]))
+            if old_color < 128:
+                new_color = 0
+                raster_data.append(1)
+            else:
+                new_color = 255
+                raster_data.append(0)
+            error = old_color - new_color
+            if error:
+                if x < width - 1:
+                    errors[x + 1][y] += (7 / 16) * error
+                if x > 0 and y < height - 1:
+                    errors[x - 1][y + 1] += (3 / 16) * error
+                if y < height - 1:
+                    errors[x][y + 1] += (5 / 16) * error
+                if x < width - 1 and y < height - 1:
+                    errors[x + 1][y + 1] += (1 / 16) * error
+    bytes_per_line = (width + 7) // 8
+    raster_bytes = bytearray()
+    for y in range(height):
+        for byte_idx in range(bytes_per_line):
+            byte_val = 0
+            for bit in range(8):
+                pixel_x = byte_idx * 8 + bit
+                if pixel_x < width and raster_data[y * width + pixel_x]:
+                    byte_val |= (0x80 >> bit)
+            raster_bytes.append(byte_val)
+    return bytes(raster_bytes)
+
+
+def timeit(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 576
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    img = make_ticket(width, height)
+    print(f"Image {width}x{height}, best of {repeat}, numpy={'yes' if raster.HAS_NUMPY else 'no'}")
+    print("-" * 56)
+
+    legacy_time, legacy_bytes = timeit(lambda: legacy_image_to_raster(img), 1)
+    print(f"{'legacy (python loops)':<28}{legacy_time * 1000:>10.1f} ms")
+
+    compat_time, compat_result = timeit(lambda: raster.rasterize(img, compat=True), repeat)
+    identical = 'identical' if compat_result[2] == legacy_bytes else 'MISMATCH'
+    print(f"{'compat':<28}{compat_time * 1000:>10.1f} ms   {identical}")
+
+    for mode in raster.DITHER_MODES:
+        elapsed, _result = timeit(lambda: raster.rasterize(img, dither=mode), repeat)
+        print(f"{mode:<28}{elapsed * 1000:>10.1f} ms   x{legacy_time / elapsed:.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+小票渲染基准 / Ticket rendering benchmark
+
+对比 wkhtmltoimage（HTML -> PNG 子进程 + Floyd-Steinberg 抖动）与进程内
+ticket_render（1-bit 直出）生成 ESC/POS 光栅命令的耗时。无需 Odoo 环境：
+
+    python bench_ticket.py            # 默认 12 道菜，重复 10 次
+    python bench_ticket.py 30 20      # 菜品数 重复次数
+
+未安装 wkhtmltoimage 时只测进程内渲染。
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image  # noqa: E402
+
+import raster  # noqa: E402
+import ticket_render  # noqa: E402
+
+WIDTH = 384
+DISHES = ('唐揚げ定食', '味噌ラーメン', '餃子', '生ビール', '枝豆', '炒饭', 'Edamame')
+
+
+def make_items(count):
+    return [(i % 3 + 1, DISHES[i % len(DISHES)], 'no onion' if i % 5 == 0 else '') for i in range(count)]
+
+
+def make_lines(items):
+    lines = [
+        ('box', 24, 'QR 点餐', 48),
+        ('center', 28, '堂食', 40),
+        ('center', 16, 'Main POS : 12:30', 22),
+        ('center', 16, '来源: QR点餐', 22),
+        ('center', 22, '桌号 A12 # 105', 36),
+        ('rule', None, None, 16),
+        ('banner', 20, 'New', 38),
+    ]
+    for qty, name, note in items:
+        lines.append(('left', 20, f'{qty}   {name}', 32))
+        if note:
+            lines.append(('left', 14, f'      {note}', 22))
+    return lines
+
+
+def make_html(items):
+    rows = ''.join(
+        f'<div class="orderline"><div class="line-content"><span class="qty">{qty}</span>'
+        f'<span class="product-name">{name}</span></div>'
+        + (f'<div class="note">{note}</div>' if note else '') + '</div>'
+        for qty, name, note in items
+    )
+    return f"""<!DOCTYPE html><html><head><meta charset="UTF-8"><style>
+        * {{ margin: 0; padding: 0; }}
+        body {{ font-family: "Noto Sans CJK SC", sans-serif; width: {WIDTH}px; padding: 10px; }}
+        .qr-marker {{ text-align: center; font-size: 24px; font-weight: bold; border: 3px solid black; }}
+        .header {{ text-align: center; }}
+        .line-content {{ font-size: 20px; font-weight: bold; }}
+        .note {{ font-size: 14px; margin-left: 30px; }}
+    </style></head><body>
+        <div class="qr-marker">QR 点餐</div>
+        <div class="header"><div>堂食</div><div>Main POS : 12:30</div><div>桌号 A12 # 105</div></div>
+        <div>{rows}</div>
+    </body></html>"""
+
+
+def render_in_process(items):
+    img = ticket_render.render_ticket(make_lines(items), width=WIDTH)
+    return raster.image_to_gs_v0(img, feed_lines=3, cut=raster.CUT_PARTIAL)
+
+
+def render_wkhtml(items):
+    with tempfile.TemporaryDirectory() as tmp:
+        html_path = os.path.join(tmp, 'ticket.html')
+        img_path = os.path.join(tmp, 'ticket.png')
+        with open(html_path, 'w', encoding='utf-8') as f:
+            f.write(make_html(items))
+        subprocess.run([
+            'wkhtmltoimage', '--width', str(WIDTH), '--quality', '100',
+            '--disable-smart-width', html_path, img_path,
+        ], capture_output=True, timeout=30, check=True)
+        with Image.open(img_path) as img:
+            return raster.image_to_gs_v0(img, feed_lines=3, cut=raster.CUT_PARTIAL)
+
+
+def timeit(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2], samples[-1]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    items = make_items(count)
+
+    print(f"{count} dishes, width {WIDTH}px, {repeat} runs (median / max)")
+    print("-" * 56)
+
+    ticket_render.clear_glyph_cache()
+    start = time.perf_counter()
+    render_in_process(items)
+    cold = time.perf_counter() - start
+    print(f"{'in-process (cold cache)':<28}{cold * 1000:>10.1f} ms")
+
+    median, worst = timeit(lambda: render_in_process(items), repeat)
+    print(f"{'in-process (warm cache)':<28}{median * 1000:>10.1f} ms {worst * 1000:>8.1f} ms")
+
+    if shutil.which('wkhtmltoimage'):
+        wk_median, wk_worst = timeit(lambda: render_wkhtml(items), repeat)
+        print(f"{'wkhtmltoimage':<28}{wk_median * 1000:>10.1f} ms {wk_worst * 1000:>8.1f} ms"
+              f"   x{wk_median / median:.0f}")
+    else:
+        print(f"{'wkhtmltoimage':<28}{'not installed':>10}")
+
+
+if __name__ == '__main__':
+    main()
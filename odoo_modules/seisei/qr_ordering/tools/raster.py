@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+ESC/POS 光栅引擎 / ESC/POS raster engine
+
+将 PIL 图像转换为 GS v 0 光栅位图命令，供 QR 厨房单与 Seisei Print Manager 共用。
+抖动与位打包均在原生代码中完成（PIL / NumPy），不再逐像素 Python 循环。
+
+Dither modes:
+    threshold        固定阈值二值化
+    bayer            4x4 有序抖动 (Bayer)
+    floyd_steinberg  PIL 原生 Floyd-Steinberg 误差扩散
+
+compat=True 时使用旧版 qr.order._image_to_raster_escpos 的浮点误差扩散，
+输出与旧实现逐字节一致（较慢，仅用于兼容与校验）。
+
+本模块不依赖 Odoo，可独立运行基准测试（见 bench_raster.py）。
+"""
+
+from PIL import Image, ImageChops
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+DITHER_THRESHOLD = 'threshold'
+DITHER_BAYER = 'bayer'
+DITHER_FLOYD_STEINBERG = 'floyd_steinberg'
+DITHER_MODES = (DITHER_THRESHOLD, DITHER_BAYER, DITHER_FLOYD_STEINBERG)
+
+ESC = b'\x1b'
+GS = b'\x1d'
+
+# 切纸命令
+CUT_HALF_DIRECT = GS + b'VA\x00'   # GS V A 0 - 直接半切（不额外走纸）
+CUT_PARTIAL = GS + b'V\x01'        # GS V 1 - 半切
+
+# 4x4 Bayer 矩阵，已缩放到 0-255 阈值
+_BAYER_4X4 = (
+    (0, 8, 2, 10),
+    (12, 4, 14, 6),
+    (3, 11, 1, 9),
+    (15, 7, 13, 5),
+)
+_BAYER_THRESHOLDS = tuple(
+    tuple(int((v + 0.5) * 256 / 16) for v in row) for row in _BAYER_4X4
+)
+
+try:
+    _FLOYDSTEINBERG = Image.Dither.FLOYDSTEINBERG
+except AttributeError:  # Pillow < 9.1
+    _FLOYDSTEINBERG = Image.FLOYDSTEINBERG
+
+
+def _dither_threshold(gray, threshold):
+    """返回 '1' 模式图像（0=黑）"""
+    return gray.point(lambda v: 255 if v >= threshold else 0, '1')
+
+
+def _dither_bayer(gray):
+    width, height = gray.size
+    if HAS_NUMPY:
+        arr = np.asarray(gray, dtype=np.uint8)
+        matrix = np.array(_BAYER_THRESHOLDS, dtype=np.uint8)
+        tiled = np.tile(matrix, ((height + 3) // 4, (width + 3) // 4))[:height, :width]
+        return arr < tiled  # True = 黑
+    # 无 NumPy：用平铺阈值图 + ImageChops 在 C 层比较
+    tile = Image.new('L', (4, 4))
+    tile.putdata([v for row in _BAYER_THRESHOLDS for v in row])
+    pattern = Image.new('L', (width, height))
+    for ty in range(0, height, 4):
+        for tx in range(0, width, 4):
+            pattern.paste(tile, (tx, ty))
+    # (v - t) + 128 >= 128  <=>  v >= t
+    diff = ImageChops.subtract(gray, pattern, 1.0, 128)
+    return _dither_threshold(diff, 128)
+
+
+def _dither_floyd_steinberg_compat(gray):
+    """
+    旧版浮点 Floyd-Steinberg 算法（阈值 128，误差先截断再扩散）
+
+    与旧实现的累加顺序完全一致，仅将按列的二维误差表换成两行缓冲区。
+
+    Returns:
+        bytearray: 每像素一字节，1=黑
+    """
+    width, height = gray.size
+    pixels = gray.tobytes()
+    out = bytearray(width * height)
+    w7, w3, w5, w1 = 7 / 16, 3 / 16, 5 / 16, 1 / 16
+    last_x = width - 1
+    cur = [0.0] * width
+    for y in range(height):
+        has_next = y < height - 1
+        nxt = [0.0] * width
+        base = y * width
+        for x in range(width):
+            old_color = pixels[base + x] + cur[x]
+            if old_color < 0:
+                old_color = 0
+            elif old_color > 255:
+                old_color = 255
+
+            if old_color < 128:
+                out[base + x] = 1
+                error = old_color
+            else:
+                error = old_color - 255
+
+            if error:
+                if x < last_x:
+                    cur[x + 1] += w7 * error
+                if has_next:
+                    if x > 0:
+                        nxt[x - 1] += w3 * error
+                    nxt[x] += w5 * error
+                    if x < last_x:
+                        nxt[x + 1] += w1 * error
+        cur = nxt
+    return out
+
+
+def _pack_bits(bits, width, height):
+    """
+    打包为 GS v 0 位图数据（每行补齐到字节，MSB 在左，1=黑）
+
+    Args:
+        bits: '1' 模式 PIL 图像（0=黑）、NumPy 布尔数组（True=黑）
+              或每像素一字节的 bytearray（1=黑）
+    """
+    if isinstance(bits, Image.Image):
+        # PIL 原生打包（1=白），反相后补齐位保持为 0
+        return ImageChops.invert(bits).tobytes()
+    if HAS_NUMPY:
+        if not isinstance(bits, np.ndarray):
+            bits = np.frombuffer(bytes(bits), dtype=np.uint8).reshape(height, width)
+        return np.packbits(bits.astype(bool), axis=1).tobytes()
+    # 无 NumPy：借助 PIL 的 '1' 模式打包（255 -> 位 1）
+    img = Image.frombytes('L', (width, height), bytes(bits)).point(lambda v: 255 if v else 0, '1')
+    return img.tobytes()
+
+
+def rasterize(img, dither=DITHER_FLOYD_STEINBERG, threshold=128, compat=False):
+    """
+    将图像转换为单色光栅数据
+
+    Args:
+        img: PIL.Image 对象（任意模式；'1' 模式直接打包，不做抖动）
+        dither: 抖动方式，见 DITHER_MODES（compat=True 时忽略）
+        threshold: threshold 模式的阈值
+        compat: True 时使用旧版浮点 Floyd-Steinberg（逐字节兼容）
+
+    Returns:
+        tuple: (bytes_per_line, height, raster_bytes)
+    """
+    if not compat and dither not in DITHER_MODES:
+        raise ValueError("Unknown dither mode: %s" % dither)
+
+    if img.mode == '1' and not compat:
+        # 已是单色图像（如 ticket_render 输出），直接打包
+        width, height = img.size
+        return (width + 7) // 8, height, _pack_bits(img, width, height)
+
+    gray = img if img.mode == 'L' else img.convert('L')
+    width, height = gray.size
+
+    if compat:
+        bits = _dither_floyd_steinberg_compat(gray)
+    elif dither == DITHER_THRESHOLD:
+        bits = _dither_threshold(gray, threshold)
+    elif dither == DITHER_BAYER:
+        bits = _dither_bayer(gray)
+    else:
+        bits = gray.convert('1', dither=_FLOYDSTEINBERG)
+
+    return (width + 7) // 8, height, _pack_bits(bits, width, height)
+
+
+def image_to_gs_v0(img, dither=DITHER_FLOYD_STEINBERG, threshold=128, compat=False,
+                   feed_lines=0, cut=CUT_HALF_DIRECT):
+    """
+    将图像转换为完整的 ESC/POS 打印命令
+
+    命令结构: ESC @, ESC a 1, GS v 0 m xL xH yL yH d1...dk, [ESC d n], [cut]
+
+    Args:
+        img: PIL.Image 对象
+        dither / threshold / compat: 见 rasterize()
+        feed_lines: 切纸前走纸行数（0 表示不走纸）
+        cut: 切纸命令字节，None 表示不切纸
+
+    Returns:
+        bytes: ESC/POS 命令
+    """
+    bytes_per_line, height, data = rasterize(img, dither=dither, threshold=threshold, compat=compat)
+
+    commands = bytearray()
+    commands.extend(ESC + b'@')         # 初始化
+    commands.extend(ESC + b'a\x01')     # 居中对齐
+    commands.extend(GS + b'v0\x00')     # GS v 0 mode=0
+    commands.extend(bytes([
+        bytes_per_line & 0xff,
+        (bytes_per_line >> 8) & 0xff,
+        height & 0xff,
+        (height >> 8) & 0xff,
+    ]))
+    commands.extend(data)
+    if feed_lines:
+        commands.extend(ESC + b'd' + bytes([feed_lines]))
+    if cut:
+        commands.extend(cut)
+    return bytes(commands)
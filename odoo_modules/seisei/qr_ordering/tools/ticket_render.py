@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+小票布局渲染器 / In-process ticket layout renderer
+
+将小票的行布局直接渲染为 1-bit ('1' 模式) PIL 图像，供 raster.image_to_gs_v0
+直接打包，无需 HTML -> wkhtmltoimage 子进程，也无需抖动。
+
+布局为 content_lines 列表，每项 (kind, size, text, line_height)：
+    center      居中文本
+    left        左对齐文本
+    right       右对齐文本
+    two_column  text 为 (left_text, right_text)
+    banner      反白居中文本（黑底白字整行）
+    box         带边框的居中文本
+    rule        虚线分隔线（size / text 忽略）
+    spacer      空白（size / text 忽略）
+
+- 字体注册表：按字号缓存 FreeTypeFont，字体文件只探测一次
+- 字形缓存：(文本, 字号) -> 1-bit 位图，重复的菜品名 / 标题直接复用
+
+本模块不依赖 Odoo，可独立运行基准测试（见 bench_ticket.py）。
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+TICKET_WIDTH = 576      # 80mm 热敏纸 (7.2 px/mm)
+PADDING_TOP = 5
+PADDING_BOTTOM = 5
+PADDING_SIDE = 16
+
+# 优先使用 CJK 字体
+FONT_PATHS = (
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',  # Debian/Ubuntu
+    '/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+)
+
+_GLYPH_CACHE_MAX_ENTRIES = 4096
+_glyph_cache = OrderedDict()
+_glyph_cache_lock = threading.Lock()
+
+# '1' 模式中 0=黑, 255=白
+_BLACK = 0
+_WHITE = 255
+
+
+@lru_cache(maxsize=1)
+def _font_path():
+    for path in FONT_PATHS:
+        if os.path.exists(path):
+            try:
+                ImageFont.truetype(path, 12)
+                return path
+            except Exception:
+                continue
+    return None
+
+
+@lru_cache(maxsize=64)
+def get_font(size):
+    """按字号获取字体（进程内缓存）"""
+    path = _font_path()
+    if path:
+        return ImageFont.truetype(path, size)
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:  # Pillow < 10.1
+        return ImageFont.load_default()
+
+
+def render_text(text, size):
+    """
+    渲染一段文本为 1-bit 遮罩（带缓存）
+
+    Returns:
+        tuple: (mask, ink_width) mask 为 '1' 模式图像（255=墨迹），原点与
+               ImageDraw.text((0, 0)) 一致；ink_width 为 textbbox 宽度
+    """
+    key = (text, size)
+    with _glyph_cache_lock:
+        entry = _glyph_cache.get(key)
+        if entry is not None:
+            _glyph_cache.move_to_end(key)
+            return entry
+
+    font = get_font(size)
+    left, _top, right, bottom = font.getbbox(text) if text else (0, 0, 0, 0)
+    mask = Image.new('1', (max(1, right), max(1, bottom)), 0)
+    if text:
+        # '1' 模式下 ImageDraw 不做抗锯齿，直接得到二值字形
+        ImageDraw.Draw(mask).text((0, 0), text, font=font, fill=255)
+    entry = (mask, right - left)
+
+    with _glyph_cache_lock:
+        _glyph_cache[key] = entry
+        if len(_glyph_cache) > _GLYPH_CACHE_MAX_ENTRIES:
+            _glyph_cache.popitem(last=False)
+    return entry
+
+
+def clear_glyph_cache():
+    with _glyph_cache_lock:
+        _glyph_cache.clear()
+
+
+def _paste(canvas, mask, x, y, color=_BLACK):
+    """将遮罩以指定颜色贴到画布上（超出部分裁掉）"""
+    width, height = canvas.size
+    mw, mh = mask.size
+    if x >= width or y >= height or x + mw <= 0 or y + mh <= 0:
+        return
+    if x < 0 or y < 0 or x + mw > width or y + mh > height:
+        crop = (max(0, -x), max(0, -y), min(mw, width - x), min(mh, height - y))
+        mask = mask.crop(crop)
+        x, y = x + crop[0], y + crop[1]
+        mw, mh = mask.size
+    canvas.paste(color, (x, y, x + mw, y + mh), mask)
+
+
+def _draw_rule(canvas, y, line_height, padding_side, dash=8, gap=6, thickness=2):
+    width = canvas.size[0]
+    top = y + (line_height - thickness) // 2
+    x = padding_side
+    while x < width - padding_side:
+        x1 = min(x + dash, width - padding_side)
+        canvas.paste(_BLACK, (x, top, x1, top + thickness))
+        x += dash + gap
+
+
+def render_ticket(content_lines, width=TICKET_WIDTH, padding_top=PADDING_TOP,
+                  padding_bottom=PADDING_BOTTOM, padding_side=PADDING_SIDE):
+    """
+    渲染小票布局
+
+    Args:
+        content_lines: [(kind, size, text, line_height), ...]，见模块说明
+        width: 图像宽度（像素）
+
+    Returns:
+        PIL.Image: '1' 模式图像（白底黑字）
+    """
+    height = padding_top + sum(line[3] for line in content_lines) + padding_bottom
+    canvas = Image.new('1', (width, max(1, height)), _WHITE)
+
+    y = padding_top
+    for kind, size, text, line_height in content_lines:
+        if kind == 'center':
+            mask, ink_width = render_text(text, size)
+            _paste(canvas, mask, (width - ink_width) // 2, y)
+        elif kind == 'left':
+            mask, _ink_width = render_text(text, size)
+            _paste(canvas, mask, padding_side, y)
+        elif kind == 'right':
+            mask, ink_width = render_text(text, size)
+            _paste(canvas, mask, width - padding_side - ink_width, y)
+        elif kind == 'two_column':
+            left_text, right_text = text
+            mask, _ink_width = render_text(left_text, size)
+            _paste(canvas, mask, padding_side, y)
+            mask, ink_width = render_text(right_text, size)
+            _paste(canvas, mask, width - padding_side - ink_width, y)
+        elif kind == 'banner':
+            canvas.paste(_BLACK, (padding_side, y, width - padding_side, y + line_height - 4))
+            mask, ink_width = render_text(text, size)
+            _paste(canvas, mask, (width - ink_width) // 2, y + max(0, (line_height - 4 - mask.size[1]) // 2),
+                   color=_WHITE)
+        elif kind == 'box':
+            draw = ImageDraw.Draw(canvas)
+            draw.rectangle((padding_side, y, width - padding_side - 1, y + line_height - 5),
+                           outline=_BLACK, width=3)
+            mask, ink_width = render_text(text, size)
+            _paste(canvas, mask, (width - ink_width) // 2, y + max(0, (line_height - 4 - mask.size[1]) // 2))
+        elif kind == 'rule':
+            _draw_rule(canvas, y, line_height, padding_side)
+        elif kind != 'spacer':
+            raise ValueError("Unknown ticket line kind: %s" % kind)
+        y += line_height
+
+    return canvas
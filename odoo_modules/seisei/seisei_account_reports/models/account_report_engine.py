@@ -2,6 +2,7 @@ import ast
 import copy
 import datetime
 import json
+import logging
 import re
 from collections import defaultdict, OrderedDict
 from itertools import groupby
@@ -11,10 +12,15 @@ from odoo.exceptions import UserError
 from odoo.tools import date_utils, float_is_zero, SQL
 from odoo.tools.misc import format_date, formatLang
 
+_logger = logging.getLogger(__name__)
 
 LINE_ID_HIERARCHY_DELIMITER = '|'
 NUMBER_FIGURE_TYPES = ('float', 'integer', 'monetary', 'percentage')
 
+# Maximum number of aggregate columns per batched domain query
+# (PostgreSQL allows at most 1664 target list entries).
+DOMAIN_BATCH_MAX_COLUMNS = 500
+
 
 class AccountReportEngine(models.Model):
     _inherit = 'account.report'
@@ -680,16 +686,30 @@ class AccountReportEngine(models.Model):
     def _compute_expression_totals_for_all_groups(self, options):
         """Compute expression totals for each column group.
 
+        Domain expressions of all column groups are computed together in a
+        single batch, so comparison columns do not multiply the queries.
+
         Returns {group_key: {expression_id: value}}
         """
         column_groups = options.get('column_groups', {'default': {'date': options['date']}})
-        result = {}
 
+        options_by_group = {}
         for group_key, group_data in column_groups.items():
             # Build a copy of options with this group's date
             group_options = copy.deepcopy(options)
             group_options['date'] = group_data['date']
-            result[group_key] = self._compute_expression_totals(group_options)
+            options_by_group[group_key] = group_options
+
+        domain_expressions = self.line_ids.expression_ids.filtered(lambda e: e.engine == 'domain')
+        domain_totals = self._compute_formula_batch_domain_grouped(
+            domain_expressions, options_by_group
+        ) if domain_expressions else {}
+
+        result = {}
+        for group_key, group_options in options_by_group.items():
+            result[group_key] = self._compute_expression_totals(
+                group_options, domain_totals=domain_totals.get(group_key, {})
+            )
 
         return result
 
@@ -910,9 +930,12 @@ class AccountReportEngine(models.Model):
     # EXPRESSION COMPUTATION
     # ==========================================================================
 
-    def _compute_expression_totals(self, options):
+    def _compute_expression_totals(self, options, domain_totals=None):
         """Compute all expression totals for the report.
 
+        :param domain_totals: precomputed {expression_id: value} for the
+            domain expressions (see _compute_expression_totals_for_all_groups)
+
         Returns {expression_id: value}
         """
         self.ensure_one()
@@ -928,7 +951,9 @@ class AccountReportEngine(models.Model):
         totals = {}
 
         # 1. Compute domain expressions first (direct SQL)
-        if domain_expressions:
+        if domain_totals is not None:
+            totals.update(domain_totals)
+        elif domain_expressions:
             domain_totals = self._compute_formula_batch_domain(
                 domain_expressions, options
             )
@@ -957,34 +982,208 @@ class AccountReportEngine(models.Model):
         - formula: a domain string like "[('account_id.account_type', 'in', [...])]"
         - subformula: 'sum' or 'count' or '-sum' etc.
         - date_scope: determines date filtering
+
+        All expressions are computed in a single pass, see
+        _compute_formula_batch_domain_grouped.
+        """
+        return self._compute_formula_batch_domain_grouped(
+            expressions, {'default': options}
+        )['default']
+
+    def _parse_domain_expression(self, expression):
+        """Parse a domain expression.
+
+        Returns (domain, field_name, sign), field_name being None for a count,
+        or None if the formula is not a valid domain.
+        """
+        try:
+            expr_domain = ast.literal_eval(expression.formula)
+        except (ValueError, SyntaxError):
+            return None
+
+        subformula = (expression.subformula or 'sum').strip()
+
+        # Determine what to sum
+        if subformula in ('sum', '-sum'):
+            field_name = 'balance'
+        elif subformula in ('sum_debit', '-sum_debit'):
+            field_name = 'debit'
+        elif subformula in ('sum_credit', '-sum_credit'):
+            field_name = 'credit'
+        elif subformula == 'count':
+            field_name = None  # count
+        else:
+            field_name = 'balance'
+
+        sign = -1 if subformula.startswith('-') else 1
+        return expr_domain, field_name, sign
+
+    def _compute_formula_batch_domain_grouped(self, expressions, options_by_group):
+        """Compute domain-engine expressions for several column groups at once.
+
+        The domain of every (column group, expression) pair is compiled to a
+        WHERE clause. Pairs sharing the same FROM clause (same joins) are
+        answered by one query with an aggregate column per distinct clause:
+
+            SELECT COALESCE(SUM(balance) FILTER (WHERE <domain 1>), 0),
+                   COUNT(*) FILTER (WHERE <domain 2>), ...
+              FROM account_move_line ...
+             WHERE (<domain 1>) OR (<domain 2>) ...
+
+        so a report costs a handful of queries instead of one per expression
+        and per column group. Results are identical to
+        _compute_formula_domain_per_expression, which is used as a fallback
+        if a batched query fails.
+
+        When the monthly balance table of account_financial_report is
+        installed and enabled, the full months of a period are summed from it
+        and only the partial months from the journal items.
+
+        :param options_by_group: {group_key: options}
+        Returns {group_key: {expression_id: value}}
+        """
+        AccountMoveLine = self.env['account.move.line']
+        monthly_balance = self._get_monthly_balance_model()
+        result = {group_key: {} for group_key in options_by_group}
+
+        # (from clause key) -> {(aggregate, where code, params): (where, [(group_key, expression_id, sign)])}
+        buckets = defaultdict(OrderedDict)
+        from_clauses = {}
+
+        def get_parts(domain, field_name):
+            """[(from clause, table, aggregated field, where clause)] for a domain."""
+            parts = []
+            split = None
+            # Counts stay on journal items: the table has no notes or sections
+            if monthly_balance and field_name:
+                split = monthly_balance._split_move_line_domain(domain)
+            if split is None:
+                raw_domains = [domain]
+            else:
+                where, raw_domains = split
+                if where is not None:
+                    table = monthly_balance._table
+                    parts.append((SQL.identifier(table), table, field_name, where))
+            for raw_domain in raw_domains:
+                query = AccountMoveLine._search(raw_domain)
+                if not query.is_empty():
+                    parts.append((query.from_clause, query.table, field_name, query.where_clause))
+            return parts
+
+        for group_key, options in options_by_group.items():
+            base_domains = {}
+            for expression in expressions:
+                result[group_key][expression.id] = 0.0
+                parsed = self._parse_domain_expression(expression)
+                if parsed is None:
+                    continue
+                expr_domain, field_name, sign = parsed
+                target = (group_key, expression.id, sign)
+
+                date_scope = expression.date_scope or 'strict_range'
+                if date_scope not in base_domains:
+                    base_domains[date_scope] = self._get_options_domain(options, date_scope=date_scope)
+                full_domain = base_domains[date_scope] + expr_domain
+
+                try:
+                    parts = get_parts(full_domain, field_name)
+                except Exception:
+                    continue
+                for from_clause, table, aggregate, where_clause in parts:
+                    from_key = (from_clause.code, repr(from_clause.params))
+                    from_clauses[from_key] = (from_clause, table)
+                    aggregate_key = (aggregate, where_clause.code, repr(where_clause.params))
+                    buckets[from_key].setdefault(aggregate_key, (where_clause, []))[1].append(target)
+
+        if not buckets:
+            return result
+
+        self.env.flush_all()
+        failed = set()
+        for from_key, aggregates in buckets.items():
+            from_clause, table = from_clauses[from_key]
+            items = list(aggregates.items())
+            for index in range(0, len(items), DOMAIN_BATCH_MAX_COLUMNS):
+                chunk = items[index:index + DOMAIN_BATCH_MAX_COLUMNS]
+                try:
+                    values = self._execute_domain_batch(from_clause, table, chunk)
+                except Exception:
+                    _logger.warning(
+                        "Batched domain query failed for report %s, computing expressions one by one",
+                        self.id, exc_info=True,
+                    )
+                    failed.update(
+                        (group_key, expression_id)
+                        for _key, (_where, targets) in chunk
+                        for group_key, expression_id, _sign in targets
+                    )
+                    continue
+                for (_key, (_where, targets)), value in zip(chunk, values):
+                    value = float(value or 0.0)
+                    for group_key, expression_id, sign in targets:
+                        result[group_key][expression_id] += -value if sign < 0 else value
+
+        if failed:
+            expression_by_id = {expression.id: expression for expression in expressions}
+            for group_key, expression_id in failed:
+                result[group_key].update(self._compute_formula_domain_per_expression(
+                    expression_by_id[expression_id], options_by_group[group_key]
+                ))
+
+        return result
+
+    def _get_monthly_balance_model(self):
+        """account.monthly.balance if installed and enabled, else None."""
+        if 'account.monthly.balance' not in self.env:
+            return None
+        monthly_balance = self.env['account.monthly.balance']
+        return monthly_balance if monthly_balance._is_enabled() else None
+
+    def _execute_domain_batch(self, from_clause, table, aggregates):
+        """Run one query returning an aggregate per (field, WHERE clause).
+
+        A None field counts the matching rows, any other field is summed.
+        """
+        columns = []
+        wheres = []
+        for (field_name, _code, _params), (where_clause, _targets) in aggregates:
+            if field_name is None:
+                columns.append(SQL("COUNT(*) FILTER (WHERE %s)", where_clause))
+            else:
+                columns.append(SQL(
+                    "COALESCE(SUM(%s) FILTER (WHERE %s), 0)",
+                    SQL.identifier(table, field_name), where_clause,
+                ))
+            wheres.append(SQL("(%s)", where_clause))
+
+        query = SQL(
+            "SELECT %s FROM %s WHERE %s",
+            SQL(", ").join(columns),
+            from_clause,
+            SQL(" OR ").join(wheres),
+        )
+        with self.env.cr.savepoint(flush=False):
+            self.env.cr.execute(query)
+            return self.env.cr.fetchone()
+
+    def _compute_formula_domain_per_expression(self, expressions, options):
+        """Compute domain-engine expressions with one query per expression.
+
+        Reference implementation of _compute_formula_batch_domain_grouped.
         """
         totals = {}
 
         for expression in expressions:
-            try:
-                expr_domain = ast.literal_eval(expression.formula)
-            except (ValueError, SyntaxError):
+            parsed = self._parse_domain_expression(expression)
+            if parsed is None:
                 totals[expression.id] = 0.0
                 continue
+            expr_domain, field_name, sign = parsed
 
             date_scope = expression.date_scope or 'strict_range'
             base_domain = self._get_options_domain(options, date_scope=date_scope)
             full_domain = base_domain + expr_domain
 
-            subformula = (expression.subformula or 'sum').strip()
-
-            # Determine what to sum
-            if subformula in ('sum', '-sum'):
-                field_name = 'balance'
-            elif subformula in ('sum_debit', '-sum_debit'):
-                field_name = 'debit'
-            elif subformula in ('sum_credit', '-sum_credit'):
-                field_name = 'credit'
-            elif subformula == 'count':
-                field_name = None  # count
-            else:
-                field_name = 'balance'
-
             try:
                 if field_name is None:
                     # Count
@@ -997,10 +1196,10 @@ class AccountReportEngine(models.Model):
                         [field_name],
                         [],
                     )
-                    value = result[0][field_name] if result else 0.0
+                    value = (result[0][field_name] if result else 0.0) or 0.0
 
                 # Handle negative subformula
-                if subformula.startswith('-'):
+                if sign < 0:
                     value = -value
 
                 totals[expression.id] = value
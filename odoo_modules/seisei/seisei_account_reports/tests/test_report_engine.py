@@ -324,3 +324,57 @@ class TestReportEngine(TransactionCase):
         self.assertIn('report', info)
         self.assertIn('buttons', info)
         self.assertIn('filters', info)
+
+    # ---- Batched Domain Computation Tests ----
+
+    def _assert_batch_matches_per_expression(self, report, options):
+        expressions = report.line_ids.expression_ids.filtered(lambda e: e.engine == 'domain')
+        self.assertTrue(expressions)
+        options_by_group = {}
+        for group_key, group_data in options['column_groups'].items():
+            group_options = dict(options, date=group_data['date'])
+            options_by_group[group_key] = group_options
+
+        batch = report._compute_formula_batch_domain_grouped(expressions, options_by_group)
+        for group_key, group_options in options_by_group.items():
+            expected = report._compute_formula_domain_per_expression(expressions, group_options)
+            self.assertEqual(set(batch[group_key]), set(expected))
+            for expression_id, value in expected.items():
+                self.assertAlmostEqual(batch[group_key][expression_id], value, places=2,
+                                       msg=f"Expression {expression_id} differs in {group_key}")
+        return batch
+
+    def test_batch_domain_matches_per_expression(self):
+        """The single-pass domain query should return per-expression results."""
+        for report in (self.pl_report, self.bs_report):
+            for all_entries in (False, True):
+                options = self._get_options(report)
+                options['all_entries'] = all_entries
+                self._assert_batch_matches_per_expression(report, options)
+
+    def test_batch_domain_matches_per_expression_comparison(self):
+        """Comparison column groups are batched together with the same results."""
+        for report in (self.pl_report, self.bs_report):
+            options = report.get_options(previous_options={
+                'date': {'date_from': '2025-01-01', 'date_to': '2025-12-31'},
+                'comparison': {'filter': 'monthly'},
+            })
+            self.assertEqual(len(options['column_groups']), 12)
+            batch = self._assert_batch_matches_per_expression(report, options)
+            self.assertTrue(any(any(values.values()) for values in batch.values()))
+
+    def test_batch_domain_query_count(self):
+        """Domain expressions of all column groups take a handful of queries."""
+        options = self.pl_report.get_options(previous_options={
+            'date': {'date_from': '2025-01-01', 'date_to': '2025-12-31'},
+            'comparison': {'filter': 'monthly'},
+        })
+        expressions = self.pl_report.line_ids.expression_ids.filtered(lambda e: e.engine == 'domain')
+        options_by_group = {
+            group_key: dict(options, date=group_data['date'])
+            for group_key, group_data in options['column_groups'].items()
+        }
+        self.env.flush_all()
+        # 5 expressions x 12 months used to take 60 queries
+        with self.assertQueryCount(8):
+            self.pl_report._compute_formula_batch_domain_grouped(expressions, options_by_group)
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+{
+    'name': 'Seisei OCR Job Queue',
+    'version': '18.0.1.1.0',
+    'category': 'Technical',
+    'summary': 'Background queue for OCR work, shared by all OCR modules',
+    'description': """
+Seisei OCR Job Queue
+====================
+
+Runs OCR documents in the background instead of inside the user's request.
+
+- One job per document: pending -> running -> done / failed
+- Cron dispatcher runs jobs on a small thread pool, one cursor per job
+- Running jobs hold a lease renewed by heartbeats; expired leases are retried
+- Concurrency is bounded across all OCR modules and servers
+- tools.pdf_raster: lazy, page-selective PDF rendering with a render cache
+  keyed by (checksum, page, dpi); size via SEISEI_PDF_RENDER_CACHE_MB (64)
+
+Configuration (System Parameters):
+- seisei_ocr_queue.max_running: concurrent jobs (default 4)
+- seisei_ocr_queue.lease_seconds: lease length (default 300)
+- seisei_ocr_queue.time_budget: seconds per dispatcher run (default 240)
+    """,
+    'author': 'Seisei',
+    'website': 'https://seisei.co.jp',
+    'depends': ['base'],
+    'data': [
+        'security/ir.model.access.csv',
+        'data/ir_cron.xml',
+        'views/ocr_job_views.xml',
+    ],
+    'installable': True,
+    'application': False,
+    'auto_install': False,
+    'license': 'LGPL-3',
+}
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+OCR Job Queue
+
+OCR documents are queued as ocr.job records instead of being processed in
+the user's HTTP request (time.sleep + cr.commit per record pinned a worker
+for minutes). The dispatcher cron claims pending jobs, runs them on a
+thread pool with one cursor per job, and renews their leases while they
+run. A running job whose lease expires (worker killed, server restarted)
+goes back to pending until max_attempts, so execution is at-least-once.
+
+Targets implement, on any model:
+
+    record.<method>()               the work; raising fails the job
+    record._ocr_job_failed(error)   optional, called after a failure
+    batch._ocr_job_progress(jobs)   optional, called on the batch record with
+                                    the jobs that just finished
+
+Job rows are only written by the dispatcher thread, so heartbeats and
+progress updates never race the workers.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from odoo import SUPERUSER_ID, api, fields, models
+from odoo.service.model import retrying
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_RUNNING = 4
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_TIME_BUDGET = 240  # stay under limit_time_real_cron
+HEARTBEAT_INTERVAL = 30
+KEEP_FINISHED_DAYS = 30
+
+
+class OcrJob(models.Model):
+    _name = 'ocr.job'
+    _description = 'OCR Job'
+    _order = 'priority, id'
+
+    name = fields.Char(string='Description', required=True)
+    res_model = fields.Char(string='Model', required=True, index=True)
+    res_id = fields.Many2oneReference(string='Record ID', model_field='res_model', required=True)
+    method = fields.Char(string='Method', required=True)
+    batch_model = fields.Char(string='Batch Model')
+    batch_id = fields.Many2oneReference(string='Batch ID', model_field='batch_model', index=True)
+    user_id = fields.Many2one('res.users', string='Requested By', default=lambda self: self.env.user,
+                              required=True)
+
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ], string='State', default='pending', required=True, index=True)
+    priority = fields.Integer(string='Priority', default=10)
+    attempts = fields.Integer(string='Attempts', default=0)
+    max_attempts = fields.Integer(string='Max Attempts', default=3)
+
+    lease_until = fields.Datetime(string='Lease Until')
+    heartbeat_at = fields.Datetime(string='Last Heartbeat')
+    started_at = fields.Datetime(string='Started At')
+    finished_at = fields.Datetime(string='Finished At')
+    error = fields.Text(string='Error')
+
+    def init(self):
+        # Claim query: pending jobs in priority order
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS ocr_job_pending_idx
+            ON ocr_job (priority, id) WHERE state = 'pending'
+        """)
+
+    # ==================== Queueing ====================
+
+    @api.model
+    def enqueue(self, records, method, batch=None, priority=10):
+        """Queue one job per record and wake the dispatcher.
+
+        Args:
+            records: recordset to process, one job each
+            method: name of the method called on each record
+            batch: optional record notified through _ocr_job_progress
+        """
+        jobs = self.sudo().create([{
+            'name': f'{record.display_name} ({method})',
+            'res_model': record._name,
+            'res_id': record.id,
+            'method': method,
+            'batch_model': batch._name if batch else False,
+            'batch_id': batch.id if batch else False,
+            'priority': priority,
+            'user_id': self.env.uid,
+        } for record in records])
+        if jobs:
+            self.env.ref('seisei_ocr_queue.ir_cron_ocr_job_dispatcher').sudo()._trigger()
+        return jobs
+
+    @api.model
+    def cancel_batch(self, batch):
+        """Cancel the jobs of a batch that have not started yet"""
+        jobs = self.sudo().search([
+            ('batch_model', '=', batch._name),
+            ('batch_id', 'in', batch.ids),
+            ('state', '=', 'pending'),
+        ])
+        jobs.write({'state': 'cancelled', 'finished_at': fields.Datetime.now()})
+        return jobs
+
+    @api.model
+    def active_job_res_ids(self, res_model, res_ids):
+        """IDs among res_ids that already have a pending or running job"""
+        return set(self.sudo().search([
+            ('res_model', '=', res_model),
+            ('res_id', 'in', list(res_ids)),
+            ('state', 'in', ('pending', 'running')),
+        ]).mapped('res_id'))
+
+    # ==================== Dispatcher ====================
+
+    def _get_settings(self):
+        params = self.env['ir.config_parameter'].sudo()
+        return (
+            max(1, int(params.get_param('seisei_ocr_queue.max_running', DEFAULT_MAX_RUNNING))),
+            int(params.get_param('seisei_ocr_queue.lease_seconds', DEFAULT_LEASE_SECONDS)),
+            int(params.get_param('seisei_ocr_queue.time_budget', DEFAULT_TIME_BUDGET)),
+        )
+
+    @api.model
+    def _cron_dispatch(self):
+        """Run pending jobs until the queue is empty or the time budget is spent"""
+        max_running, lease, budget = self._get_settings()
+        deadline = time.monotonic() + budget
+        self._requeue_expired()
+
+        running = {}  # future -> job id
+        with ThreadPoolExecutor(max_workers=max_running, thread_name_prefix='ocr_job') as executor:
+            next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+            while True:
+                if time.monotonic() < deadline and len(running) < max_running:
+                    for job_id in self._claim(max_running, lease):
+                        running[executor.submit(self._execute, job_id)] = job_id
+                if not running:
+                    break
+
+                done, _pending = wait(running, timeout=max(0, next_heartbeat - time.monotonic()),
+                                      return_when=FIRST_COMPLETED)
+                if done:
+                    self._finish({running.pop(future): future.result() for future in done})
+                if running and time.monotonic() >= next_heartbeat:
+                    self._heartbeat(list(running.values()), lease)
+                    next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+
+        if self.search_count([('state', '=', 'pending')], limit=1):
+            self.env.ref('seisei_ocr_queue.ir_cron_ocr_job_dispatcher')._trigger()
+
+    def _claim(self, max_running, lease):
+        """Lease as many pending jobs as the global limit allows; returns their IDs"""
+        cr = self.env.cr
+        # Serialize claims so two dispatchers cannot both fill the last slot
+        cr.execute("SELECT pg_advisory_xact_lock(hashtext('ocr_job_claim'))")
+        cr.execute("""
+            SELECT count(*) FROM ocr_job
+            WHERE state = 'running' AND lease_until > (now() AT TIME ZONE 'UTC')
+        """)
+        slots = max_running - cr.fetchone()[0]
+        job_ids = []
+        if slots > 0:
+            cr.execute("""
+                UPDATE ocr_job
+                   SET state = 'running',
+                       attempts = attempts + 1,
+                       started_at = now() AT TIME ZONE 'UTC',
+                       heartbeat_at = now() AT TIME ZONE 'UTC',
+                       lease_until = (now() AT TIME ZONE 'UTC') + make_interval(secs => %s),
+                       error = NULL
+                 WHERE id IN (
+                       SELECT id FROM ocr_job
+                        WHERE state = 'pending'
+                        ORDER BY priority, id
+                        LIMIT %s
+                          FOR UPDATE SKIP LOCKED)
+             RETURNING id
+            """, (lease, slots))
+            job_ids = [row[0] for row in cr.fetchall()]
+        cr.commit()
+        if job_ids:
+            self.invalidate_model()
+        return job_ids
+
+    def _heartbeat(self, job_ids, lease):
+        """Extend the leases of the jobs this dispatcher is running"""
+        self.env.cr.execute("""
+            UPDATE ocr_job
+               SET heartbeat_at = now() AT TIME ZONE 'UTC',
+                   lease_until = (now() AT TIME ZONE 'UTC') + make_interval(secs => %s)
+             WHERE id IN %s AND state = 'running'
+        """, (lease, tuple(job_ids)))
+        self.env.cr.commit()
+        self.invalidate_model(['heartbeat_at', 'lease_until'])
+
+    def _requeue_expired(self):
+        """Put jobs with an expired lease back in the queue, or fail them"""
+        self.env.cr.execute("""
+            UPDATE ocr_job
+               SET state = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END,
+                   error = CASE WHEN attempts >= max_attempts
+                                THEN 'Lease expired after ' || attempts || ' attempt(s)' END,
+                   finished_at = CASE WHEN attempts >= max_attempts THEN now() AT TIME ZONE 'UTC' END,
+                   lease_until = NULL
+             WHERE state = 'running' AND lease_until < (now() AT TIME ZONE 'UTC')
+         RETURNING id, state
+        """)
+        rows = self.env.cr.fetchall()
+        if not rows:
+            return
+        self.invalidate_model()
+        _logger.warning(f'[OCR Queue] {len(rows)} job(s) lost their lease, requeued or failed')
+        failed = self.browse([job_id for job_id, state in rows if state == 'failed'])
+        for job in failed:
+            self._execute_hook(job.id, '_ocr_job_failed', job.error)
+        failed._notify_batches()
+        self.env.cr.commit()
+
+    def _finish(self, results):
+        """Record the outcome of finished jobs (dispatcher thread).
+
+        Args:
+            results: {job_id: error message, or None on success}
+        """
+        now = fields.Datetime.now()
+        jobs = self.browse(list(results))
+        for job in jobs:
+            error = results[job.id]
+            job.write({
+                'state': 'failed' if error else 'done',
+                'error': error or False,
+                'finished_at': now,
+                'lease_until': False,
+            })
+        jobs._notify_batches()
+        self.env.cr.commit()
+
+    def _notify_batches(self):
+        batches = {}
+        for job in self.filtered('batch_model'):
+            batches.setdefault((job.batch_model, job.batch_id), self.browse())
+            batches[(job.batch_model, job.batch_id)] |= job
+        for (batch_model, batch_id), jobs in batches.items():
+            if batch_model not in self.env:
+                continue
+            batch = self.env[batch_model].browse(batch_id).exists()
+            if not batch or not hasattr(batch, '_ocr_job_progress'):
+                continue
+            try:
+                with self.env.cr.savepoint():
+                    batch._ocr_job_progress(jobs)
+            except Exception as e:
+                _logger.exception(f'[OCR Queue] Progress update failed for {batch_model}({batch_id}): {e}')
+
+    # ==================== Worker ====================
+
+    def _job_env(self, cr, job_id):
+        """Environment of the user who queued the job, and the target record"""
+        job = api.Environment(cr, SUPERUSER_ID, {})['ocr.job'].browse(job_id)
+        env = api.Environment(cr, job.user_id.id, {})
+        env = env(context=env['res.users'].context_get())
+        record = env[job.res_model].browse(job.res_id).exists() if job.res_model in env else None
+        if record and 'company_id' in record._fields and record.company_id:
+            record = record.with_company(record.company_id)
+        return job, env, record
+
+    def _execute(self, job_id):
+        """Run one job on its own cursor (worker thread); returns an error or None"""
+        thread = threading.current_thread()
+        thread.dbname = self.env.cr.dbname
+        try:
+            with self.pool.cursor() as cr:
+                job, env, record = self._job_env(cr, job_id)
+                thread.uid = env.uid
+                if not record:
+                    return 'Record no longer exists'
+                method = job.method
+                started = time.monotonic()
+                try:
+                    retrying(getattr(record, method), env)
+                except Exception as e:
+                    _logger.exception(f'[OCR Queue] Job {job_id} {record} {method} failed: {e}')
+                    error = str(e) or e.__class__.__name__
+                    self._execute_hook(job_id, '_ocr_job_failed', error, cr=cr)
+                    return error
+                _logger.info(f'[OCR Queue] Job {job_id} {record} {method} done in {time.monotonic() - started:.1f}s')
+        except Exception as e:
+            _logger.exception(f'[OCR Queue] Job {job_id} could not run: {e}')
+            return str(e) or e.__class__.__name__
+        return None
+
+    def _execute_hook(self, job_id, hook, error, cr=None):
+        """Call an optional failure hook on the job's record in its own transaction"""
+        cursor = cr or self.pool.cursor()
+        try:
+            cursor.rollback()
+            job, env, record = self._job_env(cursor, job_id)
+            if record and hasattr(record, hook):
+                retrying(lambda: getattr(record, hook)(error), env)
+        except Exception as e:
+            _logger.exception(f'[OCR Queue] {hook} failed for job {job_id}: {e}')
+        finally:
+            if cr is None:
+                cursor.close()
+
+    # ==================== Maintenance ====================
+
+    def action_retry(self):
+        self.filtered(lambda j: j.state in ('failed', 'cancelled')).write({
+            'state': 'pending',
+            'attempts': 0,
+            'error': False,
+            'finished_at': False,
+        })
+        self.env.ref('seisei_ocr_queue.ir_cron_ocr_job_dispatcher')._trigger()
+
+    def action_cancel(self):
+        self.filtered(lambda j: j.state == 'pending').write({
+            'state': 'cancelled',
+            'finished_at': fields.Datetime.now(),
+        })
+
+    @api.model
+    def _cron_cleanup(self):
+        cutoff = fields.Datetime.now() - timedelta(days=KEEP_FINISHED_DAYS)
+        old = self.search([('state', 'in', ('done', 'failed', 'cancelled')), ('finished_at', '<', cutoff)])
+        count = len(old)
+        old.unlink()
+        _logger.info(f'[OCR Queue] Removed {count} finished jobs')
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Lazy PDF rasterization for OCR
+
+iter_pdf_pages() opens the PDF once and renders only the selected pages,
+one at a time, so a 200-page scan never holds more than one page in
+memory. Rendered pages are kept in a process-wide LRU cache keyed by
+(checksum, page, dpi): retries and re-OCR of the same attachment reuse
+them instead of rendering again.
+
+No Odoo dependency, so llm_ocr.py and standalone tests can import it.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_DPI = 150
+RENDER_CACHE_BYTES = int(os.getenv('SEISEI_PDF_RENDER_CACHE_MB', '64')) * 1024 * 1024
+
+_cache = OrderedDict()  # (checksum, page, dpi) -> jpeg bytes
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+def _cache_get(key):
+    with _cache_lock:
+        data = _cache.get(key)
+        if data is not None:
+            _cache.move_to_end(key)
+        return data
+
+
+def _cache_put(key, data):
+    global _cache_bytes
+    if len(data) > RENDER_CACHE_BYTES:
+        return
+    with _cache_lock:
+        old = _cache.pop(key, None)
+        if old is not None:
+            _cache_bytes -= len(old)
+        _cache[key] = data
+        _cache_bytes += len(data)
+        while _cache_bytes > RENDER_CACHE_BYTES:
+            _key, evicted = _cache.popitem(last=False)
+            _cache_bytes -= len(evicted)
+
+
+def clear_render_cache():
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
+
+
+def pdf_checksum(pdf_data):
+    """Same digest as ir.attachment.checksum, so either can be used as key"""
+    return hashlib.sha1(pdf_data).hexdigest()
+
+
+def _open(pdf_data):
+    try:
+        import fitz  # PyMuPDF
+    except ImportError:
+        _logger.error('[OCR] PyMuPDF not installed')
+        raise ImportError('PyMuPDF required. Install: pip install PyMuPDF')
+    return fitz, fitz.open(stream=pdf_data, filetype='pdf')
+
+
+def pdf_page_count(pdf_data):
+    _fitz, doc = _open(pdf_data)
+    with doc:
+        return len(doc)
+
+
+def _select(pages, page_count):
+    """0-based page indexes: None = all, an int, or any iterable (range, list)"""
+    if pages is None:
+        return range(page_count)
+    if isinstance(pages, int):
+        pages = [pages]
+    return [p for p in pages if -page_count <= p < page_count]
+
+
+def iter_pdf_pages(pdf_data, pages=None, dpi=DEFAULT_DPI, checksum=None):
+    """Yield (page_index, jpeg_bytes) for the selected pages, rendering lazily.
+
+    Args:
+        pdf_data: PDF file content
+        pages: None for all pages, a page index, or an iterable of indexes
+               (0-based; negative counts from the end)
+        dpi: render resolution
+        checksum: attachment checksum, if known (saves hashing pdf_data)
+    """
+    checksum = checksum or pdf_checksum(pdf_data)
+    doc = None
+    try:
+        # Answer from the cache without opening the PDF when possible
+        if pages is not None:
+            pages = [pages] if isinstance(pages, int) else list(pages)
+            if all(p >= 0 for p in pages):
+                cached = [_cache_get((checksum, p, dpi)) for p in pages]
+                if all(data is not None for data in cached):
+                    yield from zip(pages, cached)
+                    return
+
+        fitz, doc = _open(pdf_data)
+        page_count = len(doc)
+        matrix = fitz.Matrix(dpi / 72, dpi / 72)
+        for index in _select(pages, page_count):
+            index = index % page_count
+            key = (checksum, index, dpi)
+            data = _cache_get(key)
+            if data is None:
+                pix = doc[index].get_pixmap(matrix=matrix)
+                data = pix.tobytes('jpeg')
+                pix = None
+                _cache_put(key, data)
+                _logger.info(f'[OCR] PDF page {index + 1}/{page_count} rendered at {dpi} dpi')
+            yield index, data
+    except Exception as e:
+        _logger.exception(f'[OCR] PDF conversion error: {e}')
+        raise
+    finally:
+        if doc is not None:
+            doc.close()
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'Seisei Print Manager',
-    'version': '1.0.0',
+    'version': '1.3.2',
     'category': 'Tools',
     'summary': 'Printer management and report mapping module for service communication',
     'description': """
@@ -55,6 +55,7 @@
         'data/printer_data.xml',
         'data/mapping_group_data.xml',
         'data/ticket_template_data.xml',
+        'data/ir_cron.xml',
 
         'views/station_views.xml',
         'views/printer_views.xml',
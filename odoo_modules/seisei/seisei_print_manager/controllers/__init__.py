@@ -1,3 +1,4 @@
 # -*- coding: utf-8 -*-
 
 from . import ticket_editor
+from . import print_payload
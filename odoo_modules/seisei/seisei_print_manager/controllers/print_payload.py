@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Seisei Print Manager - Print Payload Controller
+Serves print job documents to print stations
+
+Bus messages carry a signed, short-lived URL instead of the document itself.
+Responses support ETag / If-None-Match and Range requests, so a station can
+resume an interrupted download. An expired URL of a job that is still to be
+printed can be exchanged for a fresh one.
+"""
+
+import logging
+
+from odoo import http
+from odoo.http import request
+
+_logger = logging.getLogger(__name__)
+
+
+class PrintPayloadController(http.Controller):
+    """Controller for print job payload downloads"""
+
+    @http.route('/seisei/print/payload/<string:job_uuid>', type='http', auth='public',
+                methods=['GET', 'HEAD'], csrf=False, save_session=False)
+    def print_payload(self, job_uuid, expires=None, signature=None, **kwargs):
+        """
+        Download the stored document of a print job
+
+        Args:
+            job_uuid: Print job job_id
+            expires: Unix time the URL expires at
+            signature: HMAC of job_id and expires
+
+        Returns:
+            The stored payload (gzip when the job's payload encoding says so)
+        """
+        job = request.env['seisei.print.job'].sudo()._get_payload_job(job_uuid, expires, signature)
+        if not job:
+            _logger.warning('Rejected print payload request for job %s', job_uuid)
+            raise request.not_found()
+
+        attachment = job.payload_attachment_id
+        stream = request.env['ir.binary']._get_stream_from(attachment)
+        stream.download_name = attachment.name
+        return stream.get_response(as_attachment=True)
+
+    @http.route('/seisei/print/payload/<string:job_uuid>/renew', type='http', auth='public',
+                methods=['POST'], csrf=False, save_session=False)
+    def renew_print_payload(self, job_uuid, expires=None, signature=None, **kwargs):
+        """
+        Re-sign the payload URL of a print job
+
+        Args:
+            job_uuid: Print job job_id
+            expires: Unix time the previous URL expired at
+            signature: HMAC of job_id and expires from the previous URL
+
+        Returns:
+            JSON payload reference with a new signed URL
+        """
+        reference = request.env['seisei.print.job'].sudo()._renew_payload_reference(
+            job_uuid, expires, signature)
+        if not reference:
+            _logger.warning('Rejected print payload renewal for job %s', job_uuid)
+            raise request.not_found()
+        return request.make_json_response(reference)
@@ -13,6 +13,9 @@ from datetime import datetime
 
 _logger = logging.getLogger(__name__)
 
+# Kitchen ticket width in pixels (same as the former wkhtmltoimage --width)
+KITCHEN_TICKET_WIDTH = 384
+
 # Global flag to track if QR order patch has been applied
 _qr_order_patched = False
 
@@ -59,8 +62,8 @@ def _patch_qr_order_print(env):
 
             # Check if Seisei kitchen printer is configured (single printer mode)
             if hasattr(pos_config, 'seisei_kitchen_printer_id') and pos_config.seisei_kitchen_printer_id:
-                _create_seisei_kitchen_job(self, pos_config.seisei_kitchen_printer_id, pos_order, is_batch=False)
-                _logger.info(f"Created Seisei kitchen print job for QR order {self.name}")
+                self._enqueue_kitchen_print(pos_config.seisei_kitchen_printer_id, pos_order, is_batch=False)
+                _logger.info(f"Queued Seisei kitchen print job for QR order {self.name}")
                 return
 
             # Route to different printers based on product categories
@@ -86,12 +89,12 @@ def _patch_qr_order_print(env):
                             any(cat.id in printer_category_ids for cat in l.product_id.pos_categ_ids)
                         )
                         if filtered_lines:
-                            _create_seisei_kitchen_job(self, seisei_printer, pos_order, is_batch=False, qr_lines=filtered_lines)
+                            self._enqueue_kitchen_print(seisei_printer, pos_order, is_batch=False, qr_lines=filtered_lines)
                             printers_sent += 1
                             _logger.info(f"Routed {len(filtered_lines)} items to {seisei_printer.name} for QR order {self.name}")
                     else:
                         # No category filter, send all lines
-                        _create_seisei_kitchen_job(self, seisei_printer, pos_order, is_batch=False)
+                        self._enqueue_kitchen_print(seisei_printer, pos_order, is_batch=False)
                         printers_sent += 1
 
             if printers_sent == 0:
@@ -121,8 +124,8 @@ def _patch_qr_order_print(env):
 
             # Check if Seisei kitchen printer is configured (single printer mode)
             if hasattr(pos_config, 'seisei_kitchen_printer_id') and pos_config.seisei_kitchen_printer_id:
-                _create_seisei_kitchen_job(self, pos_config.seisei_kitchen_printer_id, pos_order, is_batch=True, qr_lines=qr_lines)
-                _logger.info(f"Created Seisei batch kitchen print job for QR order {self.name}")
+                self._enqueue_kitchen_print(pos_config.seisei_kitchen_printer_id, pos_order, is_batch=True, qr_lines=qr_lines)
+                _logger.info(f"Queued Seisei batch kitchen print job for QR order {self.name}")
                 return
 
             # Route to different printers based on product categories
@@ -148,12 +151,12 @@ def _patch_qr_order_print(env):
                             any(cat.id in printer_category_ids for cat in l.product_id.pos_categ_ids)
                         )
                         if filtered_lines:
-                            _create_seisei_kitchen_job(self, seisei_printer, pos_order, is_batch=True, qr_lines=filtered_lines)
+                            self._enqueue_kitchen_print(seisei_printer, pos_order, is_batch=True, qr_lines=filtered_lines)
                             printers_sent += 1
                             _logger.info(f"Routed {len(filtered_lines)} batch items to {seisei_printer.name} for QR order {self.name}")
                     else:
                         # No category filter, send all lines
-                        _create_seisei_kitchen_job(self, seisei_printer, pos_order, is_batch=True, qr_lines=qr_lines)
+                        self._enqueue_kitchen_print(seisei_printer, pos_order, is_batch=True, qr_lines=qr_lines)
                         printers_sent += 1
 
             if printers_sent == 0:
@@ -183,6 +186,10 @@ def _create_seisei_kitchen_job(qr_order, seisei_printer, pos_order, is_batch=Fal
     """
     Create kitchen print job using image rendering (same as POS)
     Adds QR order marker to distinguish from regular orders
+
+    Runs in the QR Ordering print queue worker (see
+    seisei.printer._dispatch_qr_kitchen_ticket), not in the order-submit
+    transaction; returns None on failure so the task is retried.
     """
     try:
         import subprocess
@@ -237,6 +244,26 @@ def _create_seisei_kitchen_job(qr_order, seisei_printer, pos_order, is_batch=Fal
 def _generate_image_escpos_commands(qr_order, pos_order, lines, is_batch=False):
     """
     Generate ESC/POS commands using image rendering (same as POS)
+    1. Lay out the ticket and render it in-process (QR Ordering ticket renderer)
+    2. Convert the 1-bit image to ESC/POS bitmap commands
+
+    wkhtmltoimage is only used as a fallback when the in-process renderer fails.
+    """
+    try:
+        from odoo.addons.qr_ordering.tools import ticket_render
+
+        content_lines = _build_kitchen_ticket_lines(qr_order, pos_order, lines, is_batch)
+        img = ticket_render.render_ticket(content_lines, width=KITCHEN_TICKET_WIDTH)
+        return _image_to_escpos(img)
+
+    except Exception as e:
+        _logger.error(f"In-process ticket rendering failed, falling back to wkhtmltoimage: {e}")
+        return _generate_wkhtml_escpos_commands(qr_order, pos_order, lines, is_batch)
+
+
+def _generate_wkhtml_escpos_commands(qr_order, pos_order, lines, is_batch=False):
+    """
+    Fallback: render the HTML ticket with wkhtmltoimage
     1. Render HTML template
     2. Convert to image using wkhtmltoimage
     3. Convert image to ESC/POS bitmap commands
@@ -260,7 +287,7 @@ def _generate_image_escpos_commands(qr_order, pos_order, lines, is_batch=False):
         # wkhtmltoimage: 384 pixels width for 80mm thermal printer
         result = subprocess.run([
             'wkhtmltoimage',
-            '--width', '384',
+            '--width', str(KITCHEN_TICKET_WIDTH),
             '--quality', '100',
             '--disable-smart-width',
             html_path,
@@ -288,19 +315,13 @@ def _generate_image_escpos_commands(qr_order, pos_order, lines, is_batch=False):
         return _generate_escpos_commands(qr_order, pos_order, lines, is_batch)
 
 
-def _render_kitchen_ticket_html(qr_order, pos_order, lines, is_batch=False):
+def _get_kitchen_ticket_header(qr_order, pos_order, is_batch=False):
     """
-    Render kitchen ticket HTML (same format as POS OrderChangeReceipt)
-    Adds QR order marker to distinguish from regular orders
+    Collect the header fields shared by the in-process and HTML ticket layouts
     """
-    from odoo import fields
-
-    # Get data
     config_name = pos_order.config_id.name if pos_order.config_id else ''
     order_time = datetime.now().strftime('%H:%M')
 
-    employee_name = 'QR点餐'  # Mark as QR order
-
     # Table number
     table_number = ''
     if qr_order.table_id and hasattr(qr_order.table_id, 'name'):
@@ -315,6 +336,70 @@ def _render_kitchen_ticket_html(qr_order, pos_order, lines, is_batch=False):
     if hasattr(pos_order, 'tracking_number') and pos_order.tracking_number:
         tracking_number = str(pos_order.tracking_number)
 
+    # Table display
+    table_display = ""
+    if table_number:
+        table_display = "桌号 " + table_number
+    if tracking_number:
+        if table_display:
+            table_display += " # " + tracking_number
+        else:
+            table_display = "# " + tracking_number
+
+    return {
+        'config_name': config_name,
+        'order_time': order_time,
+        'employee_name': 'QR点餐',  # Mark as QR order
+        'table_display': table_display,
+        # Operation title - with QR marker
+        'op_title': "QR 加菜" if is_batch else "QR 点餐",
+    }
+
+
+def _build_kitchen_ticket_lines(qr_order, pos_order, lines, is_batch=False):
+    """
+    Kitchen ticket layout for the in-process renderer
+    Mirrors _render_kitchen_ticket_html (QR marker, header, table, lines)
+    """
+    header = _get_kitchen_ticket_header(qr_order, pos_order, is_batch)
+
+    content_lines = [
+        ('box', 24, header['op_title'], 48),
+        ('center', 28, '堂食', 40),
+        ('center', 16, header['config_name'] + " : " + header['order_time'], 22),
+        ('center', 16, "来源: " + header['employee_name'], 22),
+    ]
+    if header['table_display']:
+        content_lines.append(('center', 22, header['table_display'], 36))
+    content_lines += [
+        ('rule', None, None, 16),
+        ('banner', 20, 'New', 38),
+    ]
+
+    for line in lines:
+        product = line.product_id
+        product_name = product.name if product else getattr(line, 'product_name', 'Unknown')
+        content_lines.append(('left', 20, str(int(line.qty)) + '   ' + str(product_name), 32))
+        # Note
+        if hasattr(line, 'note') and line.note:
+            note_text = str(line.note).replace('\n', ', ')
+            content_lines.append(('left', 14, '      ' + note_text, 22))
+
+    return content_lines
+
+
+def _render_kitchen_ticket_html(qr_order, pos_order, lines, is_batch=False):
+    """
+    Render kitchen ticket HTML (same format as POS OrderChangeReceipt)
+    Adds QR order marker to distinguish from regular orders
+    """
+    header = _get_kitchen_ticket_header(qr_order, pos_order, is_batch)
+    config_name = header['config_name']
+    order_time = header['order_time']
+    employee_name = header['employee_name']
+    table_display = header['table_display']
+    op_title = header['op_title']
+
     # Product lines HTML
     lines_html = ''
     for line in lines:
@@ -334,22 +419,6 @@ def _render_kitchen_ticket_html(qr_order, pos_order, lines, is_batch=False):
 
         lines_html += '</div>'
 
-    # Operation title - with QR marker
-    if is_batch:
-        op_title = "QR 加菜"
-    else:
-        op_title = "QR 点餐"
-
-    # Table display
-    table_display = ""
-    if table_number:
-        table_display = "桌号 " + table_number
-    if tracking_number:
-        if table_display:
-            table_display += " # " + tracking_number
-        else:
-            table_display = "# " + tracking_number
-
     # Complete HTML
     html = """<!DOCTYPE html>
 <html>
@@ -394,65 +463,19 @@ def _image_to_escpos(img):
     """
     Convert PIL Image to ESC/POS bitmap commands
     Uses GS v 0 command (same as POS frontend CloudPrinter)
-    """
-    # Convert to grayscale
-    img = img.convert('L')
-
-    # Floyd-Steinberg dithering to black and white
-    img = img.convert('1')
 
-    width, height = img.size
-    pixels = list(img.getdata())
-
-    # ESC/POS commands
-    ESC = b'\x1b'
-    GS = b'\x1d'
-
-    commands = bytearray()
-
-    # Initialize
-    commands.extend(ESC + b'@')
-
-    # Center alignment
-    commands.extend(ESC + b'a\x01')
-
-    # GS v 0 - Raster bit image
-    # Format: GS v 0 m xL xH yL yH [data]
-    # m = 0: normal mode
-    bytes_per_line = (width + 7) // 8
-
-    xL = bytes_per_line & 0xFF
-    xH = (bytes_per_line >> 8) & 0xFF
-    yL = height & 0xFF
-    yH = (height >> 8) & 0xFF
-
-    commands.extend(GS + b'v0\x00')
-    commands.append(xL)
-    commands.append(xH)
-    commands.append(yL)
-    commands.append(yH)
-
-    # Convert pixel data
-    for y in range(height):
-        for x_byte in range(bytes_per_line):
-            byte_val = 0
-            for bit in range(8):
-                x = x_byte * 8 + bit
-                if x < width:
-                    pixel_index = y * width + x
-                    # PIL '1' mode: 0=black, 255=white
-                    # ESC/POS: 1=print(black), 0=no print(white)
-                    if pixels[pixel_index] == 0:  # black
-                        byte_val |= (0x80 >> bit)
-            commands.append(byte_val)
-
-    # Feed 3 lines
-    commands.extend(ESC + b'd\x03')
-
-    # Partial cut
-    commands.extend(GS + b'V\x01')
-
-    return bytes(commands)
+    Dithering and bit packing are delegated to the shared QR Ordering raster
+    engine (PIL Floyd-Steinberg, native packing); this hook only runs when
+    qr_ordering is installed.
+    """
+    from odoo.addons.qr_ordering.tools import raster
+
+    return raster.image_to_gs_v0(
+        img,
+        dither=raster.DITHER_FLOYD_STEINBERG,
+        feed_lines=3,
+        cut=raster.CUT_PARTIAL,
+    )
 
 
 def _generate_escpos_commands(qr_order, pos_order, lines, is_batch=False):
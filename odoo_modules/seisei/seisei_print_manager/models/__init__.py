@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+from . import heartbeat
 from . import station
 from . import printer
 from . import report_mapping
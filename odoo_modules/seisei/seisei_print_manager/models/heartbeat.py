@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, _
+from odoo.exceptions import UserError
+from odoo.tools.sql import column_exists
+
+
+class HeartbeatMixin(models.AbstractModel):
+    """
+    Heartbeat Mixin
+    Keeps last_sync_time in an UNLOGGED side table (<table>_heartbeat) instead
+    of the record itself. Stations re-sync every few seconds; touching the
+    side table costs no WAL, no write_date/recompute and no tracking, and
+    losing it on a crash only loses "last seen" times.
+
+    Models using it declare last_sync_time with:
+        compute='_compute_last_sync_time', inverse='_inverse_last_sync_time',
+        search='_search_last_sync_time'
+    """
+    _name = 'seisei.heartbeat.mixin'
+    _description = 'Heartbeat Mixin'
+
+    _heartbeat_operators = ('=', '!=', '<', '<=', '>', '>=')
+
+    @property
+    def _heartbeat_table(self):
+        return f'{self._table}_heartbeat'
+
+    def init(self):
+        """Create the heartbeat table, seeded from the former stored column"""
+        super().init()
+        if self._abstract:
+            return
+        table = self._heartbeat_table
+        self.env.cr.execute(f"""
+            CREATE UNLOGGED TABLE IF NOT EXISTS {table} (
+                res_id integer PRIMARY KEY REFERENCES {self._table}(id) ON DELETE CASCADE,
+                last_seen timestamp without time zone NOT NULL
+            )
+        """)
+        if column_exists(self.env.cr, self._table, 'last_sync_time'):
+            self.env.cr.execute(f"""
+                INSERT INTO {table} (res_id, last_seen)
+                SELECT id, last_sync_time FROM {self._table} WHERE last_sync_time IS NOT NULL
+                ON CONFLICT (res_id) DO NOTHING
+            """)
+
+    def _compute_last_sync_time(self):
+        """Read heartbeats of all records in one query"""
+        seen = {}
+        ids = [record_id for record_id in self.ids if record_id]
+        if ids:
+            self.env.cr.execute(
+                f'SELECT res_id, last_seen FROM {self._heartbeat_table} WHERE res_id = ANY(%s)',
+                (ids,)
+            )
+            seen = dict(self.env.cr.fetchall())
+        for record in self:
+            record.last_sync_time = seen.get(record.id, False)
+
+    def _inverse_last_sync_time(self):
+        """Manual writes of last_sync_time go to the heartbeat table"""
+        cleared = self.filtered(lambda r: not r.last_sync_time)
+        if cleared:
+            self.env.cr.execute(
+                f'DELETE FROM {self._heartbeat_table} WHERE res_id = ANY(%s)', (cleared.ids,)
+            )
+        for record in self - cleared:
+            record._touch_heartbeat(record.last_sync_time)
+
+    def _search_last_sync_time(self, operator, value):
+        """Search records by heartbeat (records never seen have no value)"""
+        if operator not in self._heartbeat_operators:
+            raise UserError(_('Unsupported operator %s for last sync time') % operator)
+        if value is False or value is None:
+            self.env.cr.execute(f'SELECT res_id FROM {self._heartbeat_table}')
+            seen_ids = [row[0] for row in self.env.cr.fetchall()]
+            return [('id', 'not in' if operator == '=' else 'in', seen_ids)]
+        self.env.cr.execute(
+            f'SELECT res_id FROM {self._heartbeat_table} WHERE last_seen {operator} %s',
+            (fields.Datetime.to_datetime(value),)
+        )
+        return [('id', 'in', [row[0] for row in self.env.cr.fetchall()])]
+
+    def _touch_heartbeat(self, when=None):
+        """Record that these records were seen, in one statement"""
+        if not self.ids:
+            return
+        self.env.cr.execute(f"""
+            INSERT INTO {self._heartbeat_table} (res_id, last_seen)
+            SELECT unnest(%s::int[]), %s
+            ON CONFLICT (res_id) DO UPDATE SET last_seen = EXCLUDED.last_seen
+        """, (self.ids, when or fields.Datetime.now()))
+        self.invalidate_recordset(['last_sync_time'])
@@ -1,14 +1,30 @@
 # -*- coding: utf-8 -*-
 
+import gzip
+import hashlib
 import logging
 import json
+import time
 import uuid
 from datetime import datetime, timedelta
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError, ValidationError
+from odoo.tools import consteq
+from odoo.tools.sql import column_exists
+from odoo.tools.misc import hmac
 
 _logger = logging.getLogger(__name__)
 
+# Document payloads are stored as attachments and fetched by the station
+# over HTTP; only payloads up to INLINE_PAYLOAD_MAX bytes travel in the bus
+# message itself.
+INLINE_PAYLOAD_MAX = 2048
+PAYLOAD_URL_TTL = 600  # seconds a signed fetch URL stays valid
+PAYLOAD_PREFIX = 'print-payload-'
+
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+RETENTION_BATCH = 5000  # jobs deleted per statement (and per commit from the cron)
+
 
 class PrintJob(models.Model):
     """Print Job Model"""
@@ -169,9 +185,11 @@ class PrintJob(models.Model):
         help=_('Job execution duration')
     )
     
-    # Metadata
+    # Metadata (stored in seisei.print.job.content, see _compute_content)
     metadata = fields.Text(
         string=_('Metadata'),
+        compute='_compute_content',
+        inverse='_inverse_content',
         help=_('JSON format job metadata')
     )
     
@@ -190,9 +208,72 @@ class PrintJob(models.Model):
 
     job_data = fields.Text(
         string=_('Job Data'),
+        compute='_compute_content',
+        inverse='_inverse_content',
         help=_('JSON format job data')
     )
 
+    # Document payload (stored out of band, see _set_payload)
+    payload_attachment_id = fields.Many2one(
+        'ir.attachment',
+        string=_('Payload'),
+        ondelete='set null',
+        copy=False,
+        help=_('Attachment holding the document sent to the printer')
+    )
+
+    payload_sha256 = fields.Char(
+        string=_('Payload SHA-256'),
+        copy=False,
+        help=_('Hash of the uncompressed document')
+    )
+
+    payload_size = fields.Integer(
+        string=_('Payload Size'),
+        copy=False,
+        help=_('Size of the uncompressed document in bytes')
+    )
+
+    payload_encoding = fields.Selection([
+        ('identity', 'None'),
+        ('gzip', 'gzip'),
+    ], string=_('Payload Encoding'), copy=False, help=_('Compression of the stored payload'))
+
+    def init(self):
+        # Retention scans and dashboards filter on status and age; station
+        # status updates and printer statistics on printer and status
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS seisei_print_job_status_create_date_idx
+            ON seisei_print_job (status, create_date)
+        """)
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS seisei_print_job_printer_status_idx
+            ON seisei_print_job (printer_id, status)
+        """)
+
+    def _compute_content(self):
+        """Read metadata and job data from the content table in one query"""
+        contents = self.env['seisei.print.job.content'].sudo().search([('job_id', 'in', self.ids)])
+        by_job = {content.job_id.id: content for content in contents}
+        for job in self:
+            content = by_job.get(job.id)
+            job.metadata = content.metadata if content else False
+            job.job_data = content.job_data if content else False
+
+    def _inverse_content(self):
+        Content = self.env['seisei.print.job.content'].sudo()
+        contents = Content.search([('job_id', 'in', self.ids)])
+        by_job = {content.job_id.id: content for content in contents}
+        to_create = []
+        for job in self:
+            vals = {'metadata': job.metadata, 'job_data': job.job_data}
+            if job.id in by_job:
+                by_job[job.id].write(vals)
+            elif job.metadata or job.job_data:
+                to_create.append(dict(vals, job_id=job.id))
+        if to_create:
+            Content.create(to_create)
+
     @api.depends('name', 'station_code')
     def _compute_channel_name(self):
         """Compute channel name based on job data"""
@@ -295,6 +376,96 @@ class PrintJob(models.Model):
         
         return printer.status not in ['error', 'server-error', 'unavailable', 'unknown']
 
+    def _set_payload(self, data, content_type='application/octet-stream'):
+        """Store the document outside the job and the bus message.
+
+        Payloads are kept as attachments keyed by their SHA-256, so printing
+        the same document again reuses the stored blob (and the filestore
+        deduplicates it too). They are gzip-compressed when that saves space
+        (ESC/POS and text do; PDFs mostly do not).
+        """
+        self.ensure_one()
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        sha256 = hashlib.sha256(data).hexdigest()
+        Attachment = self.env['ir.attachment'].sudo()
+        attachment = Attachment.search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', 0),
+            ('name', 'in', [f'{PAYLOAD_PREFIX}{sha256}', f'{PAYLOAD_PREFIX}{sha256}.gz']),
+        ], limit=1)
+        if attachment:
+            # Hold the payload until this job refers to it, so a concurrent
+            # _cleanup_orphan_payloads() skips it; one it is deleting is not reused
+            self.env.cr.execute(
+                "SELECT id FROM ir_attachment WHERE id = %s FOR KEY SHARE SKIP LOCKED", [attachment.id])
+            if not self.env.cr.fetchone():
+                attachment = Attachment.browse()
+        if not attachment:
+            compressed = gzip.compress(data, compresslevel=6, mtime=0)
+            use_gzip = len(compressed) < len(data) * 0.9
+            attachment = Attachment.create({
+                'name': f'{PAYLOAD_PREFIX}{sha256}' + ('.gz' if use_gzip else ''),
+                'raw': compressed if use_gzip else data,
+                'mimetype': 'application/gzip' if use_gzip else content_type,
+                'res_model': self._name,
+                'res_id': 0,
+            })
+        self.write({
+            'payload_attachment_id': attachment.id,
+            'payload_sha256': sha256,
+            'payload_size': len(data),
+            'payload_encoding': 'gzip' if attachment.name.endswith('.gz') else 'identity',
+        })
+
+    def _payload_signature(self, expires):
+        return hmac(self.env(su=True), 'seisei_print_payload', f'{self.job_id}:{expires}')
+
+    def _payload_reference(self):
+        """Payload description for the bus message, with a signed fetch URL"""
+        self.ensure_one()
+        expires = int(time.time()) + PAYLOAD_URL_TTL
+        signature = self._payload_signature(expires)
+        url = f'{self.get_base_url()}/seisei/print/payload/{self.job_id}'
+        return {
+            'sha256': self.payload_sha256,
+            'size': self.payload_size,
+            'encoding': self.payload_encoding,
+            'stored_size': self.payload_attachment_id.file_size,
+            'etag': self.payload_attachment_id.checksum,
+            'url': f'{url}?expires={expires}&signature={signature}',
+            # POST the same query string here to get a fresh reference once expired
+            'renew_url': f'{url}/renew',
+            'expires': expires,
+        }
+
+    @api.model
+    def _get_payload_job(self, job_uuid, expires, signature, allow_expired=False):
+        """Job whose payload a signed URL grants access to, or an empty recordset"""
+        try:
+            expires = int(expires)
+        except (TypeError, ValueError):
+            return self.browse()
+        if expires < time.time() and not allow_expired:
+            return self.browse()
+        job = self.sudo().search([('job_id', '=', job_uuid)], limit=1)
+        if not job.payload_attachment_id or not consteq(job._payload_signature(expires), signature or ''):
+            return self.browse()
+        return job
+
+    @api.model
+    def _renew_payload_reference(self, job_uuid, expires, signature):
+        """Payload reference with a fresh URL, for a signed URL of a job not yet finished.
+
+        The URL may have expired: a station that received the job but could
+        not download it in time (offline, queued behind other jobs) still
+        holds a genuine signature.
+        """
+        job = self._get_payload_job(job_uuid, expires, signature, allow_expired=True)
+        if not job or job.status in FINISHED_STATUSES:
+            return None
+        return job._payload_reference()
+
     def _send_to_service(self):
         """
         Send to service for printing
@@ -311,6 +482,9 @@ class PrintJob(models.Model):
                 'priority': self.priority,
                 'metadata': json.loads(self.metadata or '{}'),
             }
+            if self.payload_attachment_id:
+                # Stations fetch the document from the signed URL
+                data['payload'] = self._payload_reference()
 
             # Use unified printer_manager channel
             # Always use 'print_document' as message type for client compatibility
@@ -407,7 +581,7 @@ class PrintJob(models.Model):
         Receive status update from Service
         
         Args:
-            job_id (str): Job ID
+            job_id (str): Job UUID (job_id field)
             status (str): New status
             message (str): Status message
         
@@ -415,7 +589,11 @@ class PrintJob(models.Model):
             bool: Whether update was successful
         """
         try:
-            job = self.browse(job_id)
+            # Stations send the job UUID; keep accepting database ids
+            if isinstance(job_id, int):
+                job = self.browse(job_id).exists()
+            else:
+                job = self.search([('job_id', '=', job_id)], limit=1)
             if not job:
                 _logger.warning(f"Job not found: {job_id}")
                 return False
@@ -429,20 +607,80 @@ class PrintJob(models.Model):
 
 
     @api.model
-    def cleanup_old_jobs(self, days=30):
-        """Clean up old jobs"""
+    def cleanup_old_jobs(self, days=30, commit=False):
+        """
+        Clean up old jobs
+
+        Deletes finished jobs older than the given days with set-based SQL,
+        RETENTION_BATCH rows per statement, instead of loading them into the
+        ORM. Content rows go with them (ON DELETE CASCADE).
+
+        Args:
+            days (int): Keep jobs created in the last days
+            commit (bool): Commit after every batch (cron), so a large
+                backlog neither holds locks for long nor restarts from zero
+
+        Returns:
+            int: Number of deleted jobs
+        """
         cutoff_date = fields.Datetime.now() - timedelta(days=days)
-        old_jobs = self.search([
-            ('status', 'in', ['completed', 'failed', 'cancelled']),
-            ('create_date', '<', cutoff_date),
-            ('is_test', '=', False)  # Keep test jobs for debugging
-        ])
-        
-        count = len(old_jobs)
-        old_jobs.unlink()
+        count = 0
+        while True:
+            self.env.cr.execute("""
+                DELETE FROM seisei_print_job WHERE id IN (
+                    SELECT id FROM seisei_print_job
+                    WHERE status IN %s AND create_date < %s
+                      AND is_test IS NOT TRUE  -- Keep test jobs for debugging
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+            """, (FINISHED_STATUSES, cutoff_date, RETENTION_BATCH))
+            deleted = self.env.cr.rowcount
+            count += deleted
+            if commit and deleted:
+                self.env.cr.commit()
+            if deleted < RETENTION_BATCH:
+                break
+        self.invalidate_model()
         _logger.info(f"Cleaned up {count} old print jobs")
-        
+
+        self._cleanup_orphan_payloads()
         return count
+
+    @api.model
+    def _cron_cleanup_old_jobs(self):
+        """Scheduled retention, days from seisei_print_manager.job_retention_days"""
+        days = int(self.env['ir.config_parameter'].sudo().get_param(
+            'seisei_print_manager.job_retention_days', 30))
+        return self.cleanup_old_jobs(days=days, commit=True)
+
+    @api.model
+    def _cleanup_orphan_payloads(self):
+        """Remove payload attachments no job refers to anymore
+
+        Payloads a concurrent _set_payload() is reusing are locked by it and
+        skipped; a later run removes them if they are still unused. If such
+        a reuse commits while the orphans are deleted, the deletion fails
+        (serialization error) and is left to the next run as well.
+        """
+        self.env.cr.execute("""
+            SELECT a.id FROM ir_attachment a
+            WHERE a.res_model = %s AND a.res_id = 0 AND a.name LIKE %s
+              AND NOT EXISTS (SELECT 1 FROM seisei_print_job j WHERE j.payload_attachment_id = a.id)
+            ORDER BY a.id
+            FOR UPDATE OF a SKIP LOCKED
+        """, (self._name, f'{PAYLOAD_PREFIX}%'))
+        orphans = self.env['ir.attachment'].sudo().browse([row[0] for row in self.env.cr.fetchall()])
+        if not orphans:
+            return 0
+        try:
+            with self.env.cr.savepoint():
+                orphans.unlink()
+        except Exception as e:
+            _logger.warning(f"Unused print payloads not removed, retrying on the next run: {e}")
+            return 0
+        _logger.info(f"Removed {len(orphans)} unused print payloads")
+        return len(orphans)
     
     @api.model
     def handle_job_result(self, result_data: dict):
@@ -488,3 +726,49 @@ class PrintJob(models.Model):
         except Exception as e:
             _logger.error(f"Failed to handle job result: {str(e)}")
             return False
+
+
+class PrintJobContent(models.Model):
+    """
+    Print Job Content
+    Metadata and job data of print jobs, kept out of seisei_print_job so
+    list views, searches and status updates do not read them.
+    """
+    _name = 'seisei.print.job.content'
+    _description = 'Print Job Content'
+
+    job_id = fields.Many2one(
+        comodel_name='seisei.print.job',
+        string=_('Print Job'),
+        required=True,
+        ondelete='cascade',
+        help=_('Print job this content belongs to')
+    )
+
+    metadata = fields.Text(
+        string=_('Metadata'),
+        help=_('JSON format job metadata')
+    )
+
+    job_data = fields.Text(
+        string=_('Job Data'),
+        help=_('JSON format job data')
+    )
+
+    _sql_constraints = [
+        ('unique_job', 'unique(job_id)', 'A print job has a single content record!'),
+    ]
+
+    def init(self):
+        """Move metadata stored inline by earlier versions to this table"""
+        if not column_exists(self.env.cr, 'seisei_print_job', 'metadata'):
+            return
+        self.env.cr.execute("""
+            INSERT INTO seisei_print_job_content (job_id, metadata, job_data, create_uid, create_date, write_uid, write_date)
+            SELECT id, metadata, job_data, create_uid, create_date, write_uid, write_date
+            FROM seisei_print_job
+            WHERE metadata IS NOT NULL OR job_data IS NOT NULL
+            ON CONFLICT (job_id) DO NOTHING
+        """)
+        _logger.info(f"Moved {self.env.cr.rowcount} print job metadata rows to seisei_print_job_content")
+        self.env.cr.execute("ALTER TABLE seisei_print_job DROP COLUMN metadata, DROP COLUMN IF EXISTS job_data")
@@ -8,6 +8,8 @@ from odoo.exceptions import UserError, ValidationError
 import base64
 import json
 
+from .print_job import INLINE_PAYLOAD_MAX
+
 _logger = logging.getLogger(__name__)
 
 
@@ -16,6 +18,7 @@ class PrinterInfo(models.Model):
     Printer Information Model
     """
     _name = 'seisei.printer'
+    _inherit = ['seisei.heartbeat.mixin']
     _description = 'Printer Information'
     _rec_name = 'display_name'
     _order = 'is_default desc, name'
@@ -115,6 +118,9 @@ class PrinterInfo(models.Model):
     
     last_sync_time = fields.Datetime(
         string=_('Last Sync Time'),
+        compute='_compute_last_sync_time',
+        inverse='_inverse_last_sync_time',
+        search='_search_last_sync_time',
         help=_('Last time synced from service')
     )
     
@@ -171,15 +177,18 @@ class PrinterInfo(models.Model):
             printer.display_name = ' '.join(parts)
 
     def _compute_job_statistics(self):
-        """Compute job statistics"""
+        """Compute job statistics (one grouped count on the printer/status index)"""
+        counts = {}
+        for printer, status, count in self.env['seisei.print.job']._read_group(
+            [('printer_id', 'in', self.ids)], ['printer_id', 'status'], ['__count'],
+        ):
+            counts[(printer.id, status)] = count
         for printer in self:
-            jobs = self.env['seisei.print.job'].search([
-                ('printer_name', '=', printer.name)
-            ])
-            
-            printer.total_jobs = len(jobs)
-            printer.success_jobs = len(jobs.filtered(lambda j: j.status == 'completed'))
-            printer.failed_jobs = len(jobs.filtered(lambda j: j.status == 'failed'))
+            printer_counts = {status: count for (printer_id, status), count in counts.items()
+                              if printer_id == printer.id}
+            printer.total_jobs = sum(printer_counts.values())
+            printer.success_jobs = printer_counts.get('completed', 0)
+            printer.failed_jobs = printer_counts.get('failed', 0)
             
             if printer.total_jobs > 0:
                 printer.success_rate = (printer.success_jobs / printer.total_jobs) * 100
@@ -259,14 +268,15 @@ class PrinterInfo(models.Model):
             }
         }
 
-    @api.model
-    def create(self, vals):
+    @api.model_create_multi
+    def create(self, vals_list):
         """Automatically assign default station when creating printer"""
-        if not vals.get('station_id'):
-            # If no station specified, assign to default station
-            default_station = self.env['seisei.station'].get_default_station()
-            vals['station_id'] = default_station.id
-        return super().create(vals)
+        for vals in vals_list:
+            if not vals.get('station_id'):
+                # If no station specified, assign to default station
+                default_station = self.env['seisei.station'].get_default_station()
+                vals['station_id'] = default_station.id
+        return super().create(vals_list)
 
     def name_get(self):
         """Custom name display including station information"""
@@ -607,58 +617,42 @@ class PrinterInfo(models.Model):
 
             # Get or create station
             station = self._get_or_create_station(station_info)
+
+            # Stations list optional features in their sync; older ones send none
+            features = station_data.get('features') or []
+            station_features = {
+                'payload_url_support': 'payload_url' in features,
+                'sync_summary_support': 'sync_summary' in features,
+            }
+            if station and any(station[name] != value for name, value in station_features.items()):
+                station.write(station_features)
             
             # Get printer list
             printers_data = station_data.get('printers', [])
             sync_type = station_data.get('sync_type', 'full')
-            sync_count = 0
             
             _logger.info(_("Processing station sync: %s (type: %s, %d printers)") % (station.display_name, sync_type, len(printers_data)))
             
-            # Process each printer
-            for printer_data in printers_data:
-                try:
-                    printer_name = printer_data.get('name')
-                    if not printer_name:
-                        _logger.warning(_("Skipping printer data without name"))
-                        continue
-                    
-                    # Prepare printer data
-                    printer_vals = {
-                        'name': printer_name,
-                        'config_id': config_id,
-                        'system_name': printer_data.get('system_name', printer_name),
-                        'description': printer_data.get('description', ''),
-                        'location': printer_data.get('location', ''),
-                        'manufacturer': printer_data.get('manufacturer', ''),
-                        'model': printer_data.get('model', ''),
-                        'is_default': printer_data.get('is_default', False),
-                        'status': printer_data.get('status', 'unknown'),
-                        'status_message': printer_data.get('status_message', ''),
-                        'supported_formats': str(printer_data.get('supported_formats', [])),
-                        'capabilities': str(printer_data.get('capabilities', {})),
-                        'service_sync': True,
-                        'last_sync_time': fields.Datetime.now(),
-                        'station_id': station.id,  # Associate with station
-                    }
-                    
-                    # Find existing printer record (first by UUID, then by station+name)
-                    existing_printer = self.search([
-                        ('name', '=', printer_name),
-                        ('station_id', '=', station.id)
-                    ], limit=1)
-                    
-                    if existing_printer:
-                        # Update existing printer
-                        existing_printer.write(printer_vals)
-                        _logger.info(_("Updated printer information: %s @ %s") % (printer_name, station.display_name))
-                    else:
-                        # Create new printer
-                        existing_printer = self.create(printer_vals)
-                        _logger.info(_("Created new printer: %s @ %s") % (printer_name, station.display_name))
-                    
-                    sync_count += 1
-                    
+            # Diff all reported printers against the station's and apply only real changes
+            station_printers = self.search([('station_id', '=', station.id)])
+            synced, errors, changed = self._apply_printer_sync(station, station_printers, printers_data, config_id)
+            sync_count = len(synced.keys() - errors.keys())
+
+            if station.sync_summary_support:
+                # One message for the whole sync, none when nothing changed
+                self._send_sync_summary(station, sync_type, synced, changed, errors)
+
+            # Older stations: one notification job per changed or failed printer
+            for printer_data in [] if station.sync_summary_support else printers_data:
+                printer_name = printer_data.get('name')
+                if not printer_name:
+                    _logger.warning(_("Skipping printer data without name"))
+                    continue
+                if printer_name not in changed and printer_name not in errors:
+                    continue
+                existing_printer = synced.get(printer_name)
+
+                if printer_name not in errors:
                     # Send individual printer sync confirmation notification
                     notification_data = {
                         'type': 'print_manager_sync_result',
@@ -670,7 +664,7 @@ class PrinterInfo(models.Model):
                         'timestamp': fields.Datetime.now().isoformat(),
                         'message': _('Printer %s sync successful') % printer_name
                     }
-                    
+
                     # Send sync result notification through print_job
                     sync_job = self.env['seisei.print.job'].create({
                         'name': _('Sync Result Notification - %s') % printer_name,
@@ -680,24 +674,21 @@ class PrinterInfo(models.Model):
                         'metadata': json.dumps(notification_data)
                     })
                     sync_job.action_process()
-                    
-                except Exception as printer_error:
-                    _logger.error(_("Error processing printer %s: %s") % (printer_data.get('name', 'Unknown'), str(printer_error)))
-                    
+                else:
                     # Send individual printer error notification
                     error_notification = {
                         'type': 'print_manager_sync_result',
-                        'printer_name': printer_data.get('name', 'Unknown'),
+                        'printer_name': printer_name,
                         'station_name': station.display_name if station else 'Unknown',
                         'sync_type': sync_type,
                         'success': False,
                         'timestamp': fields.Datetime.now().isoformat(),
-                        'message': _('Printer sync failed: %s') % str(printer_error)
+                        'message': _('Printer sync failed: %s') % errors[printer_name]
                     }
-                    
+
                     # Send error notification through print_job
                     error_job = self.env['seisei.print.job'].create({
-                        'name': _('Sync Error Notification - %s') % printer_data.get("name", "Unknown"),
+                        'name': _('Sync Error Notification - %s') % printer_name,
                         'type': 'sync_error_notification',
                         'printer_id': existing_printer.id if existing_printer else False,
                         'status': 'pending',
@@ -707,12 +698,11 @@ class PrinterInfo(models.Model):
 
             # For full sync, remove printers that no longer exist on the client
             if sync_type == 'full' and station:
-                synced_printer_names = [p.get('name') for p in printers_data if p.get('name')]
-                obsolete_printers = self.search([
-                    ('station_id', '=', station.id),
-                    ('name', 'not in', synced_printer_names),
-                    ('service_sync', '=', True),  # Only remove service-synced printers
-                ])
+                synced_printer_names = {p.get('name') for p in printers_data if p.get('name')}
+                obsolete_printers = station_printers.filtered(
+                    # Only remove service-synced printers
+                    lambda p: p.service_sync and p.name not in synced_printer_names
+                )
                 if obsolete_printers:
                     obsolete_names = obsolete_printers.mapped('name')
                     _logger.info(_("Removing %d obsolete printers from station %s: %s") % (
@@ -721,7 +711,7 @@ class PrinterInfo(models.Model):
 
             # Update station last sync time
             if station:
-                station.write({'last_sync_time': fields.Datetime.now()})
+                station._touch_heartbeat()
 
             _logger.info(_("Station sync completed: %s, successfully synced %d printers") % (station.display_name, sync_count))
             
@@ -748,6 +738,146 @@ class PrinterInfo(models.Model):
             })
             station_error_job.action_process()
 
+    @api.model
+    def _printer_sync_vals(self, printer_data, station, config_id):
+        """Printer values reported by a station (heartbeat excluded)"""
+        printer_name = printer_data.get('name')
+        return {
+            'name': printer_name,
+            'config_id': config_id,
+            'system_name': printer_data.get('system_name', printer_name),
+            'description': printer_data.get('description', ''),
+            'location': printer_data.get('location', ''),
+            'manufacturer': printer_data.get('manufacturer', ''),
+            'model': printer_data.get('model', ''),
+            'is_default': printer_data.get('is_default', False),
+            'status': printer_data.get('status', 'unknown'),
+            'status_message': printer_data.get('status_message', ''),
+            'supported_formats': str(printer_data.get('supported_formats', [])),
+            'capabilities': str(printer_data.get('capabilities', {})),
+            'service_sync': True,
+            'station_id': station.id,  # Associate with station
+        }
+
+    def _printer_sync_changes(self, vals):
+        """Subset of vals that differs from the stored values (empty == unset)"""
+        self.ensure_one()
+        changes = {}
+        for field_name, value in vals.items():
+            current = self[field_name]
+            if isinstance(current, models.BaseModel):
+                current = current.id
+            if (current or False) != (value or False):
+                changes[field_name] = value
+        return changes
+
+    @api.model
+    def _apply_printer_sync(self, station, station_printers, printers_data, config_id):
+        """
+        Apply a station's printer list with as few writes as possible
+
+        Printers whose reported values match the stored ones are not written
+        at all; changed printers are written in groups sharing the same
+        changes and new printers are created in one batch. Every reported
+        printer gets a heartbeat.
+
+        Args:
+            station (seisei.station): Reporting station
+            station_printers (seisei.printer): Printers already stored for the station
+            printers_data (list): Printer dicts reported by the station
+            config_id: Server configuration ID
+
+        Returns:
+            tuple: ({printer name: printer}, {printer name: error message},
+                    names of the printers created or updated)
+        """
+        existing = {}
+        for printer in station_printers:
+            existing.setdefault(printer.name, printer)
+
+        reported = {}
+        for printer_data in printers_data:
+            if printer_data.get('name'):
+                reported[printer_data['name']] = self._printer_sync_vals(printer_data, station, config_id)
+
+        to_create = {}
+        to_write = {}
+        for name, vals in reported.items():
+            printer = existing.get(name)
+            if not printer:
+                to_create[name] = vals
+                continue
+            changes = printer._printer_sync_changes(vals)
+            if changes:
+                to_write[name] = changes
+
+        synced = {name: existing[name] for name in reported if name in existing}
+        errors = {}
+        try:
+            with self.env.cr.savepoint():
+                self._write_printer_changes(existing, to_write)
+                if to_create:
+                    created = self.create(list(to_create.values()))
+                    synced.update(zip(to_create, created))
+        except Exception as e:
+            # A constraint (e.g. a second default printer) failed the batch:
+            # apply printer by printer so only the offending ones fail
+            _logger.warning(_("Batched printer sync failed for station %s, retrying per printer: %s") % (
+                station.display_name, str(e)))
+            for name in list(to_write) + list(to_create):
+                try:
+                    with self.env.cr.savepoint():
+                        if name in to_write:
+                            self._write_printer_changes(existing, {name: to_write[name]})
+                        else:
+                            synced[name] = self.create([to_create[name]])
+                except Exception as printer_error:
+                    _logger.error(_("Error processing printer %s: %s") % (name, str(printer_error)))
+                    errors[name] = str(printer_error)
+
+        self.browse([printer.id for printer in synced.values()])._touch_heartbeat()
+        _logger.info(_("Station %s sync: %d printers reported, %d created, %d updated, %d unchanged") % (
+            station.display_name, len(reported), len(to_create), len(to_write),
+            len(reported) - len(to_create) - len(to_write)))
+        changed = (set(to_create) | set(to_write)) - set(errors)
+        return synced, errors, changed
+
+    @api.model
+    def _send_sync_summary(self, station, sync_type, synced, changed, errors):
+        """
+        Send one sync result message to a station, listing the printers the
+        sync created or updated and the ones that failed. Nothing is sent
+        when every reported printer was already up to date.
+        """
+        if not changed and not errors:
+            return
+        self.env['bus.bus']._sendone(f'seisei_service.{station.code}', 'print_manager_sync_result', {
+            'type': 'print_manager_sync_result',
+            'station_name': station.display_name,
+            'station_code': station.code,
+            'sync_type': sync_type,
+            'success': not errors,
+            'timestamp': fields.Datetime.now().isoformat(),
+            'changed': [
+                {'printer_name': name, 'printer_id': synced[name].id}
+                for name in sorted(changed) if name in synced
+            ],
+            'errors': [
+                {'printer_name': name, 'message': message}
+                for name, message in sorted(errors.items())
+            ],
+        })
+
+    @api.model
+    def _write_printer_changes(self, existing, to_write):
+        """One write per distinct set of changes"""
+        groups = {}
+        for name, changes in to_write.items():
+            key = tuple(sorted(changes.items()))
+            groups[key] = groups.get(key, self.browse()) | existing[name]
+        for key, printers in groups.items():
+            printers.write(dict(key))
+
     @api.model
     def _get_or_create_station(self, station_info):
         """
@@ -890,21 +1020,46 @@ class PrinterInfo(models.Model):
         paper_format_record.pop('write_uid', None)
         paper_format_record.pop('write_date', None)
         
+        metadata = {
+            'doc_format': doc_format,
+            'print_opts': print_opts,
+            'paper_format': paper_format_record,
+        }
+        # Larger documents are stored as an attachment the station fetches
+        # from a signed URL, if it advertised support for it; stations that
+        # did not still get everything inline
+        inline = not self.station_id.payload_url_support or (
+            len(document) <= INLINE_PAYLOAD_MAX and (isinstance(document, str) or doc_format == 'qweb-pdf'))
+        if inline:
+            if doc_format == 'qweb-pdf':
+                metadata['doc_data'] = base64.b64encode(document).decode('utf-8')
+            else:
+                metadata['doc_data'] = document.decode('utf-8', errors='replace') \
+                    if isinstance(document, bytes) else document
+
         test_job = self.env['seisei.print.job'].create({
             'name': _('Print Report %s') % (report.name if report else "Document"),
             'type': 'print_document',
             'printer_id': self.id,
             'status': 'pending',
             'is_test': False,
-            'metadata': json.dumps({
-                'doc_data': base64.b64encode(document).decode('utf-8') if doc_format == 'qweb-pdf' else document,
-                'doc_format': doc_format,
-                'print_opts': print_opts,
-                'paper_format': paper_format_record,
-            })
+            'metadata': json.dumps(metadata),
         })
+        if not inline:
+            content_type = {'qweb-pdf': 'application/pdf', 'qweb-text': 'text/plain'}.get(
+                doc_format, 'application/octet-stream')
+            test_job._set_payload(document, content_type)
 
         # Trigger printing
         test_job.action_process()
         
         return True
+
+    def _dispatch_qr_kitchen_ticket(self, qr_order, pos_order, is_batch=False, qr_lines=None):
+        """
+        Render a QR Ordering kitchen ticket and send it to this printer.
+        Called by the QR Ordering print queue worker after the order is committed.
+        """
+        self.ensure_one()
+        from ..hooks import _create_seisei_kitchen_job
+        return _create_seisei_kitchen_job(qr_order, self, pos_order, is_batch=is_batch, qr_lines=qr_lines)
@@ -13,6 +13,7 @@ class PrintStation(models.Model):
     Used to organize and manage printers by physical location or logical grouping
     """
     _name = 'seisei.station'
+    _inherit = ['seisei.heartbeat.mixin']
     _description = 'Print Station'
     _rec_name = 'display_name'
     _order = 'is_default desc, sequence, name'
@@ -62,6 +63,20 @@ class PrintStation(models.Model):
         string='Hostname',
         help='Hostname of the station'
     )
+
+    payload_url_support = fields.Boolean(
+        string='Fetches Payloads by URL',
+        readonly=True,
+        help='Reported by the station sync: large documents are downloaded from signed URLs '
+             'instead of being sent inline'
+    )
+
+    sync_summary_support = fields.Boolean(
+        string='Receives Sync Summaries',
+        readonly=True,
+        help='Reported by the station sync: sync results arrive as one message listing the '
+             'changed printers instead of one print job per printer'
+    )
     
     is_active = fields.Boolean(
         string='Active',
@@ -119,6 +134,9 @@ class PrintStation(models.Model):
     
     last_sync_time = fields.Datetime(
         string='Last Sync Time',
+        compute='_compute_last_sync_time',
+        inverse='_inverse_last_sync_time',
+        search='_search_last_sync_time',
         help='Last time synchronized with service'
     )
     
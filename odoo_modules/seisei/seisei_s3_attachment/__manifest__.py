@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'Seisei S3 Attachment Storage',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.1.0',
     'category': 'Technical',
     'summary': 'Store attachments in AWS S3 or S3-compatible storage',
     'description': """
@@ -15,7 +15,9 @@ Features:
 - New attachments automatically stored in S3
 - Download/preview attachments from S3
 - Test connection button in settings
-- Migration wizard for existing attachments
+- Migration wizard for existing attachments, run in the background by a
+  cron: parallel uploads (multipart for large files), existing objects found
+  by prefix listing, resumable from a checkpoint, throughput reporting
 - Rollback support (disable S3 without data loss)
 - Support for private buckets with presigned URLs
 
@@ -27,6 +29,8 @@ Configuration:
 - seisei.s3.access_key: Access key ID
 - seisei.s3.secret_key: Secret access key
 - seisei.s3.prefix: Object key prefix
+- seisei_s3_attachment.migration_time_budget: seconds per migration cron run
+  (default: half the cron time limit, 90 without limit)
     """,
     'author': 'Seisei',
     'website': 'https://seisei.tokyo',
@@ -39,6 +43,7 @@ Configuration:
     },
     'data': [
         'security/ir.model.access.csv',
+        'data/ir_cron.xml',
         'views/res_config_settings_views.xml',
         'wizard/s3_migration_wizard_views.xml',
     ],
@@ -1,3 +1,4 @@
 # -*- coding: utf-8 -*-
 from . import ir_attachment
 from . import res_config_settings
+from . import s3_migration_job
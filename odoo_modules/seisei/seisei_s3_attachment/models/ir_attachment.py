@@ -88,9 +88,10 @@ class IrAttachment(models.Model):
             _logger.error("Failed to create S3 client: %s", e)
             return None
 
-    def _compute_s3_key(self, checksum):
+    def _compute_s3_key(self, checksum, config=None):
         """Compute S3 object key from checksum."""
-        config = self._get_s3_config()
+        if config is None:
+            config = self._get_s3_config()
         prefix = config['prefix'].strip('/')
         # Use checksum as key to ensure deduplication
         # Format: prefix/ab/cd/abcdef123456...
@@ -128,7 +129,7 @@ class IrAttachment(models.Model):
         config = self._get_s3_config()
 
         if config['enabled'] and config['bucket']:
-            s3_key = self._compute_s3_key(checksum)
+            s3_key = self._compute_s3_key(checksum, config)
             if self._s3_write(bin_data, s3_key, config):
                 # Return s3:// prefix to indicate S3 storage
                 return f"s3://{s3_key}"
@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+"""
+S3 Migration Jobs
+
+Filestore attachments are moved to S3 by a cron, not inside the wizard's
+request. Each job walks the attachments in id order, one batch at a time:
+
+- objects already in the bucket are found by listing their key prefix
+  (<prefix>/ab/) once per run with list_objects_v2, not one HEAD per object
+- the others are uploaded straight from the filestore by a thread pool
+  sharing one boto3 client; large files go up as multipart uploads
+- the batch's attachments are repointed to s3:// and the job's checkpoint
+  (last attachment id and counters) is committed with them; their former
+  filestore files are then handed to the filestore garbage collector
+- attachments that failed go to the job's retry list; once all others are
+  processed the list is retried, up to MAX_RETRY_PASSES times, before the
+  job is done
+
+An interrupted job resumes after its checkpoint on the next cron run;
+objects uploaded before the interruption are found by the listing. A batch
+whose listing fails, or in which every attachment fails (bucket
+unreachable, bad credentials), pauses the job with the error instead of
+failing everything that follows.
+"""
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+
+from odoo import api, fields, models, _
+from odoo.tools import config as odoo_config
+
+_logger = logging.getLogger(__name__)
+
+try:
+    from boto3.s3.transfer import TransferConfig
+except ImportError:
+    TransferConfig = None
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_WORKERS = 8
+DEFAULT_TIME_BUDGET = 90  # seconds per cron run when the server sets no time limit
+MULTIPART_THRESHOLD = 16 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 16 * 1024 * 1024
+MAX_ERROR_LINES = 20
+MAX_RETRY_PASSES = 3
+
+
+def _list_keys(client, bucket, prefix):
+    """All object keys under prefix"""
+    keys = set()
+    paginator = client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        keys.update(obj['Key'] for obj in page.get('Contents', ()))
+    return keys
+
+
+def _list_prefix(s3_key):
+    """<prefix>/ab/ of <prefix>/ab/cd/<checksum>: 256 listings cover the bucket"""
+    return s3_key.rsplit('/', 2)[0] + '/'
+
+
+def _upload_file(client, bucket, key, path, transfer_config):
+    """Upload one filestore file (worker thread, no database access)"""
+    client.upload_file(path, bucket, key, Config=transfer_config)
+    return os.path.getsize(path)
+
+
+class S3MigrationJob(models.Model):
+    _name = 's3.migration.job'
+    _description = 'S3 Attachment Migration Job'
+    _order = 'id desc'
+
+    name = fields.Char(string='Name', required=True,
+                       default=lambda self: _('S3 Migration'))
+    state = fields.Selection([
+        ('running', 'Running'),
+        ('paused', 'Paused'),
+        ('done', 'Done'),
+    ], string='State', default='running', required=True, index=True)
+    date_from = fields.Date(string='From Date',
+                            help='Only migrate attachments created after this date')
+    batch_size = fields.Integer(string='Batch Size', default=DEFAULT_BATCH_SIZE,
+                                help='Attachments repointed and checkpointed per transaction')
+    workers = fields.Integer(string='Upload Threads', default=DEFAULT_WORKERS)
+
+    # Checkpoint
+    last_attachment_id = fields.Integer(string='Last Attachment ID', readonly=True,
+                                        help='Attachments up to this ID have been processed')
+    migrated_count = fields.Integer(string='Migrated', readonly=True)
+    existing_count = fields.Integer(string='Already in S3', readonly=True,
+                                    help='Migrated without upload, the object was already in the bucket')
+    failed_count = fields.Integer(string='Failed', readonly=True,
+                                  help='Attachments currently in the retry list')
+    failed_attachment_ids = fields.Many2many(
+        'ir.attachment', 's3_migration_job_failed_attachment_rel', 'job_id', 'attachment_id',
+        string='Failed Attachments', readonly=True,
+        help='Attachments whose migration failed, retried before the job is done')
+    retry_pass = fields.Integer(string='Retry Passes', readonly=True,
+                                help='Completed passes over the failed attachments')
+    retry_cursor = fields.Integer(readonly=True,
+                                  help='Failed attachments up to this ID have been retried in this pass')
+    uploaded_bytes = fields.Float(string='Uploaded Bytes', readonly=True)
+    elapsed_time = fields.Float(string='Elapsed (s)', readonly=True,
+                                help='Time spent migrating, excluding the waits between runs')
+    started_at = fields.Datetime(string='Started At', readonly=True)
+    finished_at = fields.Datetime(string='Finished At', readonly=True)
+    error = fields.Text(string='Last Errors', readonly=True)
+
+    remaining_count = fields.Integer(string='Remaining', compute='_compute_remaining_count')
+    throughput_mb = fields.Float(string='Throughput (MB/s)', compute='_compute_throughput',
+                                 digits=(16, 2))
+    throughput_objects = fields.Float(string='Throughput (objects/s)', compute='_compute_throughput',
+                                      digits=(16, 1))
+    progress_message = fields.Text(string='Progress', compute='_compute_progress_message')
+
+    @api.depends('last_attachment_id', 'date_from')
+    def _compute_remaining_count(self):
+        Attachment = self.env['ir.attachment'].sudo()
+        for job in self:
+            job.remaining_count = Attachment.search_count(job._attachment_domain())
+
+    @api.depends('uploaded_bytes', 'migrated_count', 'elapsed_time')
+    def _compute_throughput(self):
+        for job in self:
+            elapsed = job.elapsed_time
+            job.throughput_mb = job.uploaded_bytes / (1024 * 1024) / elapsed if elapsed else 0.0
+            job.throughput_objects = job.migrated_count / elapsed if elapsed else 0.0
+
+    @api.depends('state', 'migrated_count', 'existing_count', 'failed_count',
+                 'remaining_count', 'throughput_mb', 'throughput_objects', 'error')
+    def _compute_progress_message(self):
+        for job in self:
+            message = _(
+                'Migrated: %(migrated)d (%(existing)d already in S3)\n'
+                'Failed: %(failed)d\n'
+                'Remaining: %(remaining)d\n'
+                'Throughput: %(mb).2f MB/s, %(objects).1f objects/s'
+            ) % {
+                'migrated': job.migrated_count,
+                'existing': job.existing_count,
+                'failed': job.failed_count,
+                'remaining': job.remaining_count,
+                'mb': job.throughput_mb,
+                'objects': job.throughput_objects,
+            }
+            if job.state == 'done':
+                message = _('Migration complete!\n') + message
+            if job.error:
+                message += '\n\n' + job.error
+            job.progress_message = message
+
+    def _attachment_domain(self):
+        """Filestore attachments this job has not processed yet"""
+        self.ensure_one()
+        domain = [
+            ('type', '=', 'binary'),
+            ('store_fname', '!=', False),
+            '!', ('store_fname', '=like', 's3://%'),
+            ('id', '>', self.last_attachment_id),
+        ]
+        if self.date_from:
+            domain.append(('create_date', '>=', self.date_from))
+        return domain
+
+    def _retry_domain(self):
+        """Failed attachments still in the filestore, not yet retried in this pass"""
+        self.ensure_one()
+        return [
+            ('id', 'in', self.failed_attachment_ids.ids),
+            ('id', '>', self.retry_cursor),
+            ('type', '=', 'binary'),
+            ('store_fname', '!=', False),
+            '!', ('store_fname', '=like', 's3://%'),
+        ]
+
+    # ==================== Control ====================
+
+    @api.model
+    def start(self, date_from=False, batch_size=DEFAULT_BATCH_SIZE):
+        """Resume the unfinished job, or start a new one, and wake the cron"""
+        job = self.search([('state', 'in', ('running', 'paused'))], limit=1)
+        if job:
+            job.action_resume()
+            return job
+        job = self.create({
+            'date_from': date_from,
+            'batch_size': batch_size or DEFAULT_BATCH_SIZE,
+            'started_at': fields.Datetime.now(),
+        })
+        self.env.ref('seisei_s3_attachment.ir_cron_s3_migration')._trigger()
+        return job
+
+    def action_pause(self):
+        self.filtered(lambda j: j.state == 'running').write({'state': 'paused'})
+
+    def action_resume(self):
+        self.filtered(lambda j: j.state == 'paused').write({
+            'state': 'running',
+            'error': False,
+            'retry_pass': 0,
+            'retry_cursor': 0,
+        })
+        self.env.ref('seisei_s3_attachment.ir_cron_s3_migration')._trigger()
+
+    # ==================== Engine ====================
+
+    @api.model
+    def _cron_migrate(self):
+        """Run migration jobs until they are done or the time budget is spent"""
+        deadline = time.monotonic() + self._time_budget()
+        for job in self.search([('state', '=', 'running')], order='id'):
+            job._run(deadline)
+            if time.monotonic() >= deadline:
+                break
+        if self.search_count([('state', '=', 'running')], limit=1):
+            self.env.ref('seisei_s3_attachment.ir_cron_s3_migration')._trigger()
+
+    @api.model
+    def _time_budget(self):
+        """Seconds one cron run may spend starting uploads.
+
+        The seisei_s3_attachment.migration_time_budget parameter if set, else
+        half of the real time limit of cron workers (limit_time_real_cron, or
+        limit_time_real when it is negative as by default), which leaves room
+        for the uploads still in flight at the deadline.
+        """
+        budget = self.env['ir.config_parameter'].sudo().get_param(
+            'seisei_s3_attachment.migration_time_budget')
+        if budget:
+            return int(budget)
+        limit = odoo_config.get('limit_time_real_cron', -1)
+        if limit is None or limit < 0:
+            limit = odoo_config.get('limit_time_real') or 0
+        if limit <= 0:
+            return DEFAULT_TIME_BUDGET
+        return max(1, limit // 2)
+
+    def _run(self, deadline):
+        """Migrate batches of this job until it is done, paused or out of time"""
+        self.ensure_one()
+        Attachment = self.env['ir.attachment'].sudo()
+        config = Attachment._get_s3_config()
+        client = Attachment._get_s3_client(config)
+        if not client or TransferConfig is None:
+            self.write({
+                'state': 'paused',
+                'error': _('S3 client not available, check the S3 settings'),
+            })
+            self.env.cr.commit()
+            return
+        # The pool already uploads files in parallel, parts of one file go in sequence
+        transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_THRESHOLD,
+            multipart_chunksize=MULTIPART_CHUNKSIZE,
+            use_threads=False,
+        )
+        listed = {}  # listed key prefix -> keys present in the bucket
+        with ThreadPoolExecutor(max_workers=max(1, self.workers),
+                                thread_name_prefix='s3_migration') as executor:
+            while time.monotonic() < deadline:
+                limit = max(1, self.batch_size)
+                attachments = Attachment.search(self._attachment_domain(), limit=limit, order='id')
+                retry = not attachments and bool(self.failed_attachment_ids)
+                if retry:
+                    attachments = Attachment.search(self._retry_domain(), limit=limit, order='id')
+                    if not attachments:
+                        # End of a pass over the failed attachments
+                        if self._end_retry_pass():
+                            return
+                        continue
+                if not attachments:
+                    self.write({'state': 'done', 'finished_at': fields.Datetime.now()})
+                    self.env.cr.commit()
+                    _logger.info("S3 migration job %s done: %d migrated",
+                                 self.id, self.migrated_count)
+                    return
+                self._migrate_batch(attachments, client, config, transfer_config, executor, listed,
+                                    deadline, retry=retry)
+                self.env.cr.commit()
+                self.invalidate_recordset(['state'])
+                if self.state != 'running':
+                    return
+
+    def _end_retry_pass(self):
+        """Start another pass over the failed attachments, or pause the job
+        once MAX_RETRY_PASSES are spent. Returns whether the job stopped."""
+        failed = self.failed_attachment_ids.filtered_domain([
+            ('store_fname', '!=', False), '!', ('store_fname', '=like', 's3://%'),
+        ])
+        retry_pass = self.retry_pass + 1
+        if not failed or retry_pass < MAX_RETRY_PASSES:
+            # Attachments deleted or migrated elsewhere meanwhile leave the list
+            self.write({
+                'failed_attachment_ids': [fields.Command.set(failed.ids)],
+                'failed_count': len(failed),
+                'retry_pass': retry_pass,
+                'retry_cursor': 0,
+            })
+            self.env.cr.commit()
+            return False
+        self.write({
+            'state': 'paused',
+            'retry_pass': retry_pass,
+            'error': _('%(count)d attachments still fail after %(passes)d attempts, resume to retry them.\n',
+                       count=len(failed), passes=retry_pass + 1) + (self.error or ''),
+        })
+        self.env.cr.commit()
+        _logger.warning("S3 migration job %s paused: %d attachments keep failing", self.id, len(failed))
+        return True
+
+    def _migrate_batch(self, attachments, client, config, transfer_config, executor, listed,
+                       deadline, retry=False):
+        """Upload one batch, repoint its attachments and advance the checkpoint.
+
+        Failed attachments are added to the retry list. With retry=True the
+        batch comes from that list and the retry cursor advances instead.
+        No upload is started after the deadline: the checkpoint then stops
+        before the first attachment left out.
+        """
+        started = time.monotonic()
+        Attachment = self.env['ir.attachment'].sudo()
+        bucket = config['bucket']
+        errors = []
+
+        # s3 key -> (filestore path, attachment ids)
+        by_key = {}
+        old_fnames = {}
+        for attachment in attachments:
+            path = Attachment._full_path(attachment.store_fname)
+            try:
+                checksum = attachment.checksum or self._file_checksum(path)
+                if not os.path.isfile(path):
+                    raise FileNotFoundError(attachment.store_fname)
+            except OSError as e:
+                errors.append(_('Attachment %(id)s: cannot read %(fname)s (%(error)s)',
+                                id=attachment.id, fname=attachment.store_fname, error=e))
+                continue
+            s3_key = Attachment._compute_s3_key(checksum, config)
+            by_key.setdefault(s3_key, (path, []))[1].append(attachment.id)
+            old_fnames[attachment.id] = attachment.store_fname
+
+        # List each key prefix once per run instead of a HEAD per object
+        prefixes = list({_list_prefix(s3_key) for s3_key in by_key} - set(listed))
+        try:
+            for prefix, keys in zip(prefixes, executor.map(
+                    lambda prefix: _list_keys(client, bucket, prefix), prefixes)):
+                listed[prefix] = keys
+        except Exception as e:
+            # Bad credentials, missing bucket, unreachable endpoint: every
+            # upload would fail too. Pause without moving the checkpoint.
+            _logger.error("S3 migration job %s paused, cannot list bucket %s: %s", self.id, bucket, e)
+            self.write({
+                'state': 'paused',
+                'elapsed_time': self.elapsed_time + time.monotonic() - started,
+                'error': _('Cannot list the S3 bucket %(bucket)s, check the S3 settings and resume.\n'
+                           '%(error)s', bucket=bucket, error=e),
+            })
+            return
+
+        existing = {s3_key for s3_key in by_key if s3_key in listed[_list_prefix(s3_key)]}
+        # Submit as workers free up, so the deadline is checked before each upload
+        to_upload = [s3_key for s3_key in by_key if s3_key not in existing]
+        to_upload.reverse()
+        uploads = {}  # future -> s3 key
+        uploaded_bytes = 0
+        stored = {s3_key: by_key[s3_key][1] for s3_key in existing}
+        while to_upload or uploads:
+            while to_upload and len(uploads) < max(1, self.workers) and time.monotonic() < deadline:
+                s3_key = to_upload.pop()
+                uploads[executor.submit(
+                    _upload_file, client, bucket, s3_key, by_key[s3_key][0], transfer_config)] = s3_key
+            if not uploads:
+                break
+            done, _pending = wait(uploads, return_when=FIRST_COMPLETED)
+            for future in done:
+                s3_key = uploads.pop(future)
+                try:
+                    uploaded_bytes += future.result()
+                except Exception as e:
+                    _logger.error("Failed to upload %s to S3: %s", s3_key, e)
+                    errors.append(_('Attachment %(ids)s: %(error)s',
+                                    ids=', '.join(map(str, by_key[s3_key][1])), error=e))
+                    continue
+                listed[_list_prefix(s3_key)].add(s3_key)
+                stored[s3_key] = by_key[s3_key][1]
+        skipped_ids = {attachment_id for s3_key in to_upload for attachment_id in by_key[s3_key][1]}
+
+        # ir.attachment.write() ignores store_fname, repoint in SQL. Only
+        # attachments still on the file read above are repointed: one whose
+        # content changed meanwhile goes to the retry list.
+        ids, old, fnames, keys = [], [], [], []
+        for s3_key, attachment_ids in stored.items():
+            for attachment_id in attachment_ids:
+                ids.append(attachment_id)
+                old.append(old_fnames[attachment_id])
+                fnames.append(f's3://{s3_key}')
+                keys.append(s3_key)
+        repointed = {}
+        if ids:
+            self.env.cr.execute("""
+                UPDATE ir_attachment a
+                   SET store_fname = v.fname, s3_key = v.s3_key
+                  FROM (SELECT unnest(%s::int[]) AS id,
+                               unnest(%s::varchar[]) AS old_fname,
+                               unnest(%s::varchar[]) AS fname,
+                               unnest(%s::varchar[]) AS s3_key) v
+                 WHERE a.id = v.id
+                   AND a.store_fname = v.old_fname
+             RETURNING a.id, v.old_fname
+            """, (ids, old, fnames, keys))
+            repointed = dict(self.env.cr.fetchall())
+            attachments.invalidate_recordset(['store_fname', 's3_key'])
+            # The files are only unreferenced once the batch is committed
+            self.env.cr.postcommit.add(partial(self._mark_filestore_gc, set(repointed.values())))
+
+        migrated = len(repointed)
+        failed_ids = set(attachments.ids) - set(repointed) - skipped_ids
+        processed = attachments.filtered(lambda attachment: attachment.id not in skipped_ids)
+        failed = (self.failed_attachment_ids - processed) | attachments.browse(sorted(failed_ids))
+        existing_ids = {attachment_id for key in existing for attachment_id in stored[key]}
+        vals = {
+            'migrated_count': self.migrated_count + migrated,
+            'existing_count': self.existing_count + len(existing_ids.intersection(repointed)),
+            'failed_attachment_ids': [fields.Command.set(failed.ids)],
+            'failed_count': len(failed),
+            'uploaded_bytes': self.uploaded_bytes + uploaded_bytes,
+            'elapsed_time': self.elapsed_time + time.monotonic() - started,
+            'error': '\n'.join(map(str, errors[-MAX_ERROR_LINES:])) if errors else self.error,
+        }
+        checkpoint = min(skipped_ids) - 1 if skipped_ids else attachments[-1].id
+        vals['retry_cursor' if retry else 'last_attachment_id'] = checkpoint
+        if failed_ids and not migrated and not skipped_ids:
+            # Nothing of the batch went through: likely the bucket or the
+            # credentials, not the files. Stop instead of failing the rest.
+            vals['state'] = 'paused'
+            vals['error'] = _('All %(count)d attachments of the last batch failed, '
+                              'check the S3 settings and resume.\n', count=len(attachments)) + (vals['error'] or '')
+        self.write(vals)
+        _logger.info("S3 migration job %s: batch up to attachment %s, %d migrated (%.1f MB uploaded), "
+                     "%d failed in %.1fs", self.id, attachments[-1].id, migrated,
+                     uploaded_bytes / (1024 * 1024), len(failed_ids), time.monotonic() - started)
+
+    def _mark_filestore_gc(self, fnames):
+        """Hand former filestore files to the filestore garbage collector,
+        which deletes those no attachment refers to anymore"""
+        Attachment = self.env['ir.attachment'].sudo()
+        for fname in fnames:
+            Attachment._file_delete(fname)
+
+    @staticmethod
+    def _file_checksum(path):
+        """sha1 of a filestore file, for attachments without a checksum"""
+        sha = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(chunk)
+        return sha.hexdigest()
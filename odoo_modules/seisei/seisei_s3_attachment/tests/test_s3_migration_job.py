@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import time
+from unittest.mock import MagicMock, patch
+
+from odoo.tests.common import TransactionCase, tagged
+
+from odoo.addons.seisei_s3_attachment.models import s3_migration_job
+
+S3_CONFIG = {
+    'enabled': True,
+    'bucket': 'test-bucket',
+    'region': 'ap-northeast-1',
+    'endpoint_url': '',
+    'access_key': '',
+    'secret_key': '',
+    'prefix': 'odoo-attachments',
+}
+
+
+@tagged('post_install', '-at_install')
+class TestS3MigrationJob(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.attachment = cls.env['ir.attachment'].create({
+            'name': 'migration.txt',
+            'raw': b'migrate me',
+        })
+        cls.job = cls.env['s3.migration.job'].create({
+            'last_attachment_id': cls.attachment.id - 1,
+        })
+
+    def _run_job(self, client):
+        Attachment = type(self.env['ir.attachment'])
+        with patch.object(Attachment, '_get_s3_config', return_value=S3_CONFIG), \
+                patch.object(Attachment, '_get_s3_client', return_value=client), \
+                patch.object(s3_migration_job, 'TransferConfig', MagicMock()), \
+                patch.object(self.env.cr, 'commit'):
+            self.job._run(time.monotonic() + 60)
+
+    def test_listing_error_pauses_job(self):
+        """A bucket that cannot be listed pauses the job, checkpoint unchanged"""
+        self.assertFalse(self.attachment.store_fname.startswith('s3://'))
+        client = MagicMock()
+        client.get_paginator.return_value.paginate.side_effect = Exception('AccessDenied')
+        self._run_job(client)
+
+        self.assertEqual(self.job.state, 'paused')
+        self.assertIn('AccessDenied', self.job.error)
+        self.assertEqual(self.job.last_attachment_id, self.attachment.id - 1)
+        self.assertFalse(self.job.failed_attachment_ids)
+        client.upload_file.assert_not_called()
+        self.assertFalse(self.attachment.store_fname.startswith('s3://'))
@@ -1,7 +1,5 @@
 # -*- coding: utf-8 -*-
-import base64
 import logging
-import os
 
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
@@ -40,8 +38,8 @@ class S3MigrationWizard(models.TransientModel):
     # Migration options
     batch_size = fields.Integer(
         string='Batch Size',
-        default=100,
-        help='Number of attachments to migrate per batch',
+        default=200,
+        help='Number of attachments migrated and checkpointed per transaction',
     )
     migrate_from_date = fields.Date(
         string='From Date',
@@ -49,9 +47,14 @@ class S3MigrationWizard(models.TransientModel):
     )
 
     # Progress
-    migrated_count = fields.Integer(string='Migrated', readonly=True)
-    failed_count = fields.Integer(string='Failed', readonly=True)
-    progress_message = fields.Text(string='Progress', readonly=True)
+    job_id = fields.Many2one('s3.migration.job', string='Migration Job', readonly=True)
+    job_state = fields.Selection(related='job_id.state', string='Job State')
+    migrated_count = fields.Integer(related='job_id.migrated_count')
+    failed_count = fields.Integer(related='job_id.failed_count')
+    remaining_count = fields.Integer(related='job_id.remaining_count')
+    throughput_mb = fields.Float(related='job_id.throughput_mb')
+    throughput_objects = fields.Float(related='job_id.throughput_objects')
+    progress_message = fields.Text(related='job_id.progress_message')
 
     @api.depends('state')
     def _compute_stats(self):
@@ -65,12 +68,10 @@ class S3MigrationWizard(models.TransientModel):
                 ('store_fname', '!=', False),
                 '!', ('store_fname', '=like', 's3://%'),
             ]
-            filestore_attachments = Attachment.search(filestore_domain)
-            wizard.total_filestore_count = len(filestore_attachments)
-
-            # Calculate size
-            total_size = sum(att.file_size or 0 for att in filestore_attachments)
-            wizard.total_filestore_size = total_size / (1024 * 1024)  # Convert to MB
+            [(count, total_size)] = Attachment._read_group(
+                filestore_domain, aggregates=['__count', 'file_size:sum'])
+            wizard.total_filestore_count = count
+            wizard.total_filestore_size = (total_size or 0) / (1024 * 1024)  # Convert to MB
 
             # S3 attachments
             s3_domain = [
@@ -106,115 +107,39 @@ class S3MigrationWizard(models.TransientModel):
             raise UserError(_('S3 connection failed: %s') % result['message'])
 
         self.state = 'migrating'
-        self.migrated_count = 0
-        self.failed_count = 0
-        self.progress_message = ''
-
         return self._do_migrate()
 
     def _do_migrate(self):
-        """Perform the actual migration."""
-        self.ensure_one()
-
-        Attachment = self.env['ir.attachment'].sudo()
-
-        # Build domain for filestore attachments
-        domain = [
-            ('type', '=', 'binary'),
-            ('store_fname', '!=', False),
-            '!', ('store_fname', '=like', 's3://%'),
-        ]
-        if self.migrate_from_date:
-            domain.append(('create_date', '>=', self.migrate_from_date))
+        """Start (or resume) the background migration job.
 
-        # Get batch of attachments
-        attachments = Attachment.search(domain, limit=self.batch_size, order='id asc')
+        Uploads run in the S3 migration cron, see s3.migration.job, so the
+        wizard only follows the job's progress.
+        """
+        self.ensure_one()
+        self.job_id = self.env['s3.migration.job'].start(
+            date_from=self.migrate_from_date,
+            batch_size=self.batch_size,
+        )
+        return self._reopen_wizard()
 
-        if not attachments:
+    def action_continue_migration(self):
+        """Refresh the progress of the migration job."""
+        self.ensure_one()
+        if self.job_id.state == 'done':
             self.state = 'done'
-            self.progress_message = _(
-                'Migration complete!\n'
-                'Migrated: %(migrated)d\n'
-                'Failed: %(failed)d'
-            ) % {'migrated': self.migrated_count, 'failed': self.failed_count}
-            return self._reopen_wizard()
-
-        migrated = 0
-        failed = 0
-        messages = []
-
-        for attachment in attachments:
-            try:
-                # Read current data
-                data = attachment.datas
-                if not data:
-                    _logger.warning("Attachment %s has no data, skipping", attachment.id)
-                    failed += 1
-                    continue
-
-                # Get checksum
-                checksum = attachment.checksum
-                if not checksum:
-                    import hashlib
-                    bin_data = base64.b64decode(data)
-                    checksum = hashlib.sha1(bin_data).hexdigest()
-
-                # Compute S3 key and upload
-                IrAttachment = self.env['ir.attachment']
-                s3_key = IrAttachment._compute_s3_key(checksum)
-                bin_data = base64.b64decode(data)
-
-                if IrAttachment._s3_write(bin_data, s3_key):
-                    # Update attachment record
-                    old_fname = attachment.store_fname
-                    attachment.write({
-                        'store_fname': f's3://{s3_key}',
-                    })
-                    migrated += 1
-                    _logger.info(
-                        "Migrated attachment %s: %s -> s3://%s",
-                        attachment.id, old_fname, s3_key
-                    )
-                else:
-                    failed += 1
-                    messages.append(f"Failed to upload attachment {attachment.id}")
-
-            except Exception as e:
-                failed += 1
-                messages.append(f"Error migrating attachment {attachment.id}: {e}")
-                _logger.exception("Error migrating attachment %s", attachment.id)
-
-        self.migrated_count += migrated
-        self.failed_count += failed
-        self.progress_message = _(
-            'Batch complete: %(migrated)d migrated, %(failed)d failed\n'
-            'Total progress: %(total_migrated)d migrated, %(total_failed)d failed\n'
-            '%(messages)s'
-        ) % {
-            'migrated': migrated,
-            'failed': failed,
-            'total_migrated': self.migrated_count,
-            'total_failed': self.failed_count,
-            'messages': '\n'.join(messages) if messages else '',
-        }
+        return self._reopen_wizard()
 
-        # Check if more to migrate
-        remaining = Attachment.search_count(domain)
-        if remaining > 0:
-            self.progress_message += _('\n\nRemaining: %d attachments') % remaining
-            return self._reopen_wizard()
-        else:
-            self.state = 'done'
-            self.progress_message = _(
-                'Migration complete!\n'
-                'Total migrated: %(migrated)d\n'
-                'Total failed: %(failed)d'
-            ) % {'migrated': self.migrated_count, 'failed': self.failed_count}
-            return self._reopen_wizard()
+    def action_pause_migration(self):
+        """Pause the migration job after its current batch."""
+        self.ensure_one()
+        self.job_id.action_pause()
+        return self._reopen_wizard()
 
-    def action_continue_migration(self):
-        """Continue migration with next batch."""
-        return self._do_migrate()
+    def action_resume_migration(self):
+        """Resume a paused migration job from its checkpoint."""
+        self.ensure_one()
+        self.job_id.action_resume()
+        return self._reopen_wizard()
 
     def _reopen_wizard(self):
         """Reopen wizard to show updated state."""
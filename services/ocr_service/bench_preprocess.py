@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Image normalization benchmark
+
+Shows what preprocess.normalize_image does to the payload sent to Gemini:
+bytes and base64 size, dimensions, approximate image tiles, estimated
+upload time, and the median time of each stage. No service or API key
+needed:
+
+    python bench_preprocess.py                      # synthetic phone photo and scan
+    python bench_preprocess.py a.jpg b.png scan.pdf # your own files
+    python bench_preprocess.py --grayscale --max-edge 1600 --quality 80 a.jpg
+
+PDFs need PyMuPDF; each page is reported separately.
+"""
+
+import argparse
+import io
+import math
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image, ImageDraw, ImageFont  # noqa: E402
+
+import preprocess  # noqa: E402
+
+TILE = 768  # Gemini bills large images per 768x768 tile
+
+
+def synthetic_samples():
+    """A rotated 4000x3000 phone photo of a receipt and a 150 DPI A4 scan"""
+    font = ImageFont.load_default(48)
+    photo = Image.new('RGB', (4000, 3000), (236, 232, 225))
+    draw = ImageDraw.Draw(photo)
+    for y in range(150, 2850, 80):
+        draw.text((300, y), f'Item {y // 80:03d}  x1  1,{y % 1000:03d} JPY', font=font, fill=(25, 25, 30))
+    exif = photo.getexif()
+    exif[preprocess.EXIF_ORIENTATION] = 6
+    buffer = io.BytesIO()
+    photo.save(buffer, format='JPEG', quality=95, exif=exif)
+    yield 'phone photo 4000x3000', buffer.getvalue(), 'image/jpeg'
+
+    scan = Image.new('RGB', (1240, 1754), 'white')
+    draw = ImageDraw.Draw(scan)
+    for y in range(120, 1650, 36):
+        draw.text((90, y), '2024-01-05  振込  ATM  12,345  1,234,567', font=ImageFont.load_default(22), fill='black')
+    buffer = io.BytesIO()
+    scan.save(buffer, format='PNG')
+    yield 'A4 scan PNG', buffer.getvalue(), 'image/png'
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (1240, 1754), 'white').save(buffer, format='PNG')
+    yield 'blank page PNG', buffer.getvalue(), 'image/png'
+
+
+def file_samples(paths, config):
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:5] == b'%PDF-':
+            for number, page in enumerate(preprocess.rasterize_pdf(data, 150), 1):
+                yield f'{os.path.basename(path)} p{number}', page.data, 'image/jpeg'
+        else:
+            mime = Image.MIME.get(Image.open(io.BytesIO(data)).format, 'application/octet-stream')
+            yield os.path.basename(path), data, mime
+
+
+def tiles(size):
+    width, height = size
+    return math.ceil(width / TILE) * math.ceil(height / TILE) if width and height else 0
+
+
+def bench(name, data, mime, config, repeat, uplink_mbps):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = preprocess.normalize_image(data, mime, config, detect_blank=True)
+        runs.append((time.perf_counter() - start, result))
+    result = runs[-1][1]
+    stages = {
+        stage: statistics.median(r.timings.get(stage, 0.0) for _elapsed, r in runs)
+        for stage in result.timings
+    }
+    before = 4 * math.ceil(len(data) / 3)
+    after = 4 * math.ceil(result.output_bytes / 3)
+
+    def upload_ms(size):
+        return size * 8 / (uplink_mbps * 1000)
+
+    print(f'\n{name}')
+    print(f'  {"":<14}{"before":>14}{"after":>14}')
+    print(f'  {"bytes":<14}{len(data):>14,}{result.output_bytes:>14,}')
+    print(f'  {"base64":<14}{before:>14,}{after:>14,}')
+    print(f'  {"size":<14}{"x".join(map(str, result.input_size)):>14}{"x".join(map(str, result.output_size)):>14}')
+    print(f'  {"tiles":<14}{tiles(result.input_size):>14}{tiles(result.output_size) if not result.blank else 0:>14}')
+    print(f'  {"upload ms":<14}{upload_ms(before):>14.0f}{upload_ms(after):>14.0f}   at {uplink_mbps} Mbit/s')
+    print(f'  {"blank":<14}{"":>14}{str(result.blank):>14}')
+    print('  stages (median ms): ' + ', '.join(f'{stage} {ms:.1f}' for stage, ms in stages.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*')
+    parser.add_argument('--max-edge', type=int, default=2000)
+    parser.add_argument('--quality', type=int, default=85)
+    parser.add_argument('--grayscale', action='store_true')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--uplink-mbps', type=float, default=20.0)
+    args = parser.parse_args()
+
+    config = preprocess.PreprocessConfig(
+        max_long_edge=args.max_edge, grayscale=args.grayscale, jpeg_quality=args.quality,
+    )
+    print(f'max edge {config.max_long_edge}px, quality {config.jpeg_quality}, '
+          f'grayscale {config.grayscale}, {args.repeat} runs')
+    samples = file_samples(args.files, config) if args.files else synthetic_samples()
+    for name, data, mime in samples:
+        bench(name, data, mime, config, args.repeat, args.uplink_mbps)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Image normalization before OCR
+
+Phone photos (4000x3000 JPEGs) and rasterized PDF pages are shrunk before
+they are sent to Gemini:
+
+    decode   JPEG draft mode decodes straight to (about) the target size
+    orient   apply the EXIF orientation tag
+    resize   bound the long edge to max_long_edge
+    color    optional grayscale, otherwise RGB
+    blank    PDF pages with almost no dark pixels are skipped
+    encode   JPEG at jpeg_quality; the original is kept when nothing changed
+             or re-encoding would not make it smaller
+
+Everything here is blocking (Pillow / PyMuPDF); the service runs it on a
+thread pool. No FastAPI dependency, so bench_preprocess.py can run it
+standalone.
+"""
+
+import io
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+EXIF_ORIENTATION = 0x0112
+INK_CONTRAST = 64  # levels darker than the paper that count as ink
+BLANK_PROBE_SIZE = 512
+
+
+@dataclass(frozen=True)
+class PreprocessConfig:
+    max_long_edge: int = 2000
+    grayscale: bool = False
+    jpeg_quality: int = 85
+    blank_ink_ratio: float = 0.0002  # one short text line is ~0.0006, a bare page number ~0.00004
+
+    def fingerprint(self) -> str:
+        """Settings that change the image sent upstream (part of the cache key)"""
+        return f'{self.max_long_edge}:{int(self.grayscale)}:{self.jpeg_quality}'
+
+
+@dataclass
+class PreprocessResult:
+    data: Optional[bytes]  # None for a blank page
+    mime_type: str
+    input_bytes: int
+    input_size: Tuple[int, int] = (0, 0)
+    output_size: Tuple[int, int] = (0, 0)
+    blank: bool = False
+    changed: bool = False
+    timings: Dict[str, float] = field(default_factory=dict)  # ms per stage
+
+    @property
+    def output_bytes(self) -> int:
+        return len(self.data) if self.data else 0
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'input_bytes': self.input_bytes,
+            'output_bytes': self.output_bytes,
+            'input_size': list(self.input_size),
+            'output_size': list(self.output_size),
+            'blank': self.blank,
+            'changed': self.changed,
+            'timings_ms': self.timings,
+        }
+
+
+class _StageTimer:
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._started = self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.timings[stage] = round((now - self._last) * 1000, 2)
+        self._last = now
+
+    def finish(self) -> Dict[str, float]:
+        self.timings['total'] = round((time.perf_counter() - self._started) * 1000, 2)
+        return self.timings
+
+
+def is_blank(image: Image.Image, ink_ratio: float) -> bool:
+    """True when less than ink_ratio of a downsampled copy is clearly darker
+    than the paper (the median level, so tinted passbook pages work too)"""
+    factor = max(image.size) // BLANK_PROBE_SIZE
+    probe = image.reduce(factor) if factor > 1 else image
+    histogram = probe.convert('L').histogram()
+    total = sum(histogram)
+    seen = 0
+    for paper, count in enumerate(histogram):
+        seen += count
+        if seen * 2 >= total:
+            break
+    return sum(histogram[:max(0, paper - INK_CONTRAST)]) < ink_ratio * total
+
+
+def _encode(image: Image.Image, config: PreprocessConfig) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=config.jpeg_quality)
+    return buffer.getvalue()
+
+
+def normalize_image(data: bytes, mime_type: str, config: PreprocessConfig,
+                    detect_blank: bool = False) -> PreprocessResult:
+    """Normalize one uploaded image; undecodable input is passed through"""
+    timer = _StageTimer()
+    result = PreprocessResult(data=data, mime_type=mime_type, input_bytes=len(data))
+    try:
+        image = Image.open(io.BytesIO(data))
+        result.input_size = image.size
+        orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+        long_edge = max(image.size)
+        if image.format == 'JPEG' and long_edge > config.max_long_edge:
+            scale = config.max_long_edge / long_edge
+            image.draft('L' if config.grayscale else 'RGB',
+                        (int(image.size[0] * scale), int(image.size[1] * scale)))
+        image.load()
+    except Exception:
+        result.timings = timer.finish()
+        return result
+    timer.lap('decode')
+    changed = image.size != result.input_size
+
+    if orientation != 1:
+        image = ImageOps.exif_transpose(image)
+        changed = True
+    timer.lap('orient')
+
+    if max(image.size) > config.max_long_edge:
+        image.thumbnail((config.max_long_edge, config.max_long_edge), Image.LANCZOS)
+        changed = True
+    timer.lap('resize')
+
+    target_mode = 'L' if config.grayscale else 'RGB'
+    if image.mode != target_mode:
+        # L input stays L when color is kept; anything else (RGBA, P, CMYK) becomes RGB
+        if config.grayscale or image.mode != 'L':
+            image = image.convert(target_mode)
+            changed = True
+    timer.lap('color')
+
+    if detect_blank:
+        result.blank = is_blank(image, config.blank_ink_ratio)
+        timer.lap('blank')
+    result.output_size = image.size
+
+    if result.blank:
+        result.data = None
+    elif changed or mime_type != 'image/jpeg':
+        encoded = _encode(image, config)
+        if changed or len(encoded) < len(data):
+            result.data = encoded
+            result.mime_type = 'image/jpeg'
+            result.changed = True
+        timer.lap('encode')
+    result.timings = timer.finish()
+    return result
+
+
+def rasterize_pdf(pdf_bytes: bytes, dpi: int = 150, config: Optional[PreprocessConfig] = None,
+                  max_pages: Optional[int] = None) -> List[PreprocessResult]:
+    """Render PDF pages to JPEG, one result per page.
+
+    With a config, pages render at no more than max_long_edge (instead of
+    rendering at dpi and downscaling), in grayscale if configured, and blank
+    pages are detected. Without one, pages render at dpi like before.
+    """
+    import fitz  # PyMuPDF
+
+    results = []
+    with fitz.open(stream=pdf_bytes, filetype='pdf') as doc:
+        if max_pages is not None and len(doc) > max_pages:
+            raise ValueError(f'{len(doc)} pages, at most {max_pages} per batch')
+        for page in doc:
+            timer = _StageTimer()
+            zoom = dpi / 72
+            if config:
+                zoom = min(zoom, config.max_long_edge / max(page.rect.width, page.rect.height))
+            gray = bool(config and config.grayscale)
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom),
+                                  colorspace=fitz.csGRAY if gray else fitz.csRGB, alpha=False)
+            timer.lap('render')
+            result = PreprocessResult(data=None, mime_type='image/jpeg', input_bytes=0,
+                                      input_size=(pix.width, pix.height),
+                                      output_size=(pix.width, pix.height), changed=True)
+            if config is None:
+                result.data = pix.tobytes('jpeg')
+                timer.lap('encode')
+            else:
+                image = Image.frombytes('L' if gray else 'RGB', (pix.width, pix.height), pix.samples)
+                result.blank = is_blank(image, config.blank_ink_ratio)
+                timer.lap('blank')
+                if not result.blank:
+                    result.data = _encode(image, config)
+                    timer.lap('encode')
+            result.timings = timer.finish()
+            results.append(result)
+    return results